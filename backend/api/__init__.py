@@ -3,5 +3,11 @@ from flask import Blueprint
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
-from . import account, files, folders
+from metrics import instrument_blueprint
+from .helpers import authenticate_request, flush_pending_writes
+instrument_blueprint(api_bp)
+api_bp.before_request(authenticate_request)
+api_bp.before_request(flush_pending_writes)
+
+from . import account, batch, changes, files, folders, jobs
 
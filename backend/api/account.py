@@ -1,9 +1,13 @@
 """Account API routes."""
-from flask import jsonify, request
-from supabase_client import get_supabase
+import logging
+from flask import jsonify
+from jobs import DELETE_ACCOUNT, enqueue
 from .helpers import require_auth
+from .jobs import job_accepted
 from . import api_bp
 
+logger = logging.getLogger(__name__)
+
 
 @api_bp.route('/account', methods=['DELETE'])
 def delete_account():
@@ -13,11 +17,10 @@ def delete_account():
         return error
     
     try:
-        supabase = get_supabase()
-        response = supabase.table('users').delete().eq('email', email).execute()
-        
-        return jsonify({'success': True}), 200
+        # Files and folders are deleted in chunks by a job, then the user row
+        job = enqueue(email, DELETE_ACCOUNT)
+        return job_accepted(job)
     except Exception as e:
-        print(f'Error deleting account: {e}')
+        logger.exception('Error deleting account')
         return jsonify({'error': str(e)}), 500
 
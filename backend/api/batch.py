@@ -0,0 +1,115 @@
+"""Batch file routes: star, move and delete many files with one statement each."""
+import logging
+from uuid import UUID
+from flask import current_app, jsonify, request
+from repository import NameConflictError, get_repository
+from .helpers import require_auth, mark_changed
+from . import api_bp
+
+logger = logging.getLogger(__name__)
+
+
+def parse_file_ids(data):
+    """Return (valid ids, invalid ids, error response) from a ``fileIds`` payload.
+
+    Valid ids are normalised to lowercase and deduplicated in request order.
+    """
+    file_ids = data.get('fileIds') if isinstance(data, dict) else None
+    if not isinstance(file_ids, list) or not file_ids:
+        return None, None, (jsonify({'error': 'fileIds must be a non-empty list'}), 400)
+    max_items = current_app.config['FILES_BATCH_MAX_ITEMS']
+    if len(file_ids) > max_items:
+        return None, None, (jsonify({'error': f'At most {max_items} files per batch'}), 413)
+
+    valid, invalid = {}, []
+    for file_id in file_ids:
+        try:
+            valid.setdefault(str(UUID(str(file_id))), None)
+        except ValueError:
+            invalid.append(file_id)
+    return list(valid), invalid, None
+
+
+def batch_report(email, valid, invalid, affected):
+    """Build the per-item response and mark the user's data changed if needed."""
+    affected = {file_id.lower() for file_id in affected}
+    if affected:
+        mark_changed(email)
+
+    results = [
+        {'fileId': file_id, 'status': 'ok' if file_id in affected else 'not_found'}
+        for file_id in valid
+    ]
+    results.extend({'fileId': file_id, 'status': 'invalid_id'} for file_id in invalid)
+    return jsonify({'success': True, 'updated': len(affected), 'results': results}), 200
+
+
+@api_bp.route('/files/batch/starred', methods=['PATCH'])
+def batch_update_starred():
+    """Star or unstar several files."""
+    email, error = require_auth()
+    if error:
+        return error
+
+    try:
+        data = request.get_json(silent=True)
+        valid, invalid, error = parse_file_ids(data)
+        if error:
+            return error
+        starred = data.get('starred')
+        if not isinstance(starred, bool):
+            return jsonify({'error': 'Missing payload'}), 400
+
+        affected = get_repository().set_starred_many(email, valid, starred) if valid else []
+        return batch_report(email, valid, invalid, affected)
+    except Exception as e:
+        logger.exception('Error updating starred in batch')
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/files/batch/folder', methods=['PATCH'])
+def batch_move_files():
+    """Move several files into a folder (root when folderId is null)."""
+    email, error = require_auth()
+    if error:
+        return error
+
+    try:
+        data = request.get_json(silent=True)
+        valid, invalid, error = parse_file_ids(data)
+        if error:
+            return error
+        folder_id = data.get('folderId') or None
+
+        repo = get_repository()
+        if folder_id and not repo.folder_exists(email, folder_id):
+            return jsonify({'error': 'Folder not found'}), 404
+
+        try:
+            affected = repo.move_files(email, valid, folder_id) if valid else []
+        except NameConflictError:
+            return jsonify({'error': 'A file with the same name and type already exists in the target folder'}), 409
+        return batch_report(email, valid, invalid, affected)
+    except Exception as e:
+        logger.exception('Error moving files in batch')
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/files/batch', methods=['DELETE'])
+def batch_delete_files():
+    """Delete several files."""
+    email, error = require_auth()
+    if error:
+        return error
+
+    try:
+        data = request.get_json(silent=True)
+        valid, invalid, error = parse_file_ids(data)
+        if error:
+            return error
+
+        affected = get_repository().delete_files(email, valid) if valid else []
+        return batch_report(email, valid, invalid, affected)
+    except Exception as e:
+        logger.exception('Error deleting files in batch')
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,175 @@
+"""Change feed API routes."""
+import json
+import logging
+import time
+from flask import Response, current_app, jsonify, request
+from concurrency import gather
+from events import hub
+from models import File
+from repository import get_repository
+from .files import folder_to_camel
+from .helpers import require_auth
+from . import api_bp
+
+logger = logging.getLogger(__name__)
+
+
+def collapse_changes(changes):
+    """Keep only the latest change of each file and folder, in seq order."""
+    latest = {}
+    for change in changes:
+        key = (change['entity'], change['entity_id'])
+        latest.pop(key, None)
+        latest[key] = change
+    return list(latest.values())
+
+
+def parse_seq(value):
+    """Parse a non-negative change seq; None if absent or malformed."""
+    try:
+        seq = int(value)
+    except (TypeError, ValueError):
+        return None
+    return seq if seq >= 0 else None
+
+
+def sse_event(name, head):
+    """Format a change notification; its id is the head, so Last-Event-ID resumes from it."""
+    return f'id: {head}\nevent: {name}\ndata: {json.dumps({"cursor": head})}\n\n'
+
+
+def stream_events(subscription, first_event, hold, heartbeat, max_duration, retry_ms):
+    """Yield the first event, then a notification per new head and keep-alives until max_duration."""
+    yield f'retry: {retry_ms}\n' + first_event
+    if not hold:
+        return
+    deadline = time.monotonic() + max_duration
+    while (remaining := deadline - time.monotonic()) > 0:
+        heads = subscription.wait(min(heartbeat, remaining))
+        # Heads only grow, so the latest one covers all queued notifications
+        yield sse_event('changes', max(heads)) if heads else ': keep-alive\n\n'
+
+
+def load_entities(repo, email, changes):
+    """Fetch the current rows of the upserted files and folders, keyed by id."""
+    def ids(entity):
+        return [c['entity_id'] for c in changes if c['entity'] == entity and c['op'] == 'upsert']
+
+    file_ids, folder_ids = ids('file'), ids('folder')
+    files, folders = gather(
+        lambda: repo.get_files_by_ids(email, file_ids) if file_ids else [],
+        lambda: repo.get_folders_by_ids(email, folder_ids) if folder_ids else [],
+    )
+    return {
+        'file': {f['id']: File.serializer.to_camel(f) for f in files},
+        'folder': {f['id']: folder_to_camel(f) for f in folders},
+    }
+
+
+@api_bp.route('/changes', methods=['GET'])
+def get_changes():
+    """Get what changed in the user's files and folders after a cursor.
+
+    Changes are returned oldest first, at most ``limit`` log entries per call,
+    collapsed to one per file or folder. An upsert carries the current row; an
+    entity deleted since then is reported as a delete. Pass the returned
+    ``cursor`` as ``since`` on the next call; ``hasMore`` means more changes
+    are already waiting.
+
+    Without ``since`` only the current cursor is returned: take it before a
+    full listing, then poll from it. A cursor older than the pruned log (or
+    from a deleted account) gets 410 and the client must reload its listings.
+    Folder counters (fileCount etc.) are not tracked; refetch folders when
+    their files change.
+    """
+    email, error = require_auth()
+    if error:
+        return error
+
+    config = current_app.config
+    limit = request.args.get('limit', config['CHANGES_PAGE_DEFAULT_LIMIT'], type=int)
+    if limit is None or limit < 1:
+        return jsonify({'error': 'Invalid limit'}), 400
+    limit = min(limit, config['CHANGES_PAGE_MAX_LIMIT'])
+
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            since = -1
+        if since < 0:
+            return jsonify({'error': 'Invalid cursor'}), 400
+
+    try:
+        repo = get_repository()
+        head, floor = repo.get_change_bounds(email)
+        if since is None:
+            return jsonify({'changes': [], 'cursor': head, 'hasMore': False}), 200
+        if since < floor or since > head:
+            return jsonify({'error': 'Cursor expired, reload all data', 'cursor': head}), 410
+
+        log = repo.list_changes(email, since, limit) if since < head else []
+        cursor = log[-1]['seq'] if log else since
+        changes = collapse_changes(log)
+        rows = load_entities(repo, email, changes)
+
+        payload = []
+        for change in changes:
+            entity, entity_id = change['entity'], change['entity_id']
+            item = {'seq': change['seq'], 'type': entity, 'id': entity_id, 'op': 'delete'}
+            row = rows[entity].get(entity_id) if change['op'] == 'upsert' else None
+            if row is not None:
+                # Otherwise deleted since; its own tombstone follows in a later batch
+                item['op'] = 'upsert'
+                item[entity] = row
+            payload.append(item)
+
+        return jsonify({'changes': payload, 'cursor': cursor, 'hasMore': cursor < head}), 200
+    except Exception as e:
+        logger.exception('Error fetching changes')
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/events', methods=['GET'])
+def get_events():
+    """Stream change notifications for the user as Server-Sent Events.
+
+    Each ``changes`` event carries the change log head as its id and in
+    ``data.cursor``; fetch ``GET /api/changes?since=<previous cursor>`` on
+    receipt. The first event is ``changes`` when Last-Event-ID (header, or
+    ``lastEventId`` query parameter) is behind the head, otherwise ``ready``.
+    Keep-alive comments are sent every SSE_HEARTBEAT_INTERVAL seconds and the
+    stream ends after SSE_MAX_DURATION, after which EventSource reconnects
+    with Last-Event-ID. A server without threads or greenlets (gunicorn sync
+    workers) only gets the first event, so streams never hold a worker; the
+    client then reconnects every SSE_RETRY_MS like a poll.
+    """
+    email, error = require_auth()
+    if error:
+        return error
+
+    config = current_app.config
+    last_event_id = parse_seq(request.headers.get('Last-Event-ID', request.args.get('lastEventId')))
+    hold = bool(request.environ.get('wsgi.multithread'))
+
+    subscription = hub.subscribe(email)
+    try:
+        # Subscribed first, so a change committed while the head is read still arrives
+        head = get_repository().get_change_bounds(email)[0]
+    except Exception as e:
+        hub.unsubscribe(subscription)
+        logger.exception('Error opening event stream')
+        return jsonify({'error': str(e)}), 500
+    subscription.advance(head, notify=False)
+    first_event = sse_event('ready' if last_event_id in (None, head) else 'changes', head)
+
+    body = stream_events(subscription, first_event, hold, config['SSE_HEARTBEAT_INTERVAL'],
+                         config['SSE_MAX_DURATION'], config['SSE_RETRY_MS'])
+    response = Response(body, mimetype='text/event-stream')
+    # Runs when the server closes the response, also if the client left before the first event
+    response.call_on_close(lambda: hub.unsubscribe(subscription))
+    response.headers['Cache-Control'] = 'no-cache'
+    # Keeps nginx-style proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
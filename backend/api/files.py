@@ -1,80 +1,216 @@
 """Files API routes."""
-from flask import jsonify, request
-from supabase_client import get_supabase
-from .helpers import require_auth, get_user_email
+import json
+import logging
+from datetime import datetime
+from uuid import UUID
+from flask import Response, current_app, jsonify, request, stream_with_context
+from concurrency import gather
+from folder_cache import folder_cache
+from models import File, Folder
+from jobs import DELETE_ALL, enqueue
+from repository import NameConflictError, get_repository
+from serialization import Rows
+from writebehind import file_writes
+from .helpers import (
+    require_auth, get_user_email, encode_cursor, decode_cursor,
+    mark_changed, listing_etag, etag_matches, with_etag, not_modified,
+)
+from .jobs import job_accepted
 from . import api_bp
 
+logger = logging.getLogger(__name__)
+
+FILE_NAME_CONFLICT = 'A file with this name and type already exists in this folder'
+
+
+def folder_to_camel(f):
+    """Convert a folders row to the camelCase payload used by the frontend."""
+    serializer = Folder.stats_serializer if 'starred_count' in f else Folder.serializer
+    return serializer.to_camel(f)
+
+
+def file_row(email, f, folder_id):
+    """Build a files row from a camelCase file record."""
+    return {
+        'user_email': email,
+        'name': f['name'],
+        'url': f['url'],
+        'icon_url': f.get('iconUrl'),
+        'mime_type': f.get('mimeType'),
+        'folder_id': folder_id,
+    }
+
+
+def search_files(repo, email, term, limit):
+    """Return up to limit files whose name contains term, best matches first.
+
+    Uses the trigram-indexed search_files RPC, falling back to the unranked
+    ILIKE query when ranked search is disabled or unavailable.
+    """
+    if current_app.config['FILES_SEARCH_RANKED']:
+        try:
+            return repo.search_files(email, term, limit)
+        except Exception as e:
+            logger.warning('Ranked search failed, falling back to ILIKE: %s', e)
+    return repo.list_files(email, search=term, limit=limit)
+
+
+def stream_files(repo, email, folder_id, starred, search, folders, batch_size):
+    """Yield the listing as JSON, fetching and serializing files one page at a time."""
+    dumps = current_app.json.dumps
+    yield '{"folders":' + dumps([folder_to_camel(f) for f in folders]) + ',"files":['
+
+    cursor = None
+    first = True
+    while True:
+        page = repo.list_files(email, folder_id, starred, search, cursor, batch_size)
+        if page:
+            # One encoder call per page; strip the page's own brackets
+            yield ('' if first else ',') + dumps(Rows(page, File.serializer))[1:-1]
+            first = False
+        if len(page) < batch_size:
+            break
+        cursor = (page[-1]['uploaded_at'], page[-1]['id'])
+
+    yield ']}'
+
+
+def import_files(repo, email, lines, folder_id, chunk_size):
+    """Insert NDJSON file records in chunks, yielding one NDJSON progress line per chunk.
+
+    Only the current chunk is held in memory. A malformed record is reported
+    and skipped; a chunk whose insert fails is reported and the import goes on.
+    """
+    dumps = current_app.json.dumps
+    inserted = failed = chunk_number = 0
+    rows, errors, first_line = [], [], 1
+
+    def flush(last_line):
+        nonlocal inserted, failed, chunk_number, rows, errors, first_line
+        chunk_number += 1
+        progress = {'chunk': chunk_number, 'lines': [first_line, last_line], 'inserted': 0}
+        if rows:
+            try:
+                repo.insert_files(rows)
+                progress['inserted'] = len(rows)
+                inserted += len(rows)
+            except NameConflictError:
+                progress['error'] = FILE_NAME_CONFLICT
+                failed += len(rows)
+            except Exception as e:
+                logger.exception('Error importing files (chunk %s)', chunk_number)
+                progress['error'] = str(e)
+                failed += len(rows)
+        if errors:
+            progress['errors'] = errors
+            failed += len(errors)
+        rows, errors, first_line = [], [], last_line + 1
+        return dumps(progress) + '\n'
+
+    line_number = 0
+    try:
+        for line_number, line in enumerate(lines, start=1):
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                    if not (isinstance(record, dict) and isinstance(record.get('name'), str)
+                            and isinstance(record.get('url'), str)):
+                        raise ValueError('Expected an object with name and url')
+                    rows.append(file_row(email, record, folder_id))
+                except ValueError as e:
+                    errors.append({'line': line_number, 'error': str(e)})
+            if len(rows) + len(errors) >= chunk_size:
+                yield flush(line_number)
+        if rows or errors:
+            yield flush(line_number)
+    finally:
+        if inserted:
+            mark_changed(email)
+
+    yield dumps({'done': True, 'inserted': inserted, 'failed': failed}) + '\n'
+
 
 @api_bp.route('/files', methods=['GET'])
 def get_files():
-    """Get files and folders for the authenticated user."""
+    """Get files and folders for the authenticated user.
+
+    Without paging parameters the full listing is returned. Passing ``limit``
+    and/or ``cursor`` returns one keyset page plus ``nextCursor``; folders are
+    only included on the first page. ``stream=true`` streams the full listing.
+    ``search`` returns at most ``limit`` ranked matches and is never paged.
+    """
     email = get_user_email()
     if not email:
         return jsonify({'files': [], 'folders': []}), 200
     
     try:
-        supabase = get_supabase()
         folder_id = request.args.get('folderId')
         starred = request.args.get('starred') == 'true'
         search = request.args.get('search')
+        stream = request.args.get('stream') == 'true'
+        paginate = 'limit' in request.args or 'cursor' in request.args
+
+        cursor = None
+        limit = None
+        if paginate:
+            cursor = decode_cursor(request.args.get('cursor'))
+            if cursor is not None:
+                uploaded_at, file_id = cursor
+                cursor = (datetime.fromisoformat(uploaded_at).isoformat(), str(UUID(file_id)))
+            limit = request.args.get('limit', current_app.config['FILES_PAGE_DEFAULT_LIMIT'], type=int)
+            if limit is None or limit < 1:
+                return jsonify({'error': 'Invalid limit'}), 400
+            limit = min(limit, current_app.config['FILES_PAGE_MAX_LIMIT'])
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    try:
+        repo = get_repository()
         
-        # Build files query
-        files_query = supabase.table('files').select('*').eq('user_email', email)
+        # Answer revalidations from the data version alone, without listing anything
+        version = repo.get_data_version(email)
+        etag = listing_etag(email, version)
+        if etag_matches(etag):
+            return not_modified(etag)
         
+        # Get folders if not starred view (and only once per paginated listing)
+        def load_folders():
+            if starred or cursor is not None:
+                return []
+            return folder_cache.get_tree(email, repo.list_folders, version).child_folders(folder_id)
+
+        if stream:
+            batch_size = current_app.config['FILES_STREAM_BATCH_SIZE']
+            body = stream_files(repo, email, folder_id, starred, search, load_folders(), batch_size)
+            return with_etag(Response(stream_with_context(body), mimetype='application/json'), etag)
+
         if search and search.strip():
-            files_query = files_query.ilike('name', f'%{search.strip()}%')
-        elif starred:
-            files_query = files_query.eq('starred', True)
-        elif folder_id is None or folder_id == '':
-            files_query = files_query.is_('folder_id', None)
-        elif folder_id:
-            files_query = files_query.eq('folder_id', folder_id)
-        
-        files_response = files_query.order('uploaded_at', desc=True).execute()
-        files = files_response.data if files_response.data else []
-        
-        # Get folders if not starred view
-        folders = []
-        if not starred:
-            folders_query = supabase.table('folders').select('*').eq('user_email', email)
-            
-            if folder_id is None or folder_id == '':
-                folders_query = folders_query.is_('parent_folder_id', None)
-            elif folder_id:
-                folders_query = folders_query.eq('parent_folder_id', folder_id)
-            
-            folders_response = folders_query.order('created_at', desc=False).execute()
-            folders = folders_response.data if folders_response.data else []
-        
-        # Convert snake_case to camelCase
-        camel_files = [
-            {
-                'id': f['id'],
-                'name': f['name'],
-                'url': f['url'],
-                'iconUrl': f.get('icon_url'),
-                'mimeType': f.get('mime_type'),
-                'starred': f.get('starred', False),
-                'lastEditedDate': f.get('last_edited'),
-                'uploadedAt': f.get('uploaded_at'),
-                'folderId': f.get('folder_id'),
-            }
-            for f in files
-        ]
-        
-        camel_folders = [
-            {
-                'id': f['id'],
-                'name': f['name'],
-                'parentFolderId': f.get('parent_folder_id'),
-                'createdAt': f.get('created_at'),
-            }
-            for f in folders
-        ]
-        
-        return jsonify({'files': camel_files, 'folders': camel_folders}), 200
-    except Exception as e:
-        print(f'Error fetching files: {e}')
+            # Ranked results are bounded by a limit instead of being paged
+            search_limit = min(limit or current_app.config['FILES_SEARCH_DEFAULT_LIMIT'], current_app.config['FILES_PAGE_MAX_LIMIT'])
+            folders, files = gather(load_folders, lambda: search_files(repo, email, search.strip(), search_limit))
+            payload = {'folders': [folder_to_camel(f) for f in folders], 'files': Rows(files, File.serializer)}
+            if paginate:
+                payload['nextCursor'] = None
+            return with_etag(jsonify(payload), etag), 200
+
+        # Fetch one row past the page to know whether another page exists
+        folders, files = gather(
+            load_folders,
+            lambda: repo.list_files(email, folder_id, starred, search, cursor, limit + 1 if limit else None),
+        )
+
+        payload = {'folders': [folder_to_camel(f) for f in folders]}
+        if paginate:
+            next_cursor = None
+            if len(files) > limit:
+                files = files[:limit]
+                next_cursor = encode_cursor(files[-1]['uploaded_at'], files[-1]['id'])
+            payload['nextCursor'] = next_cursor
+        payload['files'] = Rows(files, File.serializer)
+
+        return with_etag(jsonify(payload), etag), 200
+    except Exception:
+        logger.exception('Error fetching files')
         return jsonify({'files': [], 'folders': []}), 200
 
 
@@ -86,42 +222,47 @@ def create_files():
         return error
     
     try:
-        data = request.get_json()
-        files = data.get('files', [])
-        folder_id = data.get('folderId')
+        ndjson = request.mimetype == 'application/x-ndjson'
+        if ndjson:
+            # Streaming import: records are read line by line from the body
+            folder_id = request.args.get('folderId')
+        else:
+            data = request.get_json()
+            files = data.get('files', [])
+            folder_id = data.get('folderId')
         
-        supabase = get_supabase()
+        repo = get_repository()
         
         # Validate folder if provided
         valid_folder_id = None
         if folder_id:
-            folder_response = supabase.table('folders').select('id').eq('id', folder_id).eq('user_email', email).execute()
-            if folder_response.data and len(folder_response.data) > 0:
+            if repo.folder_exists(email, folder_id):
                 valid_folder_id = folder_id
             else:
-                print(f'Folder {folder_id} not found for user {email}, saving files to root folder')
+                logger.warning('Folder %s not found for user %s, saving files to root folder', folder_id, email)
+        
+        if ndjson:
+            chunk_size = current_app.config['FILES_IMPORT_CHUNK_SIZE']
+            return Response(
+                stream_with_context(import_files(repo, email, request.stream, valid_folder_id, chunk_size)),
+                mimetype='application/x-ndjson',
+            )
         
         # Prepare files for insertion
-        new_files = [
-            {
-                'user_email': email,
-                'name': f['name'],
-                'url': f['url'],
-                'icon_url': f.get('iconUrl'),
-                'mime_type': f.get('mimeType'),
-                'folder_id': valid_folder_id,
-            }
-            for f in files
-        ]
+        new_files = [file_row(email, f, valid_folder_id) for f in files]
         
         if not new_files:
             return jsonify({'success': True}), 200
         
-        supabase.table('files').insert(new_files).execute()
+        try:
+            repo.insert_files(new_files)
+        except NameConflictError:
+            return jsonify({'error': FILE_NAME_CONFLICT}), 409
+        mark_changed(email)
         
         return jsonify({'success': True}), 200
     except Exception as e:
-        print(f'Error saving files: {e}')
+        logger.exception('Error saving files')
         return jsonify({'error': str(e)}), 500
 
 
@@ -140,37 +281,20 @@ def update_file():
         if not file_id or not name:
             return jsonify({'error': 'File ID and name are required'}), 400
         
-        supabase = get_supabase()
+        # One UPDATE; the unique name index rejects collisions atomically
+        try:
+            file_data = get_repository().rename_file(email, file_id, name.strip())
+        except NameConflictError:
+            return jsonify({'error': FILE_NAME_CONFLICT}), 409
         
-        # Get file to check folder and mime_type
-        file_response = supabase.table('files').select('folder_id, mime_type').eq('id', file_id).eq('user_email', email).execute()
-        
-        if not file_response.data or len(file_response.data) == 0:
+        if not file_data:
             return jsonify({'error': 'File not found'}), 404
         
-        file_data = file_response.data[0]
-        folder_id = file_data.get('folder_id')
-        mime_type = file_data.get('mime_type')
-        
-        # Check for name collision
-        collision_query = supabase.table('files').select('id').eq('user_email', email).eq('name', name.strip()).eq('mime_type', mime_type).neq('id', file_id)
-        
-        if folder_id is None:
-            collision_query = collision_query.is_('folder_id', None)
-        else:
-            collision_query = collision_query.eq('folder_id', folder_id)
-        
-        collision_response = collision_query.execute()
-        
-        if collision_response.data and len(collision_response.data) > 0:
-            return jsonify({'error': 'A file with this name and type already exists in this folder'}), 409
-        
-        # Update file name
-        supabase.table('files').update({'name': name.strip()}).eq('id', file_id).eq('user_email', email).execute()
+        mark_changed(email)
         
         return jsonify({'success': True}), 200
     except Exception as e:
-        print(f'Error renaming file: {e}')
+        logger.exception('Error renaming file')
         return jsonify({'error': str(e)}), 500
 
 
@@ -185,44 +309,106 @@ def delete_file():
         file_id = request.args.get('fileId')
         delete_all = request.args.get('all') == 'true'
         
-        supabase = get_supabase()
+        repo = get_repository()
         
         if delete_all:
-            # Delete all files
-            supabase.table('files').delete().eq('user_email', email).execute()
-            # Delete all folders
-            supabase.table('folders').delete().eq('user_email', email).execute()
+            # Deleting everything can take long on big accounts, so it runs as a job
+            job = enqueue(email, DELETE_ALL)
+            return job_accepted(job)
         else:
             if not file_id:
                 return jsonify({'error': 'Missing file ID'}), 400
-            supabase.table('files').delete().eq('id', file_id).eq('user_email', email).execute()
+            repo.delete_file(email, file_id)
+            mark_changed(email)
         
         return jsonify({'success': True}), 200
     except Exception as e:
-        print(f'Error deleting file: {e}')
+        logger.exception('Error deleting file')
         return jsonify({'error': str(e)}), 500
 
 
+def parse_file_id(data):
+    """Return the normalized fileId of a JSON payload, or None if missing or malformed."""
+    file_id = data.get('fileId') if isinstance(data, dict) else None
+    try:
+        return str(UUID(file_id)) if isinstance(file_id, str) else None
+    except ValueError:
+        return None
+
+
 @api_bp.route('/files/starred', methods=['PATCH'])
 def update_starred():
-    """Update file starred status."""
+    """Update file starred status.
+
+    The change goes through the write-behind buffer, so rapid toggles of a
+    file end up as a single UPDATE.
+    """
     email, error = require_auth()
     if error:
         return error
     
     try:
         data = request.get_json()
-        file_id = data.get('fileId')
-        starred = data.get('starred')
+        file_id = parse_file_id(data)
+        starred = data.get('starred') if isinstance(data, dict) else None
         
         if not file_id or not isinstance(starred, bool):
             return jsonify({'error': 'Missing payload'}), 400
         
-        supabase = get_supabase()
-        supabase.table('files').update({'starred': starred}).eq('id', file_id).eq('user_email', email).execute()
+        file_writes.set_starred(email, file_id, starred)
         
         return jsonify({'success': True}), 200
     except Exception as e:
-        print(f'Error updating starred: {e}')
+        logger.exception('Error updating starred')
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/files/opened', methods=['POST'])
+def record_file_opened():
+    """Record that the user opened a file (its last_interacted time).
+
+    Buffered like star toggles: repeated opens of a file are merged and
+    written in the next batched UPDATE.
+    """
+    email, error = require_auth()
+    if error:
+        return error
+    
+    try:
+        file_id = parse_file_id(request.get_json(silent=True))
+        if not file_id:
+            return jsonify({'error': 'Missing payload'}), 400
+        
+        file_writes.record_open(email, file_id)
+        
+        return jsonify({'success': True}), 200
+    except Exception as e:
+        logger.exception('Error recording file open')
+        return jsonify({'error': str(e)}), 500
+
+
+@api_bp.route('/files/recent', methods=['GET'])
+def get_recent_files():
+    """Get the user's most recently opened (or uploaded) files, newest first."""
+    email, error = require_auth()
+    if error:
+        return error
+    
+    config = current_app.config
+    limit = request.args.get('limit', config['FILES_RECENT_DEFAULT_LIMIT'], type=int)
+    if limit is None or limit < 1:
+        return jsonify({'error': 'Invalid limit'}), 400
+    limit = min(limit, config['FILES_PAGE_MAX_LIMIT'])
+    
+    try:
+        repo = get_repository()
+        etag = listing_etag(email, repo.get_data_version(email))
+        if etag_matches(etag):
+            return not_modified(etag)
+        
+        files = repo.list_recent_files(email, limit)
+        return with_etag(jsonify({'files': Rows(files, File.serializer)}), etag), 200
+    except Exception as e:
+        logger.exception('Error fetching recent files')
         return jsonify({'error': str(e)}), 500
 
@@ -1,21 +1,16 @@
 """Folders API routes."""
-from flask import jsonify, request
-from supabase_client import get_supabase
-from .helpers import require_auth, get_user_email
+import logging
+from uuid import UUID
+from flask import current_app, jsonify, request
+from folder_cache import folder_cache
+from repository import NameConflictError, get_repository
+from .files import folder_to_camel
+from .helpers import require_auth, get_user_email, mark_changed, listing_etag, etag_matches, with_etag, not_modified
 from . import api_bp
 
+logger = logging.getLogger(__name__)
 
-def delete_folder_recursive(folder_id: str, email: str, supabase):
-    """Recursively delete folder and its contents."""
-    child_folders_response = supabase.table('folders').select('id').eq('parent_folder_id', folder_id).eq('user_email', email).execute()
-    
-    if child_folders_response.data:
-        for child in child_folders_response.data:
-            delete_folder_recursive(child['id'], email, supabase)
-    
-    supabase.table('files').delete().eq('folder_id', folder_id).eq('user_email', email).execute()
-    supabase.table('folders').delete().eq('parent_folder_id', folder_id).eq('user_email', email).execute()
-    supabase.table('folders').delete().eq('id', folder_id).eq('user_email', email).execute()
+FOLDER_NAME_CONFLICT = 'A folder with this name already exists in this location'
 
 
 @api_bp.route('/folders', methods=['GET'])
@@ -26,16 +21,84 @@ def get_folders():
         return jsonify({'folders': []}), 200
     
     try:
-        supabase = get_supabase()
-        folders_response = supabase.table('folders').select('*').eq('user_email', email).order('created_at', desc=False).execute()
-        folders = folders_response.data if folders_response.data else []
+        repo = get_repository()
+        version = repo.get_data_version(email)
+        etag = listing_etag(email, version)
+        if etag_matches(etag):
+            return not_modified(etag)
         
-        return jsonify({'folders': folders}), 200
-    except Exception as e:
-        print(f'Error fetching folders: {e}')
+        folders = folder_cache.get_tree(email, repo.list_folders, version).folders
+        
+        return with_etag(jsonify({'folders': folders}), etag), 200
+    except Exception:
+        logger.exception('Error fetching folders')
         return jsonify({'folders': []}), 200
 
 
+def nest_folders(tree, root_id=None, max_depth=None):
+    """Build the nested folder tree below root_id in one pass over the adjacency map.
+
+    Nodes are ``{id, name, childCount[, children]}``. Nodes below max_depth
+    are marked ``lazy`` instead of carrying ``children``; fetch them with
+    ``rootId``. Returns (nodes, number of nodes).
+    """
+    nodes = []
+    count = 0
+    stack = [(root_id, nodes, 1)]
+    while stack:
+        parent_id, siblings, depth = stack.pop()
+        for folder in tree.child_folders(parent_id):
+            children = tree.child_folders(folder['id'])
+            node = {'id': folder['id'], 'name': folder['name'], 'childCount': len(children)}
+            siblings.append(node)
+            count += 1
+            if not children:
+                continue
+            if max_depth is None or depth < max_depth:
+                node['children'] = []
+                stack.append((folder['id'], node['children'], depth + 1))
+            else:
+                node['lazy'] = True
+    return nodes, count
+
+
+@api_bp.route('/folders/tree', methods=['GET'])
+def get_folder_tree():
+    """Get the user's folders as a nested tree (optionally below rootId, to depth levels)."""
+    email, error = require_auth()
+    if error:
+        return error
+    
+    root_id = request.args.get('rootId') or None
+    max_depth = request.args.get('depth')
+    if max_depth is not None:
+        try:
+            max_depth = int(max_depth)
+        except ValueError:
+            max_depth = 0
+        if max_depth < 1:
+            return jsonify({'error': 'depth must be a positive integer'}), 400
+    
+    try:
+        repo = get_repository()
+        version = repo.get_data_version(email)
+        etag = listing_etag(email, version)
+        if etag_matches(etag):
+            return not_modified(etag)
+        
+        tree = folder_cache.get_tree(email, repo.list_folders, version)
+        if root_id and tree.get(root_id) is None:
+            return jsonify({'error': 'Folder not found'}), 404
+        
+        nodes, count = nest_folders(tree, root_id, max_depth)
+        # Always compact: trees are large and only ever read by code
+        body = current_app.json.dumps({'tree': nodes, 'count': count}, separators=(',', ':'))
+        return with_etag(current_app.response_class(body, mimetype='application/json'), etag), 200
+    except Exception as e:
+        logger.exception('Error fetching folder tree')
+        return jsonify({'error': str(e)}), 500
+
+
 @api_bp.route('/folders', methods=['POST'])
 def create_folder():
     """Create a new folder."""
@@ -56,29 +119,28 @@ def create_folder():
         if len(name) > 30:
             return jsonify({'error': 'Folder name must be 30 characters or less'}), 400
         
-        supabase = get_supabase()
+        repo = get_repository()
         
         # Validate parent folder if provided
         valid_parent_folder_id = None
         if parent_folder_id:
-            parent_response = supabase.table('folders').select('id').eq('id', parent_folder_id).eq('user_email', email).execute()
-            if parent_response.data and len(parent_response.data) > 0:
+            if repo.folder_exists(email, parent_folder_id):
                 valid_parent_folder_id = parent_folder_id
             else:
-                print(f'Parent folder {parent_folder_id} not found for user {email}, creating folder in root')
+                logger.warning('Parent folder %s not found for user %s, creating folder in root', parent_folder_id, email)
         
-        folder_response = supabase.table('folders').insert({
-            'user_email': email,
-            'name': name,
-            'parent_folder_id': valid_parent_folder_id,
-        }).execute()
+        try:
+            folder = repo.insert_folder(email, name, valid_parent_folder_id)
+        except NameConflictError:
+            return jsonify({'error': FOLDER_NAME_CONFLICT}), 409
+        mark_changed(email, folders=True)
         
-        if folder_response.data and len(folder_response.data) > 0:
-            return jsonify({'folder': folder_response.data[0]}), 200
+        if folder:
+            return jsonify({'folder': folder}), 200
         else:
             return jsonify({'error': 'Failed to create folder'}), 500
     except Exception as e:
-        print(f'Error creating folder: {e}')
+        logger.exception('Error creating folder')
         return jsonify({'error': str(e)}), 500
 
 
@@ -102,36 +164,20 @@ def update_folder():
         if len(name) > 30:
             return jsonify({'error': 'Folder name must be 30 characters or less'}), 400
         
-        supabase = get_supabase()
-        
-        folder_response = supabase.table('folders').select('parent_folder_id').eq('id', folder_id).eq('user_email', email).execute()
+        # One UPDATE; the unique name index rejects collisions atomically
+        try:
+            folder_data = get_repository().rename_folder(email, folder_id, name)
+        except NameConflictError:
+            return jsonify({'error': FOLDER_NAME_CONFLICT}), 409
         
-        if not folder_response.data or len(folder_response.data) == 0:
+        if not folder_data:
             return jsonify({'error': 'Folder not found'}), 404
         
-        folder_data = folder_response.data[0]
-        parent_folder_id = folder_data.get('parent_folder_id')
-        
-        # Check for duplicate name in the same parent folder (excluding current folder)
-        collision_query = supabase.table('folders').select('id').eq('user_email', email).eq('name', name)
-        
-        # Handle NULL parent_folder_id comparison correctly
-        if parent_folder_id is None:
-            collision_query = collision_query.is_('parent_folder_id', 'null')
-        else:
-            collision_query = collision_query.eq('parent_folder_id', parent_folder_id)
-        
-        collision_query = collision_query.neq('id', folder_id)
-        collision_response = collision_query.execute()
-        
-        if collision_response.data and len(collision_response.data) > 0:
-            return jsonify({'error': 'A folder with this name already exists in this location'}), 409
-        
-        supabase.table('folders').update({'name': name}).eq('id', folder_id).eq('user_email', email).execute()
+        mark_changed(email, folders=True)
         
         return jsonify({'success': True}), 200
     except Exception as e:
-        print(f'Error renaming folder: {e}')
+        logger.exception('Error renaming folder')
         return jsonify({'error': str(e)}), 500
 
 
@@ -147,11 +193,66 @@ def delete_folder():
         if not folder_id:
             return jsonify({'error': 'Folder ID is required'}), 400
         
-        supabase = get_supabase()
-        delete_folder_recursive(folder_id, email, supabase)
+        get_repository().delete_folder_subtree(email, folder_id)
+        mark_changed(email, folders=True)
         
         return jsonify({'success': True}), 200
     except Exception as e:
-        print(f'Error deleting folder: {e}')
+        logger.exception('Error deleting folder')
+        return jsonify({'error': str(e)}), 500
+
+
+def is_uuid(value):
+    """Check whether value is a UUID string."""
+    try:
+        UUID(value)
+        return True
+    except ValueError:
+        return False
+
+
+@api_bp.route('/folders/<folder_id>/breadcrumbs', methods=['GET'])
+def get_folder_breadcrumbs(folder_id):
+    """Get the path from the root to a folder (one folder_closure query)."""
+    email, error = require_auth()
+    if error:
+        return error
+    if not is_uuid(folder_id):
+        return jsonify({'error': 'Folder not found'}), 404
+    
+    try:
+        path = get_repository().folder_breadcrumbs(email, folder_id)
+        if not path:
+            return jsonify({'error': 'Folder not found'}), 404
+        
+        return jsonify({'breadcrumbs': [folder_to_camel(f) for f in path]}), 200
+    except Exception as e:
+        logger.exception('Error fetching breadcrumbs')
         return jsonify({'error': str(e)}), 500
 
+
+@api_bp.route('/folders/<folder_id>/subtree', methods=['GET'])
+def get_folder_subtree(folder_id):
+    """Get a folder and all its descendants with file counts (one folder_closure query)."""
+    email, error = require_auth()
+    if error:
+        return error
+    if not is_uuid(folder_id):
+        return jsonify({'error': 'Folder not found'}), 404
+    
+    try:
+        subtree = get_repository().folder_subtree(email, folder_id)
+        if not subtree:
+            return jsonify({'error': 'Folder not found'}), 404
+        
+        folders = [
+            {**folder_to_camel(f), 'depth': f['depth'], 'fileCount': f['file_count']}
+            for f in subtree
+        ]
+        return jsonify({
+            'folders': folders,
+            'fileCount': sum(f['file_count'] for f in subtree),
+        }), 200
+    except Exception as e:
+        logger.exception('Error fetching folder subtree')
+        return jsonify({'error': str(e)}), 500
@@ -1,14 +1,72 @@
 """Helper functions for API routes."""
-from flask import request, jsonify
+import base64
+import binascii
+import hashlib
+import json
+import logging
+from flask import current_app, g, request, jsonify
+from auth import authenticate, get_current_user_email, get_token_from_request
+from compression import ENCODINGS, coded_etag
+from events import hub
+from folder_cache import folder_cache
+from repository import get_repository
+from writebehind import file_writes
+
+logger = logging.getLogger(__name__)
+
+
+def authenticate_request():
+    """Resolve the caller once per request; registered as the blueprint's before_request hook.
+    
+    A NextAuth session token (bearer header or session cookie) is verified with
+    the cached ``auth.authenticate``. Without a valid token the X-User-Email
+    header is trusted only while AUTH_TRUST_USER_EMAIL_HEADER is enabled.
+    
+    Returns:
+        None to continue, or a 401 error response for a rejected token
+    """
+    if request.method == 'OPTIONS':
+        return None
+    g.user_email = None
+    trust_header = current_app.config['AUTH_TRUST_USER_EMAIL_HEADER']
+    if get_token_from_request():
+        user_info, error = authenticate()
+        if user_info:
+            return None
+        if not trust_header:
+            return error
+    if trust_header:
+        g.user_email = request.headers.get('X-User-Email')
+    return None
+
+
+# Endpoints that only add to the write-behind buffer
+BUFFERED_ENDPOINTS = {'api.update_starred', 'api.record_file_opened'}
+
+
+def flush_pending_writes():
+    """Write the caller's buffered file updates before anything else reads or changes their data.
+
+    Registered as a before_request hook after authenticate_request. A failed
+    flush is logged; the updates stay buffered for the next attempt.
+    """
+    email = get_user_email()
+    if not email or request.endpoint in BUFFERED_ENDPOINTS or not file_writes.has_pending(email):
+        return None
+    try:
+        file_writes.flush(email)
+    except Exception:
+        logger.exception('Error flushing buffered file updates for %s', email)
+    return None
 
 
 def get_user_email():
-    """Get user email from request headers.
+    """Get the email resolved for this request by authenticate_request.
     
     Returns:
-        str: User email if present, None otherwise
+        str: User email if authenticated, None otherwise
     """
-    return request.headers.get('X-User-Email')
+    return get_current_user_email()
 
 
 def require_auth():
@@ -22,3 +80,97 @@ def require_auth():
         return None, (jsonify({'error': 'Not authenticated'}), 401)
     return email, None
 
+
+def encode_cursor(*values):
+    """Encode keyset values into an opaque, URL-safe pagination cursor.
+    
+    Returns:
+        str: Base64 encoded cursor
+    """
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor.
+    
+    Returns:
+        tuple: Keyset values, or None if no cursor was given
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError('Malformed cursor') from e
+    if not isinstance(values, list) or not all(isinstance(v, str) for v in values):
+        raise ValueError('Malformed cursor')
+    return tuple(values)
+
+
+def mark_changed(email, folders=False):
+    """Record a successful mutation of a user's data.
+    
+    Bumps the data version behind listing ETags, notifies the user's event
+    streams and, when folders changed, drops the cached folder tree. A failed
+    bump is logged rather than raised: the write itself has already succeeded.
+    """
+    if folders:
+        folder_cache.invalidate(email)
+    try:
+        get_repository().bump_data_version(email)
+    except Exception:
+        logger.exception('Error bumping data version for %s', email)
+    hub.publish(email)
+
+
+def listing_etag(email, version):
+    """Build a strong ETag for a listing from the user's data version.
+    
+    Returns:
+        str: ETag value (unquoted) unique to the version, user and URL
+    """
+    digest = hashlib.sha256(f'{email}\0{request.full_path}'.encode()).hexdigest()[:16]
+    return f'{version:x}-{digest}'
+
+
+def with_etag(response, etag):
+    """Attach the ETag and force revalidation on every use of a cached copy.
+    
+    compress_response appends the coding to it when the body gets encoded.
+    """
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def matching_etag(etag):
+    """Return the If-None-Match entry that names etag or one of its encoded variants.
+    
+    Compared weakly, as RFC 9110 requires for If-None-Match.
+    
+    Returns:
+        str: The matching tag, or None
+    """
+    for candidate in [etag, *(coded_etag(etag, encoding) for encoding in ENCODINGS)]:
+        if request.if_none_match.contains_weak(candidate):
+            return candidate
+    return None
+
+
+def etag_matches(etag):
+    """Whether the request's If-None-Match matches the representation tagged etag."""
+    return matching_etag(etag) is not None
+
+
+def not_modified(etag):
+    """Build an empty 304 response for a matching If-None-Match.
+    
+    It carries the tag the client sent, so a cached compressed copy keeps its
+    coded ETag.
+    """
+    return with_etag(current_app.response_class(status=304), matching_etag(etag) or etag)
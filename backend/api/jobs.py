@@ -0,0 +1,54 @@
+"""Background job API routes."""
+import logging
+from uuid import UUID
+from flask import jsonify, url_for
+from repository import get_repository
+from .helpers import require_auth
+from . import api_bp
+
+logger = logging.getLogger(__name__)
+
+
+def job_to_camel(job):
+    """Convert a jobs row to the camelCase payload used by the frontend."""
+    return {
+        'id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'progress': job['progress'],
+        'attempts': job['attempts'],
+        'error': job.get('error'),
+        'createdAt': job.get('created_at'),
+        'updatedAt': job.get('updated_at'),
+    }
+
+
+def job_accepted(job):
+    """202 response for a newly queued job, pointing at its status URL."""
+    response = jsonify({'success': True, 'jobId': job['id'], 'job': job_to_camel(job)})
+    response.status_code = 202
+    response.headers['Location'] = url_for('api.get_job', job_id=job['id'])
+    return response
+
+
+@api_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get the status and progress of a background job."""
+    email, error = require_auth()
+    if error:
+        return error
+    
+    try:
+        UUID(job_id)
+    except ValueError:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    try:
+        job = get_repository().get_job(email, job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
+        
+        return jsonify({'job': job_to_camel(job)}), 200
+    except Exception as e:
+        logger.exception('Error fetching job')
+        return jsonify({'error': str(e)}), 500
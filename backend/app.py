@@ -1,4 +1,6 @@
 """Flask application factory and main entry point."""
+import hmac
+import logging
 import os
 from flask import Flask, request
 from flask_cors import CORS
@@ -7,25 +9,40 @@ from flask_migrate import Migrate
 from config import config
 from models import db
 from api import api_bp
+from commands import check_query_plans, prune_changes, reconcile_folder_stats, run_jobs
+from compression import compress_response
+from jobs import worker as job_worker
+from logs import configure_logging
+from metrics import metrics_response, observe_response_size
+from profiling import init_profiling
+from serialization import create_json_provider
 
 migrate = Migrate()
 app = Flask(__name__)
 
 # Use default development config
 app.config.from_object(config['default'])
+app.json = create_json_provider(app)
+configure_logging(app)
+logger = logging.getLogger(__name__)
 
 db.init_app(app)
 migrate.init_app(app, db)
+init_profiling(app)
+app.cli.add_command(check_query_plans)
+app.cli.add_command(run_jobs)
+app.cli.add_command(reconcile_folder_stats)
+app.cli.add_command(prune_changes)
 
-print(f"CORS_ORIGINS configured: {app.config['CORS_ORIGINS']}")
+logger.info('CORS_ORIGINS configured: %s', app.config['CORS_ORIGINS'])
 
 CORS(
     app,
     origins=app.config['CORS_ORIGINS'],
     supports_credentials=True,
     methods=['GET', 'POST', 'PATCH', 'DELETE', 'OPTIONS'],
-    allow_headers=['Content-Type', 'Authorization', 'X-User-Email', 'x-user-email'],
-    expose_headers=['Content-Type'],
+    allow_headers=['Content-Type', 'Authorization', 'X-User-Email', 'x-user-email', 'If-None-Match'],
+    expose_headers=['Content-Type', 'ETag'],
     max_age=3600
 )
 
@@ -34,12 +51,25 @@ def after_request(response):
     origin = request.headers.get('Origin')
     if origin and origin in app.config['CORS_ORIGINS']:
         response.headers.add('Access-Control-Allow-Origin', origin)
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,X-User-Email,x-user-email')
+    response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,X-User-Email,x-user-email,If-None-Match')
     response.headers.add('Access-Control-Allow-Methods', 'GET,POST,PATCH,DELETE,OPTIONS')
     response.headers.add('Access-Control-Allow-Credentials', 'true')
     response.headers.add('Access-Control-Max-Age', '3600')
     return response
 
+# Registered before compress so that it runs after it and sees the encoded size
+app.after_request(observe_response_size)
+
+@app.after_request
+def compress(response):
+    return compress_response(response)
+
+@app.before_request
+def start_job_worker():
+    # Started lazily so that each gunicorn worker polls from its own thread after fork
+    if app.config['JOB_WORKER_ENABLED']:
+        job_worker.start()
+
 # Register API blueprint
 app.register_blueprint(api_bp)
 
@@ -49,6 +79,14 @@ def health():
     return {'status': 'ok'}, 200
 
 
+@app.route('/metrics')
+def metrics():
+    token = app.config['METRICS_TOKEN']
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return {'error': 'Unauthorized'}, 401
+    return metrics_response()
+
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
 
@@ -1,9 +1,78 @@
 """Authentication middleware for validating NextAuth JWT tokens."""
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
 import jwt
 from flask import request, jsonify, g
 from config import Config
 
+logger = logging.getLogger(__name__)
+
+
+class TokenCache:
+    """Bounded LRU cache of verified token claims, keyed by token digest.
+    
+    Entries are kept until the token's ``exp`` (capped at a maximum TTL), so a
+    cached token is never accepted after it would have failed verification.
+    """
+    
+    def __init__(self, max_size, max_ttl):
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode()).digest()
+    
+    def get(self, token):
+        """Return cached user info for token, or None on a miss."""
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+    
+    def put(self, token, user_info):
+        """Cache user info for a verified token until its expiry."""
+        if self.max_size < 1:
+            return
+        expires_at = time.time() + self.max_ttl
+        exp = user_info['token_data'].get('exp')
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, exp)
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (user_info, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+token_cache = TokenCache(Config.AUTH_TOKEN_CACHE_SIZE, Config.AUTH_TOKEN_CACHE_MAX_TTL)
+
 
 def get_token_from_request():
     """Extract JWT token from request headers or cookies."""
@@ -15,7 +84,18 @@ def get_token_from_request():
 
 
 def verify_nextauth_token(token):
-    """Verify NextAuth JWT token and return user info."""
+    """Verify NextAuth JWT token and return user info (cached per token)."""
+    user_info = token_cache.get(token)
+    if user_info is not None:
+        return user_info
+    user_info = decode_nextauth_token(token)
+    if user_info is not None:
+        token_cache.put(token, user_info)
+    return user_info
+
+
+def decode_nextauth_token(token):
+    """Decode and fully verify NextAuth JWT token; return user info or None."""
     try:
         secret = Config.NEXTAUTH_SECRET
         if not secret:
@@ -27,24 +107,36 @@ def verify_nextauth_token(token):
         return {'email': email, 'name': decoded.get('name'), 'image': decoded.get('picture') or decoded.get('image'), 'token_data': decoded}
     except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
         return None
-    except Exception as e:
-        print(f"Error verifying token: {e}")
+    except Exception:
+        logger.exception('Error verifying token')
         return None
 
 
+def authenticate():
+    """Authenticate the current request and store the user on Flask's g object.
+    
+    Returns:
+        tuple: (user_info, None) on success, (None, error_response) otherwise
+    """
+    token = get_token_from_request()
+    if not token:
+        return None, (jsonify({'error': 'Not authenticated'}), 401)
+    user_info = verify_nextauth_token(token)
+    if not user_info:
+        return None, (jsonify({'error': 'Invalid or expired token'}), 401)
+    g.user_email = user_info['email']
+    g.user_name = user_info.get('name')
+    g.user_image = user_info.get('image')
+    return user_info, None
+
+
 def require_auth(f):
     """Decorator to require authentication for a route."""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        token = get_token_from_request()
-        if not token:
-            return jsonify({'error': 'Not authenticated'}), 401
-        user_info = verify_nextauth_token(token)
-        if not user_info:
-            return jsonify({'error': 'Invalid or expired token'}), 401
-        g.user_email = user_info['email']
-        g.user_name = user_info.get('name')
-        g.user_image = user_info.get('image')
+        user_info, error = authenticate()
+        if error:
+            return error
         return f(*args, **kwargs)
     return decorated_function
 
@@ -0,0 +1,4 @@
+"""Benchmark scripts for the backend API.
+
+Run from the ``backend`` directory, e.g. ``python -m benchmarks.folder_delete``.
+"""
@@ -0,0 +1,90 @@
+"""Compare single-item and batch file mutations at batch sizes 1, 10, 100, 1000.
+
+For each batch size, stars, moves and deletes that many files through the
+Flask test client, once with one request per file (PATCH /api/files/starred,
+DELETE /api/files) and once with one batch request (PATCH
+/api/files/batch/starred, PATCH /api/files/batch/folder, DELETE
+/api/files/batch), and reports throughput in files per second. Runs on the
+SQLAlchemy backend against DATABASE_URL, or a temporary SQLite database.
+
+Usage:
+    python -m benchmarks.batch --sizes 1 10 100 1000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import insert
+
+from config import Config
+
+EMAIL = 'bench@example.com'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 10, 100, 1000])
+    args = parser.parse_args()
+
+    Config.FILES_BATCH_MAX_ITEMS = max(Config.FILES_BATCH_MAX_ITEMS, *args.sizes)
+    from app import app
+    from models import db
+    from repository import SQLAlchemyRepository, create_repository_engine, set_repository
+
+    tmp_path = None
+    url = Config.DATABASE_URL
+    if not url:
+        tmp_path = tempfile.mktemp(suffix='.db')
+        url = f'sqlite:///{tmp_path}'
+    engine = create_repository_engine(url)
+    if tmp_path:
+        db.metadata.create_all(engine)
+    repo = SQLAlchemyRepository(engine)
+    set_repository(repo)
+
+    with engine.begin() as conn:
+        conn.execute(insert(db.metadata.tables['users']).values(email=EMAIL))
+    folder_id = repo.insert_folder(EMAIL, 'target', None)['id']
+
+    client = app.test_client()
+    headers = {'X-User-Email': EMAIL}
+
+    def seed(count):
+        repo.insert_files([
+            {'user_email': EMAIL, 'name': f'file-{i}', 'url': f'https://example.com/{i}'}
+            for i in range(count)
+        ])
+        return [f['id'] for f in repo.list_files(EMAIL)]
+
+    def single(file_ids):
+        for file_id in file_ids:
+            client.patch('/api/files/starred', json={'fileId': file_id, 'starred': True}, headers=headers)
+        # There is no single-file move route, so the single mode skips moves
+        for file_id in file_ids:
+            client.delete(f'/api/files?fileId={file_id}', headers=headers)
+
+    def batch(file_ids):
+        client.patch('/api/files/batch/starred', json={'fileIds': file_ids, 'starred': True}, headers=headers)
+        client.patch('/api/files/batch/folder', json={'fileIds': file_ids, 'folderId': folder_id}, headers=headers)
+        client.delete('/api/files/batch', json={'fileIds': file_ids}, headers=headers)
+
+    print(f"{'size':>6} {'single files/s':>15} {'batch files/s':>14} {'speedup':>8}")
+    for size in args.sizes:
+        timings = {}
+        for mode, run in (('single', single), ('batch', batch)):
+            file_ids = seed(size)
+            started = time.perf_counter()
+            run(file_ids)
+            timings[mode] = time.perf_counter() - started
+        # Single mode sends two requests per file, batch mode three statements in total
+        single_rate = size / timings['single']
+        batch_rate = size / timings['batch']
+        print(f'{size:>6} {single_rate:>15.0f} {batch_rate:>14.0f} {batch_rate / single_rate:>7.1f}x')
+
+    if tmp_path:
+        os.remove(tmp_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""Benchmark response compression: CPU time against bytes saved for file listings.
+
+Builds GET /api/files payloads of several sizes and compresses each with every
+available encoding (gzip, br, zstd) at a few levels, both in one go and in the
+per-chunk flushed mode used for streamed responses (chunks of 500 files, as
+with FILES_STREAM_BATCH_SIZE). Reports compressed size, ratio, time and the
+CPU cost per megabyte saved.
+
+Usage:
+    python -m benchmarks.compression --sizes 100 1000 10000 50000
+"""
+import argparse
+import statistics
+import time
+
+from flask import Flask
+
+from compression import ENCODINGS, compress, compress_chunks
+from models import File
+from serialization import Rows, StdlibJSONProvider
+
+LEVELS = {'gzip': (1, 6, 9), 'br': (1, 4, 6), 'zstd': (1, 3, 9)}
+STREAM_BATCH = 500
+
+
+def listing_rows(count):
+    return [
+        {
+            'id': f'3f1c{n:04x}-9a2b-4c1e-8f00-{n * 7919 % 16 ** 12:012x}',
+            'name': f'{("board-minutes", "nda", "cap-table", "financial-report")[n % 4]}-{n}.pdf',
+            'url': f'https://drive.google.com/file/d/{n * 2654435761 % 16 ** 32:032x}/view',
+            'icon_url': 'https://drive-thirdparty.googleusercontent.com/16/type/application/pdf',
+            'mime_type': 'application/pdf',
+            'starred': n % 10 == 0,
+            'uploaded_at': f'2025-{n % 12 + 1:02d}-{n % 28 + 1:02d}T{n % 24:02d}:{n % 60:02d}:00.{n % 999999:06d}',
+            'last_interacted': f'2025-{n % 12 + 1:02d}-{n % 28 + 1:02d}T{n % 24:02d}:30:00',
+            'folder_id': None,
+        }
+        for n in range(count)
+    ]
+
+
+def timed(call, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 50000], help='files per listing')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    provider = StdlibJSONProvider(Flask('bench'))
+    print(f"encodings available: {', '.join(ENCODINGS)}")
+    print(f"{'files':>6} {'encoding':<9} {'mode':<7} {'raw KiB':>9} {'out KiB':>9} {'ratio':>6} {'ms':>8} {'ms/MB saved':>12}")
+    for size in args.sizes:
+        rows = listing_rows(size)
+        body = provider.dumps({'folders': [], 'files': Rows(rows, File.serializer)}).encode()
+        chunks = [
+            provider.dumps(Rows(rows[start:start + STREAM_BATCH], File.serializer)).encode()
+            for start in range(0, size, STREAM_BATCH)
+        ]
+        for encoding in ENCODINGS:
+            for level in LEVELS[encoding]:
+                for mode, call in (
+                    ('whole', lambda: compress(encoding, level, body)),
+                    ('stream', lambda: b''.join(compress_chunks(encoding, level, iter(chunks)))),
+                ):
+                    ms, out = timed(call, args.repeat)
+                    saved_mb = (len(body) - len(out)) / 1e6
+                    print(f'{size:>6} {encoding + "-" + str(level):<9} {mode:<7} {len(body) / 1024:>9.1f} '
+                          f'{len(out) / 1024:>9.1f} {len(body) / len(out):>6.1f} {ms:>8.2f} '
+                          f'{ms / saved_mb if saved_mb > 0 else float("inf"):>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+"""Generate synthetic data rooms: users with folder trees and files.
+
+Each user gets a full folder tree of the given depth and fan-out, and files
+spread over the root and all folders, with more files in shallow folders
+(as in real drives). Names are either realistic (word combinations with
+extensions matching their MIME types) or sequential (document-<n>). Rows are
+bulk-inserted through SQLAlchemy Core, so database triggers (folder closure,
+folder counters) run as they would for API writes.
+
+Usage:
+    python -m benchmarks.datagen --users 5 --files 10000 --depth 3 --fanout 4
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlalchemy import insert
+
+from config import Config
+from models import db
+from repository import create_repository_engine
+
+MIME_TYPES = (
+    ('application/pdf', 'pdf', 30),
+    ('application/vnd.google-apps.document', None, 20),
+    ('application/vnd.google-apps.spreadsheet', None, 15),
+    ('application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'docx', 10),
+    ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx', 10),
+    ('application/vnd.google-apps.presentation', None, 5),
+    ('image/png', 'png', 5),
+    ('image/jpeg', 'jpg', 5),
+)
+
+WORDS = (
+    'agreement', 'annual', 'audit', 'board', 'budget', 'cap', 'contract', 'customer',
+    'diligence', 'employee', 'equity', 'financial', 'forecast', 'invoice', 'lease', 'legal',
+    'memo', 'minutes', 'nda', 'option', 'plan', 'pitch', 'policy', 'report', 'revenue',
+    'review', 'schedule', 'statement', 'summary', 'table', 'tax', 'term', 'sheet', 'vendor',
+)
+
+FOLDER_WORDS = (
+    'Legal', 'Finance', 'HR', 'Contracts', 'Board', 'Tax', 'IP', 'Customers', 'Product',
+    'Marketing', 'Investors', 'Compliance', 'Archive', 'Q1', 'Q2', 'Q3', 'Q4', 'Drafts',
+)
+
+
+def file_name(rng, names, index):
+    if names == 'sequential':
+        return f'document-{index}'
+    # Zipf-like: a few words are much more common, like real file names
+    words = rng.choices(WORDS, weights=[1 / (rank + 1) for rank in range(len(WORDS))], k=rng.randint(2, 4))
+    words = list(dict.fromkeys(words))
+    suffix = f' {rng.randint(2015, 2026)}' if rng.random() < 0.3 else ''
+    return '-'.join(words) + suffix
+
+
+def build_folders(rng, email, depth, fanout, now):
+    """Folders of a full tree, parents before children; returns (rows, depth by id)."""
+    rows, depths = [], {}
+    level = [None]
+    for current_depth in range(1, depth + 1):
+        next_level = []
+        for parent_id in level:
+            for n in range(fanout):
+                folder_id = uuid4()
+                rows.append({
+                    'id': folder_id,
+                    'user_email': email,
+                    'name': f'{rng.choice(FOLDER_WORDS)} {current_depth}.{n + 1}',
+                    'parent_folder_id': parent_id,
+                    'created_at': now - timedelta(days=rng.randint(0, 365)),
+                })
+                depths[folder_id] = current_depth
+                next_level.append(folder_id)
+        level = next_level
+    return rows, depths
+
+
+def generate_user(conn, email, files, depth=3, fanout=4, starred_ratio=0.1, names='realistic', seed=0, batch_size=1000):
+    """Insert one user with its folder tree and files; returns the folder ids."""
+    rng = random.Random(f'{seed}:{email}')
+    now = datetime.utcnow()
+    tables = db.metadata.tables
+
+    conn.execute(insert(tables['users']).values(email=email, name=email.split('@')[0]))
+    folder_rows, depths = build_folders(rng, email, depth, fanout, now)
+    if folder_rows:
+        conn.execute(insert(tables['folders']), folder_rows)
+
+    # Shallow folders hold more files: weight halves with each level
+    locations = [None] + [row['id'] for row in folder_rows]
+    weights = [1.0] + [0.5 ** depths[row['id']] for row in folder_rows]
+    mime_types = [mime for mime, _, _ in MIME_TYPES]
+    mime_weights = [weight for _, _, weight in MIME_TYPES]
+    extensions = {mime: extension for mime, extension, _ in MIME_TYPES}
+
+    taken = set()
+    batch = []
+    for index in range(files):
+        folder_id = rng.choices(locations, weights)[0]
+        mime_type = rng.choices(mime_types, mime_weights)[0]
+        name = file_name(rng, names, index)
+        if extensions[mime_type]:
+            name = f'{name}.{extensions[mime_type]}'
+        # Names are unique per (folder, name, type), as the unique indexes require
+        while (folder_id, name, mime_type) in taken:
+            name = f'{name} ({index})'
+        taken.add((folder_id, name, mime_type))
+
+        uploaded_at = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        batch.append({
+            'id': uuid4(),
+            'user_email': email,
+            'name': name,
+            'url': f'https://drive.google.com/file/d/{uuid4().hex}/view',
+            'icon_url': f'https://drive-thirdparty.googleusercontent.com/16/type/{mime_type}',
+            'mime_type': mime_type,
+            'starred': rng.random() < starred_ratio,
+            'uploaded_at': uploaded_at,
+            'last_interacted': uploaded_at + timedelta(seconds=rng.randint(0, 30 * 24 * 3600)),
+            'folder_id': folder_id,
+        })
+        if len(batch) >= batch_size:
+            conn.execute(insert(tables['files']), batch)
+            batch = []
+    if batch:
+        conn.execute(insert(tables['files']), batch)
+    return [row['id'] for row in folder_rows]
+
+
+def generate(engine, users=1, files=1000, depth=3, fanout=4, starred_ratio=0.1, names='realistic', seed=0,
+             email_prefix='user'):
+    """Generate one data room per user and return the users' emails."""
+    emails = [f'{email_prefix}-{n}@example.com' for n in range(users)]
+    for email in emails:
+        with engine.begin() as conn:
+            generate_user(conn, email, files, depth, fanout, starred_ratio, names, seed)
+    return emails
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default=Config.DATABASE_URL, help='defaults to DATABASE_URL')
+    parser.add_argument('--users', type=int, default=1)
+    parser.add_argument('--files', type=int, default=1000, help='files per user')
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--fanout', type=int, default=4)
+    parser.add_argument('--starred-ratio', type=float, default=0.1)
+    parser.add_argument('--names', choices=['realistic', 'sequential'], default='realistic')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--email-prefix', default='user')
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error('set DATABASE_URL or pass --database-url')
+
+    engine = create_repository_engine(args.database_url)
+    if engine.dialect.name == 'sqlite':
+        db.metadata.create_all(engine)
+    emails = generate(engine, args.users, args.files, args.depth, args.fanout, args.starred_ratio,
+                      args.names, args.seed, args.email_prefix)
+    print(f'Generated {len(emails)} users with {args.files} files each: {emails[0]} ... {emails[-1]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,422 @@
+"""Benchmark every API route and record a machine-readable baseline.
+
+Generates a data room with benchmarks.datagen, then calls each route in
+api/files.py, api/batch.py, api/folders.py, api/jobs.py and api/account.py
+through the Flask test client on the SQLAlchemy backend. For each route it
+records latency percentiles, the number of SQL statements per request and
+the peak Python memory allocated by one request (tracemalloc). Runs against
+DATABASE_URL, or a temporary SQLite database when it is not set.
+
+Results are written as JSON (--output). With --compare, they are checked
+against an earlier baseline: a route regresses if its p50 latency or peak
+memory grows by more than --tolerance, or if it issues more queries. The
+exit status is 1 if any route regressed, and the run stops if any request
+of a scenario fails (status 400 or above).
+
+Usage:
+    python -m benchmarks.endpoints --files 5000 --output baseline.json
+    python -m benchmarks.endpoints --files 5000 --compare baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+from sqlalchemy import event
+
+from config import Config
+from benchmarks.datagen import generate, generate_user
+
+EMAIL = 'bench-0@example.com'
+
+
+class ScenarioError(Exception):
+    """A scenario's setup or one of its requests did not succeed."""
+
+
+def check(response):
+    """Return the response, or raise if its status is an error."""
+    if response.status_code >= 400:
+        raise ScenarioError(f'{response.request.method} {response.request.path} returned {response.status_code}: '
+                            f'{response.get_data(as_text=True)[:200]}')
+    return response
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+class QueryCounter:
+    """Counts SQL statements sent through an engine."""
+
+    def __init__(self, engine):
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+
+    def _on_execute(self, *args):
+        with self._lock:
+            self.count += 1
+
+
+class Bench:
+    """Shared state for the scenarios: test client, repository and seeded ids."""
+
+    def __init__(self, client, repo, engine, folder_ids):
+        self.client = client
+        self.repo = repo
+        self.engine = engine
+        self.folder_ids = folder_ids
+        self.headers = {'X-User-Email': EMAIL}
+        self._users = 0
+
+    def get(self, path, **kwargs):
+        return self.client.get(path, headers={**self.headers, **kwargs.pop('headers', {})}, **kwargs)
+
+    def make_files(self, count, prefix, folder_id=None):
+        """Insert files with unique names outside the timed section; return their ids."""
+        self.repo.insert_files([
+            {'user_email': EMAIL, 'name': f'{prefix}-{n}', 'url': 'https://example.com', 'folder_id': folder_id}
+            for n in range(count)
+        ])
+        files = self.repo.list_files(EMAIL, folder_id=folder_id, search=prefix)
+        return [f['id'] for f in files if f['name'].startswith(f'{prefix}-')]
+
+    def make_users(self, count, files):
+        """Create throwaway users with small data rooms; return their emails."""
+        emails = [f'throwaway-{self._users + n}@example.com' for n in range(count)]
+        self._users += count
+        with self.engine.begin() as conn:
+            for email in emails:
+                generate_user(conn, email, files, depth=2, fanout=2)
+        return emails
+
+
+# Each scenario takes (bench, calls) and returns request(i) for i in range(calls).
+# Setup (seeding rows to delete, fresh users, ...) happens here, untimed.
+
+def files_listing(query):
+    def setup(bench, calls):
+        return lambda i: bench.get(f'/api/files{query}')
+    return setup
+
+
+def files_in_folder(bench, calls):
+    return lambda i: bench.get(f'/api/files?folderId={bench.folder_ids[0]}')
+
+
+def files_next_page(bench, calls):
+    # Enough root files for a second page, however small the data room is
+    bench.make_files(101, 'next-page')
+    first = check(bench.get('/api/files?limit=100'))
+    cursor = first.json['nextCursor']
+    if cursor is None:
+        raise ScenarioError('first page of 100 root files has no nextCursor')
+    return lambda i: bench.get(f'/api/files?limit=100&cursor={cursor}')
+
+
+def files_not_modified(bench, calls):
+    etag = bench.get('/api/files').headers['ETag']
+    return lambda i: bench.get('/api/files', headers={'If-None-Match': etag})
+
+
+def create_files_json(bench, calls):
+    def request(i):
+        files = [{'name': f'created-{i}-{n}', 'url': 'https://example.com'} for n in range(10)]
+        return bench.client.post('/api/files', json={'files': files}, headers=bench.headers)
+    return request
+
+
+def create_files_ndjson(bench, calls):
+    def request(i):
+        body = ''.join(
+            json.dumps({'name': f'imported-{i}-{n}', 'url': 'https://example.com'}) + '\n' for n in range(100)
+        )
+        response = bench.client.post('/api/files', data=body,
+                                     headers={**bench.headers, 'Content-Type': 'application/x-ndjson'})
+        response.get_data()
+        return response
+    return request
+
+
+def rename_file(bench, calls):
+    file_id = bench.make_files(1, 'rename-target')[0]
+    return lambda i: bench.client.patch('/api/files', json={'fileId': file_id, 'name': f'renamed-{i}'},
+                                        headers=bench.headers)
+
+
+def star_file(bench, calls):
+    file_id = bench.make_files(1, 'star-target')[0]
+    return lambda i: bench.client.patch('/api/files/starred', json={'fileId': file_id, 'starred': i % 2 == 0},
+                                        headers=bench.headers)
+
+
+def open_file(bench, calls):
+    file_id = bench.make_files(1, 'open-target')[0]
+    return lambda i: bench.client.post('/api/files/opened', json={'fileId': file_id}, headers=bench.headers)
+
+
+def delete_file(bench, calls):
+    file_ids = bench.make_files(calls, 'delete-target')
+    return lambda i: bench.client.delete(f'/api/files?fileId={file_ids[i]}', headers=bench.headers)
+
+
+def batch_star(bench, calls):
+    file_ids = bench.make_files(100, 'batch-star')
+    return lambda i: bench.client.patch('/api/files/batch/starred',
+                                        json={'fileIds': file_ids, 'starred': i % 2 == 0}, headers=bench.headers)
+
+
+def batch_move(bench, calls):
+    file_ids = bench.make_files(100, 'batch-move')
+    targets = [bench.folder_ids[-1], None]
+    return lambda i: bench.client.patch('/api/files/batch/folder',
+                                        json={'fileIds': file_ids, 'folderId': targets[i % 2]}, headers=bench.headers)
+
+
+def batch_delete(bench, calls):
+    file_ids = bench.make_files(calls * 10, 'batch-delete')
+    return lambda i: bench.client.delete('/api/files/batch', json={'fileIds': file_ids[i * 10:(i + 1) * 10]},
+                                         headers=bench.headers)
+
+
+def delete_all_files(bench, calls):
+    emails = bench.make_users(calls, files=50)
+    return lambda i: bench.client.delete('/api/files?all=true', headers={'X-User-Email': emails[i]})
+
+
+def get_job(bench, calls):
+    email = bench.make_users(1, files=0)[0]
+    job_id = bench.client.delete('/api/files?all=true', headers={'X-User-Email': email}).json['jobId']
+    return lambda i: bench.client.get(f'/api/jobs/{job_id}', headers={'X-User-Email': email})
+
+
+def folders_listing(path):
+    def setup(bench, calls):
+        return lambda i: bench.get(path)
+    return setup
+
+
+def folder_breadcrumbs(bench, calls):
+    return lambda i: bench.get(f'/api/folders/{bench.folder_ids[-1]}/breadcrumbs')
+
+
+def folder_subtree(bench, calls):
+    return lambda i: bench.get(f'/api/folders/{bench.folder_ids[0]}/subtree')
+
+
+def changes_batch(bench, calls):
+    head = bench.get('/api/changes').json['cursor']
+    limit = min(500, head)
+    return lambda i: bench.get(f'/api/changes?since={head - limit}&limit={limit}')
+
+
+def changes_up_to_date(bench, calls):
+    head = bench.get('/api/changes').json['cursor']
+    return lambda i: bench.get(f'/api/changes?since={head}')
+
+
+def create_folder(bench, calls):
+    return lambda i: bench.client.post('/api/folders', json={'name': f'bench-{i}'}, headers=bench.headers)
+
+
+def rename_folder(bench, calls):
+    folder_id = bench.repo.insert_folder(EMAIL, 'rename-target', None)['id']
+    return lambda i: bench.client.patch('/api/folders', json={'folderId': folder_id, 'name': f'renamed-{i}'},
+                                        headers=bench.headers)
+
+
+def delete_folder(bench, calls):
+    folder_ids = []
+    for n in range(calls):
+        folder_id = bench.repo.insert_folder(EMAIL, f'delete-target-{n}', None)['id']
+        bench.repo.insert_folder(EMAIL, 'child', folder_id)
+        bench.make_files(5, f'delete-target-{n}', folder_id)
+        folder_ids.append(folder_id)
+    return lambda i: bench.client.delete(f'/api/folders?folderId={folder_ids[i]}', headers=bench.headers)
+
+
+def delete_account(bench, calls):
+    emails = bench.make_users(calls, files=50)
+    return lambda i: bench.client.delete('/api/account', headers={'X-User-Email': emails[i]})
+
+
+# Reads first: writes change the data version and so the ETags
+SCENARIOS = {
+    'GET /api/files (root)': files_listing(''),
+    'GET /api/files (folder)': files_in_folder,
+    'GET /api/files (page)': files_listing('?limit=100'),
+    'GET /api/files (next page)': files_next_page,
+    'GET /api/files (starred)': files_listing('?starred=true'),
+    'GET /api/files (search)': files_listing('?search=report'),
+    'GET /api/files (stream)': files_listing('?stream=true'),
+    'GET /api/files (304)': files_not_modified,
+    'GET /api/files/recent': files_listing('/recent'),
+    'GET /api/folders': folders_listing('/api/folders'),
+    'GET /api/folders/tree': folders_listing('/api/folders/tree'),
+    'GET /api/folders/tree (depth=1)': folders_listing('/api/folders/tree?depth=1'),
+    'GET /api/folders/<id>/breadcrumbs': folder_breadcrumbs,
+    'GET /api/folders/<id>/subtree': folder_subtree,
+    'GET /api/changes (500 changes)': changes_batch,
+    'GET /api/changes (up to date)': changes_up_to_date,
+    'POST /api/files (10 files)': create_files_json,
+    'POST /api/files (ndjson, 100 files)': create_files_ndjson,
+    'PATCH /api/files': rename_file,
+    'PATCH /api/files/starred': star_file,
+    'POST /api/files/opened': open_file,
+    'DELETE /api/files': delete_file,
+    'PATCH /api/files/batch/starred (100)': batch_star,
+    'PATCH /api/files/batch/folder (100)': batch_move,
+    'DELETE /api/files/batch (10)': batch_delete,
+    'DELETE /api/files?all=true': delete_all_files,
+    'GET /api/jobs/<id>': get_job,
+    'POST /api/folders': create_folder,
+    'PATCH /api/folders': rename_folder,
+    'DELETE /api/folders': delete_folder,
+    'DELETE /api/account': delete_account,
+}
+
+
+def measure(bench, queries, setup, iterations):
+    """Time one scenario; one warm-up call and one traced call are not timed."""
+    request = setup(bench, iterations + 2)
+    response = check(request(0))
+    response.get_data()
+    status = response.status_code
+
+    samples, query_counts = [], []
+    for i in range(1, iterations + 1):
+        before = queries.count
+        started = time.perf_counter()
+        response = request(i)
+        # Streamed bodies are produced while they are read
+        response.get_data()
+        samples.append((time.perf_counter() - started) * 1000)
+        query_counts.append(queries.count - before)
+        check(response)
+
+    tracemalloc.start()
+    response = request(iterations + 1)
+    response.get_data()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    check(response)
+
+    return {
+        'status': status,
+        'p50_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+        'queries': statistics.median(query_counts),
+        'peak_kib': round(peak / 1024, 1),
+        'response_bytes': len(response.get_data()),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Return a description of every regression against the baseline."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result['p50_ms'] > base['p50_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p50 {base['p50_ms']} -> {result['p50_ms']} ms")
+        if result['queries'] > base['queries']:
+            regressions.append(f"{name}: queries {base['queries']} -> {result['queries']}")
+        if result['peak_kib'] > base['peak_kib'] * (1 + tolerance):
+            regressions.append(f"{name}: peak memory {base['peak_kib']} -> {result['peak_kib']} KiB")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=5000, help='files in the benchmark data room')
+    parser.add_argument('--depth', type=int, default=3)
+    parser.add_argument('--fanout', type=int, default=4)
+    parser.add_argument('--starred-ratio', type=float, default=0.1)
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--routes', nargs='+', help='only run routes whose name contains one of these')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='baseline JSON to check the results against')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed relative growth (default 0.5)')
+    args = parser.parse_args()
+
+    # Jobs are only enqueued, so their routes measure the request alone
+    Config.JOB_WORKER_ENABLED = False
+    from app import app
+    from models import db
+    from repository import SQLAlchemyRepository, create_repository_engine, set_repository
+
+    tmp_path = None
+    url = Config.DATABASE_URL
+    if not url:
+        fd, tmp_path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        url = f'sqlite:///{tmp_path}'
+    engine = create_repository_engine(url)
+    if tmp_path:
+        db.metadata.create_all(engine)
+    repo = SQLAlchemyRepository(engine)
+    set_repository(repo)
+
+    generate(engine, users=1, files=args.files, depth=args.depth, fanout=args.fanout,
+             starred_ratio=args.starred_ratio, email_prefix='bench')
+    folder_ids = [folder['id'] for folder in sorted(repo.list_folders(EMAIL), key=lambda f: f['name'])]
+    # Deepest folder last, for breadcrumbs
+    folder_ids.sort(key=lambda folder_id: len(repo.folder_breadcrumbs(EMAIL, folder_id)))
+    bench = Bench(app.test_client(), repo, engine, folder_ids)
+    queries = QueryCounter(engine)
+
+    results = {}
+    print(f"{'route':<40} {'status':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'queries':>7} {'peak KiB':>9}")
+    for name, setup in SCENARIOS.items():
+        if args.routes and not any(pattern in name for pattern in args.routes):
+            continue
+        try:
+            result = results[name] = measure(bench, queries, setup, args.iterations)
+        except ScenarioError as e:
+            # A failing scenario must not become part of the baseline
+            sys.exit(f'{name}: {e}')
+        print(f"{name:<40} {result['status']:>6} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+              f"{result['p99_ms']:>8.2f} {result['queries']:>7} {result['peak_kib']:>9.1f}")
+
+    if tmp_path:
+        os.remove(tmp_path)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'meta': {
+                    'created_at': datetime.utcnow().isoformat(),
+                    'python': platform.python_version(),
+                    'database': engine.dialect.name,
+                    'files': args.files,
+                    'depth': args.depth,
+                    'fanout': args.fanout,
+                    'iterations': args.iterations,
+                },
+                'routes': results,
+            }, f, indent=2)
+        print(f'Wrote {args.output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f)['routes'], args.tolerance)
+        for regression in regressions:
+            print(f'REGRESSION {regression}')
+        if regressions:
+            sys.exit(1)
+        print(f'No regressions against {args.compare}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Benchmark recursive folder deletion: per-folder walk vs. subtree RPC.
+
+Builds synthetic folder trees for a throwaway user in the configured Supabase
+project and deletes them with both strategies, reporting HTTP round trips and
+wall-clock latency for each tree shape.
+
+Usage:
+    python -m benchmarks.folder_delete --depths 1 2 3 --widths 2 5 --files-per-folder 3
+"""
+import argparse
+import time
+from uuid import uuid4
+
+from supabase_client import get_supabase
+from repository import SupabaseRepository
+
+
+class RoundTripCounter:
+    """Count HTTP requests issued by the PostgREST client."""
+
+    def __init__(self, supabase):
+        self.count = 0
+        supabase.postgrest.session.event_hooks['request'].append(self._on_request)
+
+    def _on_request(self, request):
+        self.count += 1
+
+
+def delete_folder_walk(folder_id: str, email: str, supabase):
+    """Previous depth-first implementation, kept here as the baseline."""
+    child_folders_response = supabase.table('folders').select('id').eq('parent_folder_id', folder_id).eq('user_email', email).execute()
+
+    if child_folders_response.data:
+        for child in child_folders_response.data:
+            delete_folder_walk(child['id'], email, supabase)
+
+    supabase.table('files').delete().eq('folder_id', folder_id).eq('user_email', email).execute()
+    supabase.table('folders').delete().eq('parent_folder_id', folder_id).eq('user_email', email).execute()
+    supabase.table('folders').delete().eq('id', folder_id).eq('user_email', email).execute()
+
+
+def build_tree(supabase, email: str, depth: int, width: int, files_per_folder: int):
+    """Insert a tree level by level and return (root_id, folder_count)."""
+    root_id = str(uuid4())
+    folders = [{'id': root_id, 'user_email': email, 'name': 'bench-root', 'parent_folder_id': None}]
+    level = [root_id]
+    for d in range(depth):
+        next_level = []
+        for parent_id in level:
+            for w in range(width):
+                folder_id = str(uuid4())
+                folders.append({'id': folder_id, 'user_email': email, 'name': f'bench-{d}-{w}', 'parent_folder_id': parent_id})
+                next_level.append(folder_id)
+        level = next_level
+
+    # Parents must exist before children, which the generation order guarantees.
+    supabase.table('folders').insert(folders).execute()
+    if files_per_folder:
+        files = [
+            {'user_email': email, 'name': f'file-{i}', 'url': 'https://example.com', 'folder_id': f['id']}
+            for f in folders
+            for i in range(files_per_folder)
+        ]
+        for start in range(0, len(files), 1000):
+            supabase.table('files').insert(files[start:start + 1000]).execute()
+    return root_id, len(folders)
+
+
+def measure(supabase, counter, strategy, email, depth, width, files_per_folder):
+    root_id, folder_count = build_tree(supabase, email, depth, width, files_per_folder)
+    counter.count = 0
+    started = time.perf_counter()
+    strategy(root_id, email, supabase)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return folder_count, counter.count, elapsed_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--depths', type=int, nargs='+', default=[1, 2, 3])
+    parser.add_argument('--widths', type=int, nargs='+', default=[2, 5])
+    parser.add_argument('--files-per-folder', type=int, default=3)
+    parser.add_argument('--max-folders', type=int, default=1000, help='skip shapes larger than this')
+    args = parser.parse_args()
+
+    supabase = get_supabase()
+    counter = RoundTripCounter(supabase)
+    email = f'bench-{uuid4().hex[:8]}@example.com'
+    supabase.table('users').insert({'email': email, 'name': 'Benchmark'}).execute()
+
+    repo = SupabaseRepository(supabase)
+    strategies = [
+        ('walk', delete_folder_walk),
+        ('subtree', lambda folder_id, email, supabase: repo.delete_folder_subtree(email, folder_id)),
+    ]
+    print(f"{'depth':>5} {'width':>5} {'folders':>8} {'strategy':>8} {'trips':>6} {'ms':>10}")
+    try:
+        for depth in args.depths:
+            for width in args.widths:
+                if sum(width ** d for d in range(depth + 1)) > args.max_folders:
+                    continue
+                for name, strategy in strategies:
+                    folder_count, trips, elapsed_ms = measure(
+                        supabase, counter, strategy, email, depth, width, args.files_per_folder
+                    )
+                    print(f'{depth:>5} {width:>5} {folder_count:>8} {name:>8} {trips:>6} {elapsed_ms:>10.1f}')
+    finally:
+        supabase.table('users').delete().eq('email', email).execute()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Compare p50/p99 latency of the Supabase and SQLAlchemy repository backends.
+
+Seeds a throwaway user with files and folders, then times the repository calls
+behind the read and write endpoints. The SQLAlchemy backend runs against
+DATABASE_URL when it is set (e.g. a local Postgres) and against a temporary
+SQLite database otherwise; the Supabase backend needs SUPABASE_URL and
+SUPABASE_SERVICE_ROLE_KEY.
+
+Usage:
+    python -m benchmarks.repository --backends sqlalchemy supabase --files 500 --iterations 200
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from uuid import uuid4
+
+from sqlalchemy import insert
+
+from config import Config
+from models import db
+from repository import SQLAlchemyRepository, SupabaseRepository, create_repository_engine
+from supabase_client import get_supabase
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def make_repository(backend):
+    if backend == 'supabase':
+        repo = SupabaseRepository(get_supabase())
+        seed_user = lambda email: repo.supabase.table('users').insert({'email': email}).execute()
+        return repo, seed_user, None
+
+    tmp_path = None
+    url = Config.DATABASE_URL
+    if not url:
+        tmp_path = tempfile.mktemp(suffix='.db')
+        url = f'sqlite:///{tmp_path}'
+    engine = create_repository_engine(url)
+    if tmp_path:
+        db.metadata.create_all(engine)
+    repo = SQLAlchemyRepository(engine)
+
+    def seed_user(email):
+        with engine.begin() as conn:
+            conn.execute(insert(db.metadata.tables['users']).values(email=email))
+
+    return repo, seed_user, tmp_path
+
+
+def seed(repo, seed_user, email, file_count, folder_count):
+    seed_user(email)
+    folders = [repo.insert_folder(email, f'folder-{i}', None) for i in range(folder_count)]
+    rows = [
+        {
+            'user_email': email,
+            'name': f'document-{i}.pdf',
+            'url': f'https://example.com/{i}',
+            'mime_type': 'application/pdf',
+            'starred': i % 10 == 0,
+            'folder_id': folders[(i // 2) % folder_count]['id'] if folders and i % 2 else None,
+        }
+        for i in range(file_count)
+    ]
+    for start in range(0, len(rows), 500):
+        repo.insert_files(rows[start:start + 500])
+    return folders
+
+
+def operations(repo, email, folders):
+    sample_file = repo.list_files(email, limit=1)[0]
+    folder_id = folders[0]['id'] if folders else None
+    return {
+        'list_files root': lambda: repo.list_files(email),
+        'list_files page': lambda: repo.list_files(email, limit=100),
+        'list_files folder': lambda: repo.list_files(email, folder_id=folder_id),
+        'list_files starred': lambda: repo.list_files(email, starred=True),
+        'search_files': lambda: repo.search_files(email, 'document-1', 50),
+        'list_folders': lambda: repo.list_folders(email),
+        'get_file': lambda: repo.get_file(email, sample_file['id']),
+        'set_starred': lambda: repo.set_starred(email, sample_file['id'], True),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backends', nargs='+', default=['sqlalchemy'], choices=['sqlalchemy', 'supabase'])
+    parser.add_argument('--files', type=int, default=500)
+    parser.add_argument('--folders', type=int, default=20)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'backend':>10} {'operation':>20} {'p50 ms':>9} {'p99 ms':>9}")
+    for backend in args.backends:
+        repo, seed_user, tmp_path = make_repository(backend)
+        email = f'bench-{uuid4().hex[:8]}@example.com'
+        try:
+            folders = seed(repo, seed_user, email, args.files, args.folders)
+            for name, operation in operations(repo, email, folders).items():
+                operation()  # warm up connections and caches
+                samples = []
+                for _ in range(args.iterations):
+                    started = time.perf_counter()
+                    operation()
+                    samples.append((time.perf_counter() - started) * 1000)
+                print(f'{backend:>10} {name:>20} {statistics.median(samples):>9.2f} {percentile(samples, 99):>9.2f}')
+        finally:
+            repo.delete_user(email)
+            if tmp_path:
+                os.remove(tmp_path)
+
+
+if __name__ == '__main__':
+    main()
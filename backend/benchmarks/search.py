@@ -0,0 +1,117 @@
+"""Benchmark file-name search: unindexed ILIKE vs. pg_trgm GIN index.
+
+Creates a synthetic ``files``-shaped temporary table in the Postgres database
+pointed to by DATABASE_URL, then times the ILIKE scan and the ranked
+trigram query for a set of search terms, before and after building the index.
+Nothing outside the session's temporary schema is modified.
+
+Usage:
+    python -m benchmarks.search --rows 1000000 --users 200 --terms inv budget q3 "project x"
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+
+from config import Config
+
+
+WORDS = [
+    'budget', 'invoice', 'report', 'contract', 'minutes', 'roadmap', 'pitch', 'deck',
+    'financials', 'forecast', 'nda', 'term', 'sheet', 'cap', 'table', 'audit',
+    'q1', 'q2', 'q3', 'q4', 'draft', 'final', 'signed', 'summary', 'project', 'x',
+]
+
+ILIKE_SQL = text("""
+    SELECT * FROM bench_files
+    WHERE user_email = :email AND name ILIKE '%' || :term || '%'
+    ORDER BY uploaded_at DESC, id DESC
+    LIMIT :limit
+""")
+
+RANKED_SQL = text("""
+    SELECT * FROM bench_files
+    WHERE user_email = :email AND name ILIKE '%' || :term || '%'
+    ORDER BY (lower(name) = lower(:term)) DESC,
+             (name ILIKE :term || '%') DESC,
+             similarity(name, :term) DESC,
+             uploaded_at DESC, id DESC
+    LIMIT :limit
+""")
+
+
+def populate(conn, rows: int, users: int):
+    conn.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+    conn.execute(text("""
+        CREATE TEMP TABLE bench_files (
+            id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_email text NOT NULL,
+            name text NOT NULL,
+            uploaded_at timestamp NOT NULL
+        )
+    """))
+    # Names are three dictionary words plus a numeric suffix, drawn with a
+    # deterministic hash so that runs are comparable.
+    conn.execute(text("""
+        INSERT INTO bench_files (user_email, name, uploaded_at)
+        SELECT 'user' || (i % :users) || '@example.com',
+               (:words)[1 + abs(hashint4(i)) % array_length(:words, 1)] || ' ' ||
+               (:words)[1 + abs(hashint4(i + 1)) % array_length(:words, 1)] || ' ' ||
+               (:words)[1 + abs(hashint4(i + 2)) % array_length(:words, 1)] || ' ' || (i % 997),
+               now() - (i || ' seconds')::interval
+        FROM generate_series(1, :rows) AS i
+    """), {'rows': rows, 'users': users, 'words': WORDS})
+    conn.execute(text('CREATE INDEX ON bench_files (user_email)'))
+    conn.execute(text('ANALYZE bench_files'))
+
+
+def time_query(conn, sql, params, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def run_terms(conn, label, terms, email, limit, repeat):
+    for term in terms:
+        params = {'email': email, 'term': term, 'limit': limit}
+        ilike_ms = time_query(conn, ILIKE_SQL, params, repeat)
+        ranked_ms = time_query(conn, RANKED_SQL, params, repeat)
+        print(f'{label:>10} {term!r:>14} {ilike_ms:>10.2f} {ranked_ms:>10.2f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=1, help='rows are spread evenly across users')
+    parser.add_argument('--terms', nargs='+', default=['inv', 'budget', 'q3 final', 'signed nda'])
+    parser.add_argument('--limit', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if not Config.DATABASE_URL:
+        raise SystemExit('DATABASE_URL (or DB_* variables) must point at a Postgres database')
+
+    engine = create_engine(Config.DATABASE_URL)
+    with engine.connect() as conn:
+        started = time.perf_counter()
+        populate(conn, args.rows, args.users)
+        print(f'populated {args.rows} rows in {time.perf_counter() - started:.1f}s')
+
+        email = 'user0@example.com'
+        print(f"{'index':>10} {'term':>14} {'ilike ms':>10} {'ranked ms':>10}")
+        run_terms(conn, 'none', args.terms, email, args.limit, args.repeat)
+
+        started = time.perf_counter()
+        conn.execute(text('CREATE INDEX ON bench_files USING gin (name gin_trgm_ops)'))
+        conn.execute(text('ANALYZE bench_files'))
+        print(f'built trigram index in {time.perf_counter() - started:.1f}s')
+        run_terms(conn, 'trigram', args.terms, email, args.limit, args.repeat)
+        conn.rollback()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Benchmark JSON encoding of a 50k-file listing.
+
+First encodes the listing payload in memory: the previous per-row dict
+conversion with indented and compact stdlib output, then the precompiled
+row serializer with the stdlib and orjson providers. Then serves the same
+listing through GET /api/files on the SQLAlchemy backend with each provider
+and times the whole request. Runs against a temporary SQLite database.
+
+Usage:
+    python -m benchmarks.serialization --files 50000
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from flask import Flask
+
+from config import Config
+from serialization import OrjsonProvider, Rows, StdlibJSONProvider, orjson
+
+
+def legacy_file_to_camel(f):
+    """The per-row conversion GET /api/files used before the generated serializers."""
+    return {
+        'id': f['id'],
+        'name': f['name'],
+        'url': f['url'],
+        'iconUrl': f.get('icon_url'),
+        'mimeType': f.get('mime_type'),
+        'starred': f.get('starred', False),
+        'lastEditedDate': f.get('last_edited'),
+        'uploadedAt': f.get('uploaded_at'),
+        'folderId': f.get('folder_id'),
+    }
+
+
+def timed(call, repeat):
+    """Median milliseconds of call over repeat runs, and the size of its last result."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = call()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), len(result)
+
+
+def encode_benchmarks(rows, repeat):
+    from models import File
+
+    app = Flask('bench')
+    stdlib = StdlibJSONProvider(app)
+    cases = {
+        'legacy dicts, indented (old default)':
+            lambda: json.dumps({'files': [legacy_file_to_camel(f) for f in rows]}, indent=2).encode(),
+        'legacy dicts, compact':
+            lambda: json.dumps({'files': [legacy_file_to_camel(f) for f in rows]}, separators=(',', ':')).encode(),
+        'generated, stdlib provider':
+            lambda: stdlib.dumps({'files': Rows(rows, File.serializer)}).encode(),
+    }
+    if orjson is not None:
+        provider = OrjsonProvider(app)
+        cases['generated, orjson provider'] = lambda: provider._encode({'files': Rows(rows, File.serializer)})
+    return {name: timed(call, repeat) for name, call in cases.items()}
+
+
+def endpoint_benchmarks(files, repeat):
+    Config.JOB_WORKER_ENABLED = False
+    from app import app
+    from benchmarks.datagen import generate
+    from models import db
+    from repository import SQLAlchemyRepository, create_repository_engine, set_repository
+
+    fd, tmp_path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    engine = create_repository_engine(f'sqlite:///{tmp_path}')
+    db.metadata.create_all(engine)
+    repo = SQLAlchemyRepository(engine)
+    set_repository(repo)
+    # depth=0 puts every file in the root listing
+    email = generate(engine, files=files, depth=0)[0]
+    client = app.test_client()
+    headers = {'X-User-Email': email}
+
+    providers = {'stdlib': StdlibJSONProvider(app)}
+    if orjson is not None:
+        providers['orjson'] = OrjsonProvider(app)
+    results = {}
+    for name, provider in providers.items():
+        app.json = provider
+        results[f'GET /api/files, {name}'] = timed(lambda: client.get('/api/files', headers=headers).data, repeat)
+        results[f'GET /api/files?stream=true, {name}'] = timed(
+            lambda: client.get('/api/files?stream=true', headers=headers).get_data(), repeat)
+
+    os.remove(tmp_path)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rows = [
+        {
+            'id': f'00000000-0000-4000-8000-{n:012d}',
+            'user_email': 'bench@example.com',
+            'name': f'quarterly-report-{n}.pdf',
+            'url': f'https://drive.google.com/file/d/{n:032x}/view',
+            'icon_url': 'https://drive-thirdparty.googleusercontent.com/16/type/application/pdf',
+            'mime_type': 'application/pdf',
+            'starred': n % 10 == 0,
+            'uploaded_at': '2025-06-01T12:00:00.123456',
+            'last_interacted': '2025-06-02T08:30:00.654321',
+            'folder_id': None,
+        }
+        for n in range(args.files)
+    ]
+
+    print(f'{args.files} files, median of {args.repeat} runs')
+    print(f"{'case':<45} {'ms':>9} {'bytes':>11}")
+    for section in (encode_benchmarks(rows, args.repeat), endpoint_benchmarks(args.files, args.repeat)):
+        for name, (ms, size) in section.items():
+            print(f'{name:<45} {ms:>9.1f} {size:>11}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+"""Flask CLI commands for database maintenance."""
+import json
+from datetime import datetime, timedelta
+from uuid import UUID
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import case, delete, func, insert, select, text, update
+from sqlalchemy.exc import DBAPIError
+
+from jobs import JobWorker
+from models import Change, File, Folder, FolderStats, User, db
+from repository import SQLAlchemyRepository
+
+
+# Sample arguments for the statements EXPLAINed by check-query-plans
+EXPLAIN_EMAIL = 'explain@example.com'
+EXPLAIN_FOLDER_ID = UUID('00000000-0000-0000-0000-000000000000')
+EXPLAIN_FILE_ID = UUID('00000000-0000-0000-0000-000000000001')
+EXPLAIN_TIME = datetime(2025, 1, 1)
+
+
+def endpoint_queries(repo, config):
+    """The statements each endpoint and job sends, built by the SQLAlchemy repository itself.
+
+    Keyed by endpoint and query purpose. The Supabase backend sends the
+    same queries through PostgREST, except for those in rpc_calls().
+    """
+    email, folder_id, file_id = EXPLAIN_EMAIL, EXPLAIN_FOLDER_ID, EXPLAIN_FILE_ID
+    page = config['FILES_PAGE_DEFAULT_LIMIT'] + 1
+    chunk = config['JOB_CHUNK_SIZE']
+    return {
+        'GET /api/files (root)': repo.list_files_query(email, None, limit=page),
+        'GET /api/files (folder)': repo.list_files_query(email, folder_id, limit=page),
+        'GET /api/files (folder, next page)': repo.list_files_query(
+            email, folder_id, cursor=(EXPLAIN_TIME.isoformat(), file_id), limit=page),
+        'GET /api/files (starred)': repo.list_files_query(email, starred=True, limit=page),
+        'GET /api/files (search)': repo.search_files_query(email, 'report', config['FILES_SEARCH_DEFAULT_LIMIT']),
+        'GET /api/files (search, unranked)': repo.list_files_query(
+            email, search='report', limit=config['FILES_SEARCH_DEFAULT_LIMIT']),
+        'GET /api/files/recent': repo.list_recent_files_query(email, config['FILES_RECENT_DEFAULT_LIMIT']),
+        # Child folders in GET /api/files come from the cached folder list as well
+        'GET /api/folders, GET /api/folders/tree, GET /api/files (child folders)': repo.list_folders_query(email),
+        'POST /api/files (validate folder)': repo.get_folder_query(email, folder_id),
+        'PATCH /api/files (rename)': repo.rename_file_statement(email, file_id, 'report'),
+        'DELETE /api/files (single)': repo.delete_file_statement(email, file_id),
+        'PATCH /api/files/batch/starred': repo.update_files_statement(email, [file_id], starred=True),
+        'PATCH /api/files/batch/folder': repo.update_files_statement(email, [file_id], folder_id=folder_id),
+        'DELETE /api/files/batch': repo.delete_files_statement(email, [file_id]),
+        'write-behind flush (PATCH /api/files/starred, POST /api/files/opened)': repo.apply_file_updates_statement(
+            [{'id': file_id, 'user_email': email, 'starred': True, 'last_interacted': EXPLAIN_TIME}]),
+        'PATCH /api/folders (rename)': repo.rename_folder_statement(email, folder_id, 'docs'),
+        'DELETE /api/folders (subtree)': repo.folder_subtree_ids_query(email, folder_id),
+        'DELETE /api/folders (files in subtree)': repo.delete_subtree_files_statement(email, [folder_id]),
+        'DELETE /api/folders (folders in subtree)': repo.delete_subtree_folders_statement(email, [folder_id]),
+        'GET /api/folders/<id>/breadcrumbs': repo.folder_breadcrumbs_query(email, folder_id),
+        'GET /api/folders/<id>/subtree': repo.folder_subtree_query(email, folder_id),
+        'GET /api/jobs/<id>': repo.get_job_query(email, file_id),
+        'job worker (claim)': repo.claim_job_query(EXPLAIN_TIME, config['JOB_STALE_AFTER']),
+        'delete_all/delete_account job (files chunk)': repo.delete_chunk_statement(File.__table__, email, chunk),
+        'delete_all/delete_account job (folders chunk)': repo.delete_chunk_statement(Folder.__table__, email, chunk),
+        'GET /api/changes (bounds)': repo.get_change_bounds_query(email),
+        'GET /api/changes': repo.list_changes_query(email, 42, config['CHANGES_PAGE_DEFAULT_LIMIT']),
+        'GET /api/changes (files)': repo.get_files_by_ids_query(email, [file_id]),
+        'GET /api/changes (folders)': repo.get_folders_by_ids_query(email, [folder_id]),
+        'DELETE /api/account': repo.delete_user_statement(email),
+    }
+
+
+def rpc_calls(config):
+    """The RPC functions the Supabase backend calls, with sample arguments, keyed like endpoint_queries()."""
+    email, folder_id = EXPLAIN_EMAIL, str(EXPLAIN_FOLDER_ID)
+    updates = [{'id': str(EXPLAIN_FILE_ID), 'user_email': email, 'starred': True,
+                'last_interacted': EXPLAIN_TIME.isoformat()}]
+    return {
+        'GET /api/files (search, rpc)': ('search_files', {
+            'p_user_email': email, 'p_term': 'report', 'p_limit': config['FILES_SEARCH_DEFAULT_LIMIT']}),
+        'write-behind flush (rpc)': ('apply_file_updates', {'p_updates': json.dumps(updates)}),
+        'DELETE /api/folders (rpc)': ('delete_folder_subtree', {'p_folder_id': folder_id, 'p_user_email': email}),
+        'GET /api/folders/<id>/breadcrumbs (rpc)': (
+            'folder_breadcrumbs', {'p_folder_id': folder_id, 'p_user_email': email}),
+        'GET /api/folders/<id>/subtree (rpc)': ('folder_subtree', {'p_folder_id': folder_id, 'p_user_email': email}),
+        'job worker (claim, rpc)': ('claim_job', {'p_stale_seconds': config['JOB_STALE_AFTER']}),
+        'delete_all/delete_account job (chunk, rpc)': (
+            'delete_user_data_chunk', {'p_user_email': email, 'p_limit': config['JOB_CHUNK_SIZE']}),
+        'data version bump (rpc)': ('bump_data_version', {'p_user_email': email}),
+    }
+
+
+def rpc_statement(function, args):
+    """A call of an RPC function with named arguments, the way PostgREST calls it."""
+    params = ', '.join(f'{name} => :{name}' for name in args)
+    return text(f'SELECT * FROM {function}({params})').bindparams(**args)
+
+
+def plans_from_notices(notices):
+    """Return the plans auto_explain sent as JSON notices, one per statement that ran."""
+    decoder = json.JSONDecoder()
+    plans = []
+    for notice in notices:
+        start = notice.find('{')
+        if start != -1:
+            plans.append(decoder.raw_decode(notice, start)[0]['Plan'])
+    return plans
+
+
+def compile_statement(statement, dialect):
+    """Render a statement as SQL with its arguments inlined, ready to run without parameters."""
+    sql = str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+    if dialect.paramstyle in ('format', 'pyformat'):
+        # Escaped for the driver's parameter substitution, which does not run without parameters
+        sql = sql.replace('%%', '%')
+    return sql
+
+
+def find_seq_scans(plan):
+    """Return the relation names of all Seq Scan nodes in an EXPLAIN JSON plan."""
+    found = []
+    if plan.get('Node Type') == 'Seq Scan':
+        found.append(plan.get('Relation Name'))
+    for child in plan.get('Plans', []):
+        found.extend(find_seq_scans(child))
+    return found
+
+
+@click.command('check-query-plans')
+@click.option('--rpc/--no-rpc', default=True,
+              help='Also run the RPC functions under auto_explain (needs permission to LOAD it).')
+@with_appcontext
+def check_query_plans(rpc):
+    """EXPLAIN every endpoint query and RPC function and fail if any of them needs a seq scan.
+
+    RPC functions cannot be EXPLAINed from outside, so they are called with
+    sample arguments while auto_explain reports the plan of every statement
+    they run. Everything happens in one transaction that is rolled back.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        raise click.ClickException('check-query-plans needs DATABASE_URL to point at Postgres')
+
+    failures = []
+
+    def report(name, plans):
+        seq_scans = [relation for plan in plans for relation in find_seq_scans(plan)]
+        if not plans:
+            failures.append(name)
+            click.echo(f'FAIL  {name}: no plan was logged')
+        elif seq_scans:
+            failures.append(name)
+            click.echo(f"FAIL  {name}: seq scan on {', '.join(seq_scans)}")
+        else:
+            click.echo(f'ok    {name}')
+
+    with db.engine.connect() as conn:
+        # With seq scans priced out, the planner only picks one when no index fits
+        conn.execute(text('SET LOCAL enable_seqscan = off'))
+        for name, statement in endpoint_queries(SQLAlchemyRepository(db.engine), current_app.config).items():
+            sql = compile_statement(statement, conn.dialect)
+            plan = conn.exec_driver_sql(
+                f'EXPLAIN (FORMAT JSON) {sql}', execution_options={'no_parameters': True},
+            ).scalar()[0]['Plan']
+            report(name, [plan])
+
+        if rpc:
+            try:
+                conn.execute(text("LOAD 'auto_explain'"))
+            except DBAPIError as e:
+                raise click.ClickException(f'Could not load auto_explain ({e.orig}); rerun with --no-rpc') from e
+            for setting in ('auto_explain.log_min_duration = 0', 'auto_explain.log_nested_statements = on',
+                            'auto_explain.log_format = json', 'auto_explain.log_level = notice',
+                            'client_min_messages = notice'):
+                conn.execute(text(f'SET LOCAL {setting}'))
+            notices = conn.connection.dbapi_connection.notices
+            for name, (function, args) in rpc_calls(current_app.config).items():
+                del notices[:]
+                conn.execute(rpc_statement(function, args)).all()
+                report(name, plans_from_notices(notices))
+        conn.rollback()
+
+    if failures:
+        raise click.ClickException(f'{len(failures)} endpoint queries fall back to a seq scan or logged no plan')
+
+
+@click.command('run-jobs')
+@click.option('--once', is_flag=True, help='Run the jobs that are due now, then exit.')
+@with_appcontext
+def run_jobs(once):
+    """Run background jobs in the foreground (e.g. with JOB_WORKER_ENABLED=false)."""
+    worker = JobWorker()
+    if once:
+        click.echo(f'Ran {worker.run_pending()} jobs')
+        return
+    click.echo(f'Polling for jobs every {worker.poll_interval}s')
+    worker.run_forever()
+
+
+@click.command('reconcile-folder-stats')
+@with_appcontext
+def reconcile_folder_stats():
+    """Rebuild folder_stats from the files table and report drifted folders."""
+    files, stats = File.__table__, FolderStats.__table__
+    actual = (
+        select(
+            files.c.folder_id,
+            func.count().label('file_count'),
+            func.sum(case((files.c.starred, 1), else_=0)).label('starred_count'),
+            func.max(files.c.last_interacted).label('last_modified'),
+        )
+        .where(files.c.folder_id.is_not(None))
+        .group_by(files.c.folder_id)
+    )
+
+    with db.engine.begin() as conn:
+        if conn.dialect.name == 'postgresql':
+            # Holds off the counter triggers of concurrent file writes until the rebuild commits
+            conn.execute(text('LOCK TABLE folder_stats IN EXCLUSIVE MODE'))
+        stored = {
+            row.folder_id: (row.file_count, row.starred_count)
+            for row in conn.execute(select(stats.c.folder_id, stats.c.file_count, stats.c.starred_count))
+        }
+        expected = {row.folder_id: (row.file_count, row.starred_count) for row in conn.execute(actual)}
+        drifted = sum(
+            1 for folder_id in stored.keys() | expected.keys()
+            if stored.get(folder_id, (0, 0)) != expected.get(folder_id, (0, 0))
+        )
+
+        conn.execute(delete(stats))
+        conn.execute(insert(stats).from_select(['folder_id', 'file_count', 'starred_count', 'last_modified'], actual))
+
+    click.echo(f'Rebuilt counters for {len(expected)} folders; {drifted} had drifted')
+
+
+@click.command('prune-changes')
+@click.option('--days', type=int, default=None, help='Days of changes to keep (default: CHANGES_RETENTION_DAYS).')
+@with_appcontext
+def prune_changes(days):
+    """Delete old change log entries; clients with older cursors get 410 from /api/changes."""
+    if days is None:
+        days = current_app.config['CHANGES_RETENTION_DAYS']
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    changes, users = Change.__table__, User.__table__
+    expired = changes.c.changed_at < cutoff
+    latest_expired = (
+        select(func.max(changes.c.seq))
+        .where(changes.c.user_email == users.c.email, expired)
+        .scalar_subquery()
+    )
+    floor = select(users.c.changes_floor).where(users.c.email == changes.c.user_email).scalar_subquery()
+
+    with db.engine.begin() as conn:
+        # Raise the floor first, then drop everything at or below it, so no
+        # entry above a floor is ever missing
+        conn.execute(
+            update(users)
+            .where(users.c.email.in_(select(changes.c.user_email).where(expired)))
+            .values(changes_floor=latest_expired)
+        )
+        deleted = conn.execute(delete(changes).where(changes.c.seq <= floor)).rowcount
+
+    click.echo(f'Pruned {deleted} changes older than {days} days')
@@ -0,0 +1,155 @@
+"""Negotiated response compression (gzip, brotli, zstd).
+
+compress_response runs as an after_request hook. It picks the encoding the
+client accepts with the highest q-value, preferring earlier entries of
+COMPRESSION_ENCODINGS on ties. br and zstd are only offered when the brotli and
+zstandard packages are installed. Bodies smaller than COMPRESSION_MIN_SIZE stay
+as they are. Streamed responses are compressed chunk by chunk and flushed after
+every chunk, so clients still receive each chunk as soon as it is produced.
+A strong ETag gets the coding appended ("<tag>-gzip"), so the identity and
+each encoded body keep distinct validators.
+"""
+import zlib
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # optional: br is not offered without it
+    brotli = None
+try:
+    import zstandard
+except ImportError:  # optional: zstd is not offered without it
+    zstandard = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/plain', 'text/html', 'text/csv'}
+
+
+class GzipStream:
+    def __init__(self, level):
+        # wbits 31: zlib stream with a gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliStream:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ZstdStream:
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+# Content-Encoding -> (stream class, config key of its level)
+ENCODINGS = {'gzip': (GzipStream, 'COMPRESSION_GZIP_LEVEL')}
+if brotli is not None:
+    ENCODINGS['br'] = (BrotliStream, 'COMPRESSION_BROTLI_QUALITY')
+if zstandard is not None:
+    ENCODINGS['zstd'] = (ZstdStream, 'COMPRESSION_ZSTD_LEVEL')
+
+
+def coded_etag(etag, encoding):
+    """ETag of the encoded representation; strong validators must differ per byte stream."""
+    return f'{etag}-{encoding}'
+
+
+def create_stream(encoding, level):
+    return ENCODINGS[encoding][0](level)
+
+
+def compress(encoding, level, data):
+    """Compress a whole body in one go."""
+    stream = create_stream(encoding, level)
+    return stream.compress(data) + stream.finish()
+
+
+def compress_chunks(encoding, level, chunks):
+    """Compress an iterable of chunks, flushing after each non-empty chunk."""
+    stream = create_stream(encoding, level)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            if chunk:
+                yield stream.compress(chunk) + stream.flush()
+        yield stream.finish()
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def negotiate(accept_encodings, preference):
+    """Return the accepted encoding with the highest q-value (ties: preference order), or None."""
+    best, best_quality = None, 0
+    for encoding in preference:
+        if encoding not in ENCODINGS:
+            continue
+        quality = accept_encodings[encoding]
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress_response(response):
+    """after_request hook: compress the response if the client accepts it and it is worth it."""
+    config = current_app.config
+    if not config['COMPRESSION_ENABLED'] or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+    if (
+        request.method == 'HEAD'
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or 'Content-Encoding' in response.headers
+    ):
+        return response
+    encoding = negotiate(request.accept_encodings, config['COMPRESSION_ENCODINGS'])
+    if encoding is None:
+        return response
+    level = config[ENCODINGS[encoding][1]]
+
+    if response.is_streamed:
+        if not config['COMPRESSION_STREAMING']:
+            return response
+        response.response = compress_chunks(encoding, level, response.response)
+        response.direct_passthrough = False
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < config['COMPRESSION_MIN_SIZE']:
+            return response
+        response.set_data(compress(encoding, level, data))
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(coded_etag(etag, encoding))
+    return response
@@ -0,0 +1,61 @@
+"""Bounded thread pool for issuing independent I/O-bound queries concurrently."""
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from flask import current_app, has_app_context
+
+from config import Config
+
+
+_executor: ThreadPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor | None:
+    """Get or create the per-process executor; None if fan-out is disabled.
+
+    Created lazily so that each gunicorn worker gets its own pool after fork.
+    """
+    global _executor
+    if Config.QUERY_FANOUT_WORKERS < 1:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=Config.QUERY_FANOUT_WORKERS,
+                    thread_name_prefix='query-fanout',
+                )
+    return _executor
+
+
+def _with_app_context(call):
+    """Wrap call so that it runs inside the caller's Flask app context and context variables."""
+    context = contextvars.copy_context()
+    if not has_app_context():
+        return lambda: context.run(call)
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            return call()
+    return lambda: context.run(run)
+
+
+def gather(*calls):
+    """Run zero-argument callables concurrently and return their results in order.
+
+    The last call runs on the calling thread, so a request needs one fewer pool
+    slot than it has calls. All calls finish before the first error is raised.
+    """
+    executor = get_executor()
+    if executor is None or len(calls) < 2:
+        return [call() for call in calls]
+
+    futures = [executor.submit(_with_app_context(call)) for call in calls[:-1]]
+    try:
+        last_result = calls[-1]()
+    finally:
+        wait(futures)
+    return [future.result() for future in futures] + [last_result]
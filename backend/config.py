@@ -1,5 +1,6 @@
 """Configuration settings for Flask application."""
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -31,8 +32,34 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ENGINE_OPTIONS = {'pool_pre_ping': True, 'pool_recycle': 300}
     
+    # Data-access backend for API routes: 'supabase' (PostgREST over HTTPS) or
+    # 'sqlalchemy' (direct, pooled connections to SQLALCHEMY_DATABASE_URI)
+    DATA_BACKEND = os.environ.get('DATA_BACKEND', 'supabase')
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '5'))
+    DB_POOL_MAX_OVERFLOW = int(os.environ.get('DB_POOL_MAX_OVERFLOW', '10'))
+    # Background jobs (jobs.py): a polling worker thread per process unless disabled,
+    # in which case run them with `flask run-jobs`
+    JOB_WORKER_ENABLED = os.environ.get('JOB_WORKER_ENABLED', 'true').lower() == 'true'
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', '2'))
+    JOB_CHUNK_SIZE = int(os.environ.get('JOB_CHUNK_SIZE', '1000'))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '5'))
+    # Seconds before the first retry; doubles with every further attempt
+    JOB_RETRY_DELAY = int(os.environ.get('JOB_RETRY_DELAY', '10'))
+    # A running job without a progress update for this many seconds is retaken
+    JOB_STALE_AFTER = int(os.environ.get('JOB_STALE_AFTER', '300'))
+    # Threads per worker for running independent queries of one request in parallel (0 disables)
+    QUERY_FANOUT_WORKERS = int(os.environ.get('QUERY_FANOUT_WORKERS', '8'))
+    # Per-user folder tree cache (users kept, seconds)
+    FOLDER_CACHE_SIZE = int(os.environ.get('FOLDER_CACHE_SIZE', '1024'))
+    FOLDER_CACHE_TTL = int(os.environ.get('FOLDER_CACHE_TTL', '30'))
+    
     NEXTAUTH_SECRET = os.environ.get('NEXTAUTH_SECRET')
     NEXTAUTH_URL = os.environ.get('NEXTAUTH_URL', 'http://localhost:3000')
+    # Verified session tokens are cached until their exp (capped at the max TTL)
+    AUTH_TOKEN_CACHE_SIZE = int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', '1024'))
+    AUTH_TOKEN_CACHE_MAX_TTL = int(os.environ.get('AUTH_TOKEN_CACHE_MAX_TTL', '300'))
+    # Legacy: accept the X-User-Email header from clients that send no session token
+    AUTH_TRUST_USER_EMAIL_HEADER = os.environ.get('AUTH_TRUST_USER_EMAIL_HEADER', 'true').lower() == 'true'
     # Parse CORS_ORIGINS from comma-separated string, strip whitespace and trailing slashes
     cors_origins_str = os.environ.get('CORS_ORIGINS', 'http://localhost:3000')
     CORS_ORIGINS = [
@@ -40,7 +67,75 @@ class Config:
         for origin in cors_origins_str.split(',') 
         if origin.strip()
     ]
-    JSONIFY_PRETTYPRINT_REGULAR = True
+    # JSON encoding (serialization.py): 'orjson', 'stdlib', or 'auto' (orjson when installed)
+    JSON_PROVIDER = os.environ.get('JSON_PROVIDER', 'auto')
+    # Indented JSON responses for reading them by hand; compact otherwise
+    JSON_PRETTY = os.environ.get('JSON_PRETTY', 'false').lower() == 'true'
+    # Logging (logs.py): 'json' lines or 'text'; records beyond LOG_QUEUE_SIZE waiting to be written are
+    # dropped, and repeats of one log call within LOG_DEDUPE_WINDOW seconds are suppressed (0 disables)
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+    LOG_DEDUPE_WINDOW = float(os.environ.get('LOG_DEDUPE_WINDOW', '10'))
+    # Response compression (compression.py): encodings in order of preference (br and zstd need
+    # the brotli and zstandard packages), bodies below COMPRESSION_MIN_SIZE bytes are sent as they are
+    COMPRESSION_ENABLED = os.environ.get('COMPRESSION_ENABLED', 'true').lower() == 'true'
+    COMPRESSION_ENCODINGS = [
+        encoding.strip()
+        for encoding in os.environ.get('COMPRESSION_ENCODINGS', 'zstd,br,gzip').split(',')
+        if encoding.strip()
+    ]
+    COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+    COMPRESSION_GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', '6'))
+    COMPRESSION_BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', '4'))
+    COMPRESSION_ZSTD_LEVEL = int(os.environ.get('COMPRESSION_ZSTD_LEVEL', '3'))
+    # Compress streamed responses (e.g. ?stream=true) chunk by chunk
+    COMPRESSION_STREAMING = os.environ.get('COMPRESSION_STREAMING', 'true').lower() == 'true'
+    # Request profiling (profiling.py): requests sending X-Profile: <PROFILE_TOKEN>, plus a random
+    # PROFILE_SAMPLE_RATE fraction of all requests; off when neither is set
+    PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN')
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+    # 'sampling' (collapsed stacks for flamegraphs) or 'cprofile' (pstats)
+    PROFILE_MODE = os.environ.get('PROFILE_MODE', 'sampling')
+    PROFILE_INTERVAL_MS = float(os.environ.get('PROFILE_INTERVAL_MS', '5'))
+    PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'dataroom-profiles'))
+    PROFILE_MAX_FILES = int(os.environ.get('PROFILE_MAX_FILES', '500'))
+    # Bearer token required by /metrics; open when unset (keep it off the public network then)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # GET /api/files keyset pagination and streaming
+    FILES_PAGE_DEFAULT_LIMIT = int(os.environ.get('FILES_PAGE_DEFAULT_LIMIT', '100'))
+    FILES_PAGE_MAX_LIMIT = int(os.environ.get('FILES_PAGE_MAX_LIMIT', '1000'))
+    FILES_STREAM_BATCH_SIZE = int(os.environ.get('FILES_STREAM_BATCH_SIZE', '500'))
+    # Ranked pg_trgm search; set to false to use the plain ILIKE query
+    FILES_SEARCH_RANKED = os.environ.get('FILES_SEARCH_RANKED', 'true').lower() == 'true'
+    FILES_SEARCH_DEFAULT_LIMIT = int(os.environ.get('FILES_SEARCH_DEFAULT_LIMIT', '50'))
+    # Rows per INSERT for NDJSON streaming imports (POST /api/files)
+    FILES_IMPORT_CHUNK_SIZE = int(os.environ.get('FILES_IMPORT_CHUNK_SIZE', '500'))
+    # Maximum number of file IDs accepted by one batch request
+    FILES_BATCH_MAX_ITEMS = int(os.environ.get('FILES_BATCH_MAX_ITEMS', '1000'))
+    FILES_RECENT_DEFAULT_LIMIT = int(os.environ.get('FILES_RECENT_DEFAULT_LIMIT', '20'))
+    
+    # Write-behind buffer for file opens and star toggles: seconds between batched
+    # UPDATEs, and the number of pending files that triggers an early one.
+    # Disabled, every update is written before the request returns.
+    WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND_ENABLED', 'true').lower() == 'true'
+    WRITE_BEHIND_FLUSH_INTERVAL = float(os.environ.get('WRITE_BEHIND_FLUSH_INTERVAL', '1'))
+    WRITE_BEHIND_MAX_PENDING = int(os.environ.get('WRITE_BEHIND_MAX_PENDING', '1000'))
+    
+    # GET /api/changes batch size, and how long `flask prune-changes` keeps change log entries
+    CHANGES_PAGE_DEFAULT_LIMIT = int(os.environ.get('CHANGES_PAGE_DEFAULT_LIMIT', '500'))
+    CHANGES_PAGE_MAX_LIMIT = int(os.environ.get('CHANGES_PAGE_MAX_LIMIT', '1000'))
+    CHANGES_RETENTION_DAYS = int(os.environ.get('CHANGES_RETENTION_DAYS', '30'))
+    # GET /api/events: seconds between keep-alive comments, between reads of the
+    # change heads written by other processes, and before a stream is closed
+    # (clients reconnect with Last-Event-ID after SSE_RETRY_MS)
+    SSE_HEARTBEAT_INTERVAL = float(os.environ.get('SSE_HEARTBEAT_INTERVAL', '15'))
+    SSE_POLL_INTERVAL = float(os.environ.get('SSE_POLL_INTERVAL', '2'))
+    SSE_MAX_DURATION = float(os.environ.get('SSE_MAX_DURATION', '300'))
+    SSE_RETRY_MS = int(os.environ.get('SSE_RETRY_MS', '3000'))
+    # Notifications held per stream for a slow client; the oldest are dropped first
+    SSE_BUFFER_SIZE = int(os.environ.get('SSE_BUFFER_SIZE', '64'))
 
 
 class DevelopmentConfig(Config):
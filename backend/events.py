@@ -0,0 +1,144 @@
+"""In-process pub/sub of per-user change notifications for Server-Sent Events.
+
+A notification carries the user's change log head (users.change_seq); clients
+then fetch the deltas from GET /api/changes. Heads only grow, so a later
+notification supersedes every earlier one, and dropping the oldest entries of
+a full per-stream buffer loses nothing.
+
+Mutating routes publish through mark_changed, which wakes the hub thread to
+read the new heads of those users at once. Writes made by other gunicorn
+workers or by background jobs are not published here; the hub also re-reads
+the heads of all subscribed users every SSE_POLL_INTERVAL seconds, which is
+one query per process however many streams are open.
+"""
+import logging
+import threading
+import time
+from collections import deque
+
+from config import Config
+from metrics import SSE_EVENTS_DROPPED, SSE_STREAMS
+from repository import get_repository
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """One open stream: the heads not yet sent, in a bounded buffer."""
+
+    def __init__(self, email, buffer_size):
+        self.email = email
+        self.cursor = None
+        self._events = deque(maxlen=buffer_size)
+        self._cond = threading.Condition()
+
+    def advance(self, head, notify=True):
+        """Move to head if it is newer, queueing a notification unless notify is False."""
+        with self._cond:
+            if self.cursor is not None and head <= self.cursor:
+                return
+            self.cursor = head
+            if notify:
+                if len(self._events) == self._events.maxlen:
+                    SSE_EVENTS_DROPPED.inc()
+                self._events.append(head)
+                self._cond.notify()
+
+    def wait(self, timeout):
+        """Return the queued heads, waiting up to timeout for one; empty on timeout."""
+        with self._cond:
+            if not self._events:
+                self._cond.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            return events
+
+
+class ChangeHub:
+    """Tracks open subscriptions per user and feeds them new change log heads."""
+
+    def __init__(self, repo=None, poll_interval=None):
+        self.repo = repo
+        self.poll_interval = Config.SSE_POLL_INTERVAL if poll_interval is None else poll_interval
+        self._subscriptions = {}
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def subscribe(self, email, buffer_size=None):
+        subscription = Subscription(email, buffer_size or Config.SSE_BUFFER_SIZE)
+        with self._lock:
+            self._subscriptions.setdefault(email, set()).add(subscription)
+        SSE_STREAMS.inc()
+        self.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.email)
+            if subscriptions is not None and subscription in subscriptions:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.email]
+                SSE_STREAMS.dec()
+
+    def publish(self, email):
+        """Note that the user's data changed; their streams in this process hear of it right away."""
+        if email not in self._subscriptions:
+            return
+        with self._lock:
+            self._pending.add(email)
+        self._wake.set()
+
+    def deliver(self, heads):
+        """Advance the subscriptions of each user in heads ({email: head})."""
+        with self._lock:
+            targets = [(sub, heads[email]) for email, subs in self._subscriptions.items() if email in heads for sub in subs]
+        for subscription, head in targets:
+            subscription.advance(head)
+
+    def poll(self, emails):
+        if emails:
+            repo = self.repo or get_repository()
+            self.deliver(repo.get_change_heads(list(emails)))
+
+    def start(self):
+        """Start the hub thread if it is not running yet."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self.run_forever, name='change-hub', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run_forever(self):
+        """Read heads for published users when woken, and for all subscribed users every interval."""
+        last_full_poll = time.monotonic()
+        while not self._stopped.is_set():
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            now = time.monotonic()
+            with self._lock:
+                if now - last_full_poll >= self.poll_interval:
+                    emails = set(self._subscriptions)
+                    last_full_poll = now
+                else:
+                    emails = self._pending & self._subscriptions.keys()
+                self._pending = set()
+            try:
+                self.poll(emails)
+            except Exception:
+                logger.exception('Error polling change heads')
+
+
+hub = ChangeHub()
@@ -0,0 +1,97 @@
+"""In-process, per-user cache of folder trees.
+
+Each entry is a snapshot of all of a user's folders plus a parent -> children
+adjacency map, so child-folder lookups need no query. Entries are evicted by
+LRU (size bound) and TTL. Every folder mutation invalidates the user's entry
+in this worker. Entries are also tagged with the user's data version, so
+readers that pass the current version never see a tree that another gunicorn
+worker has since changed; otherwise the TTL bounds that staleness.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+
+
+class FolderTree:
+    """Snapshot of a user's folders (ordered by created_at) with an adjacency map."""
+
+    __slots__ = ('folders', 'children', 'by_id', 'version', 'expires_at')
+
+    def __init__(self, folders, version, expires_at):
+        self.folders = folders
+        self.version = version
+        self.expires_at = expires_at
+        self.children = {}
+        self.by_id = {}
+        for folder in folders:
+            self.children.setdefault(folder.get('parent_folder_id'), []).append(folder)
+            self.by_id[folder['id']] = folder
+
+    def get(self, folder_id):
+        """The folder with this id, or None."""
+        return self.by_id.get(folder_id.lower()) if folder_id else None
+
+    def child_folders(self, parent_folder_id):
+        """Folders directly inside parent_folder_id (root when None or '')."""
+        key = parent_folder_id.lower() if parent_folder_id else None
+        return self.children.get(key, [])
+
+
+class FolderTreeCache:
+    """Bounded LRU + TTL cache of FolderTree objects keyed by user email."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation so that a load racing with a mutation
+        # is returned to its caller but never stored
+        self._generation = 0
+
+    def get_tree(self, email, load_folders, version=None):
+        """Return the user's tree, calling load_folders(email) on a miss.
+
+        When the caller knows the user's current data version, a cached tree
+        built at another version counts as a miss.
+        """
+        with self._lock:
+            tree = self._entries.get(email)
+            if (tree is not None and tree.expires_at > time.monotonic()
+                    and (version is None or tree.version == version)):
+                self._entries.move_to_end(email)
+                self.hits += 1
+                return tree
+            self.misses += 1
+            generation = self._generation
+
+        tree = FolderTree(load_folders(email), version, time.monotonic() + self.ttl)
+        if self.max_size > 0:
+            with self._lock:
+                if generation != self._generation:
+                    return tree
+                self._entries[email] = tree
+                self._entries.move_to_end(email)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return tree
+
+    def invalidate(self, email):
+        with self._lock:
+            self._generation += 1
+            self._entries.pop(email, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+folder_cache = FolderTreeCache(Config.FOLDER_CACHE_SIZE, Config.FOLDER_CACHE_TTL)
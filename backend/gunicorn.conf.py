@@ -0,0 +1,33 @@
+"""Gunicorn settings, read from the working directory on startup."""
+import os
+import shutil
+import tempfile
+
+# Workers write their metrics to files here so that /metrics can sum them up.
+# Set before the app (and prometheus_client) is imported by the workers.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'dataroom-metrics'))
+
+# Event streams (GET /api/events) stay open for minutes. Threaded workers give
+# each stream a thread rather than a whole process; GUNICORN_WORKER_CLASS=gevent
+# (with gevent installed) makes them greenlets instead. Sync workers still work,
+# but close every stream after its first event.
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', '32'))
+
+
+def on_starting(server):
+    # Files left by a previous run would be added to this run's counters
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def worker_exit(server, worker):
+    # Writes the file opens and star toggles still held by the write-behind buffer
+    from writebehind import file_writes
+    file_writes.close()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,139 @@
+"""Background jobs for long-running deletes, backed by the jobs table.
+
+Routes enqueue a job and return 202 with its id. A JobWorker claims due jobs
+from the table (so any process may run any job), deletes the user's data in
+chunks of JOB_CHUNK_SIZE rows while recording progress, and requeues a failed
+job with exponential backoff until it runs out of attempts. Each process
+starts one polling worker thread on demand; ``flask run-jobs`` runs a worker
+in the foreground instead, and tests can call ``run_pending()`` directly.
+"""
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from config import Config
+from folder_cache import folder_cache
+from repository import get_repository
+
+logger = logging.getLogger(__name__)
+
+DELETE_ALL = 'delete_all'
+DELETE_ACCOUNT = 'delete_account'
+
+
+def delete_user_data(repo, job, chunk_size, on_progress):
+    """Delete all of the job user's files and folders, chunk by chunk."""
+    email = job['user_email']
+    progress = job['progress']
+    while True:
+        deleted = repo.delete_user_data_chunk(email, chunk_size)
+        if not deleted:
+            return
+        progress += deleted
+        on_progress(progress)
+        # Other processes drop their cached folder trees once the version moves
+        folder_cache.invalidate(email)
+        repo.bump_data_version(email)
+
+
+def run_delete_all(repo, job, chunk_size, on_progress):
+    delete_user_data(repo, job, chunk_size, on_progress)
+
+
+def run_delete_account(repo, job, chunk_size, on_progress):
+    delete_user_data(repo, job, chunk_size, on_progress)
+    repo.delete_user(job['user_email'])
+    folder_cache.invalidate(job['user_email'])
+
+
+HANDLERS = {
+    DELETE_ALL: run_delete_all,
+    DELETE_ACCOUNT: run_delete_account,
+}
+
+
+class JobWorker:
+    """Claims and runs jobs, either on a background thread or on demand."""
+
+    def __init__(self, repo=None, poll_interval=None, chunk_size=None):
+        self.repo = repo
+        self.poll_interval = Config.JOB_POLL_INTERVAL if poll_interval is None else poll_interval
+        self.chunk_size = chunk_size or Config.JOB_CHUNK_SIZE
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def run_job(self, repo, job):
+        """Run one claimed job and record its outcome."""
+        def on_progress(progress):
+            repo.update_job(job['id'], progress=progress)
+
+        try:
+            HANDLERS[job['kind']](repo, job, self.chunk_size, on_progress)
+        except Exception as e:
+            logger.exception('Error running job %s (%s, attempt %s)', job['id'], job['kind'], job['attempts'])
+            if job['attempts'] >= job['max_attempts']:
+                repo.update_job(job['id'], status='failed', error=str(e))
+            else:
+                delay = Config.JOB_RETRY_DELAY * 2 ** (job['attempts'] - 1)
+                repo.update_job(job['id'], status='queued', error=str(e),
+                                run_after=datetime.utcnow() + timedelta(seconds=delay))
+            return False
+        repo.update_job(job['id'], status='succeeded', error=None)
+        return True
+
+    def run_pending(self, max_jobs=None):
+        """Run due jobs on the calling thread until none is left; return how many ran."""
+        repo = self.repo or get_repository()
+        count = 0
+        while max_jobs is None or count < max_jobs:
+            job = repo.claim_job(Config.JOB_STALE_AFTER)
+            if job is None:
+                break
+            self.run_job(repo, job)
+            count += 1
+        return count
+
+    def start(self):
+        """Start the polling thread if it is not running yet."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self.run_forever, name='job-worker', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def wake(self):
+        """Poll now instead of at the next interval (e.g. right after enqueueing)."""
+        self._wake.set()
+
+    def run_forever(self):
+        """Poll for due jobs until stop() is called."""
+        while not self._stopped.is_set():
+            try:
+                self.run_pending()
+            except Exception:
+                logger.exception('Error polling jobs')
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+
+worker = JobWorker()
+
+
+def enqueue(email, kind):
+    """Queue a job for the user, nudge the local worker and return the job row."""
+    job = get_repository().insert_job(email, kind, Config.JOB_MAX_ATTEMPTS)
+    if Config.JOB_WORKER_ENABLED:
+        worker.start()
+        worker.wake()
+    return job
@@ -0,0 +1,179 @@
+"""Structured, non-blocking logging.
+
+configure_logging routes the root logger through a queue: the calling thread
+only stamps the record (request ID, merged message, rendered traceback) and
+enqueues it, and a background listener thread formats and writes it. When
+the queue is full, records are dropped and counted instead of blocking
+requests. Output is one JSON object per line (LOG_FORMAT=json) or plain text.
+
+Every request gets an ID, taken from a well-formed X-Request-ID header or
+generated. It is attached to every record logged while the request is
+handled, including records from query fan-out threads, and is echoed in the
+response. Repeats of the same log call (same logger, level, call site and
+message template) are suppressed for LOG_DEDUPE_WINDOW seconds. The next
+record that gets through reports how many were suppressed. Use %-style
+arguments (``logger.error('Error fetching %s', thing)``) so repeats share a
+template.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from flask import g, request
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._:-]{1,128}$')
+
+request_id: ContextVar[str | None] = ContextVar('request_id', default=None)
+
+# Attributes every LogRecord has; anything else was passed with extra= and is logged as a field
+RESERVED_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = request_id.get()
+        return True
+
+
+class DedupeFilter(logging.Filter):
+    """Let one record per call site and message template through per window."""
+
+    def __init__(self, window, max_keys=1024):
+        super().__init__()
+        self.window = window
+        self.max_keys = max_keys
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.name, record.levelno, record.pathname, record.lineno, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._seen.get(key)
+            if entry is not None and now - entry[0] < self.window:
+                entry[1] += 1
+                return False
+            if entry is not None and entry[1]:
+                record.suppressed = entry[1]
+            if len(self._seen) >= self.max_keys:
+                self._seen = {k: v for k, v in self._seen.items() if now - v[0] < self.window}
+            self._seen[key] = [now, 0]
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of waiting on a full queue."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Everything that needs the caller's state is resolved here; formatting happens on the listener
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        if self.dropped:
+            record.dropped, self.dropped = self.dropped, 0
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS and value is not None:
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s')
+
+    def format(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = None
+        line = super().format(record)
+        for field in ('suppressed', 'dropped'):
+            if getattr(record, field, None):
+                line += f' ({getattr(record, field)} {field})'
+        return line
+
+
+def start_request():
+    header = request.headers.get(REQUEST_ID_HEADER, '')
+    g.request_id_token = request_id.set(
+        header if VALID_REQUEST_ID.match(header) else uuid.uuid4().hex
+    )
+
+
+def add_request_id_header(response):
+    current = request_id.get()
+    if current:
+        response.headers[REQUEST_ID_HEADER] = current
+    return response
+
+
+def end_request(exc):
+    token = g.pop('request_id_token', None)
+    if token is not None:
+        request_id.reset(token)
+
+
+def configure_logging(app):
+    """Send all logging through the background queue and tag records with request IDs."""
+    global _listener
+    config = app.config
+    if _listener is None:
+        stream_handler = logging.StreamHandler(sys.stderr)
+        stream_handler.setFormatter(JsonFormatter() if config['LOG_FORMAT'] == 'json' else TextFormatter())
+        log_queue = queue.Queue(maxsize=config['LOG_QUEUE_SIZE'])
+        queue_handler = NonBlockingQueueHandler(log_queue)
+        queue_handler.addFilter(RequestIdFilter())
+        if config['LOG_DEDUPE_WINDOW'] > 0:
+            queue_handler.addFilter(DedupeFilter(config['LOG_DEDUPE_WINDOW']))
+
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        root.addHandler(queue_handler)
+        root.setLevel(config['LOG_LEVEL'])
+
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        # Writes out what is still queued when the process exits
+        atexit.register(_listener.stop)
+
+    app.before_request(start_request)
+    app.after_request(add_request_id_header)
+    app.teardown_request(end_request)
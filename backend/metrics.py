@@ -0,0 +1,206 @@
+"""Prometheus metrics for API requests and database calls.
+
+Hooks on the API blueprint record latency per route, and an app-level hook
+records the size of the body as sent (after compression; streamed bodies are
+counted chunk by chunk and recorded when the response is closed). Hooks
+on the Supabase HTTP session and on SQLAlchemy engines time every database
+call (a PostgREST request or a SQL statement) and count it against the request
+that made it. Under gunicorn, PROMETHEUS_MULTIPROC_DIR (set by
+gunicorn.conf.py) makes /metrics aggregate all worker processes.
+"""
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from flask import Response, g, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import multiprocess
+from sqlalchemy import event
+
+
+REQUEST_LATENCY = Histogram(
+    'dataroom_http_request_duration_seconds', 'API request latency',
+    ['method', 'route', 'status'],
+)
+RESPONSE_SIZE = Histogram(
+    'dataroom_http_response_size_bytes', 'API response body size as sent, after compression',
+    ['method', 'route'],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216),
+)
+DB_CALLS_PER_REQUEST = Histogram(
+    'dataroom_db_calls_per_request', 'Database calls made by one API request',
+    ['method', 'route'],
+    buckets=(0, 1, 2, 3, 4, 6, 8, 12, 16, 24, 32, 64),
+)
+DB_CALL_LATENCY = Histogram(
+    'dataroom_db_call_duration_seconds', 'Database call latency',
+    ['backend', 'operation'],
+)
+SSE_STREAMS = Gauge(
+    'dataroom_sse_streams', 'Open Server-Sent Events streams',
+    multiprocess_mode='livesum',
+)
+SSE_EVENTS_DROPPED = Counter(
+    'dataroom_sse_events_dropped_total', 'Change notifications dropped from full per-stream buffers',
+)
+
+# Database calls of the current request; gather() copies it into pool threads
+_request_db_calls: ContextVar['CallCounter | None'] = ContextVar('request_db_calls', default=None)
+
+
+class CallCounter:
+    """Thread-safe counter of the database calls of one request."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def add(self):
+        with self._lock:
+            self.count += 1
+
+
+def record_db_call(backend, operation, seconds):
+    DB_CALL_LATENCY.labels(backend, operation).observe(seconds)
+    counter = _request_db_calls.get()
+    if counter is not None:
+        counter.add()
+
+
+def route_label():
+    """The matched URL rule (e.g. /api/folders/<folder_id>/subtree), not the raw path."""
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+def start_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_db_calls = CallCounter()
+    g.metrics_token = _request_db_calls.set(g.metrics_db_calls)
+
+
+def observe_request(response):
+    started = g.pop('metrics_started', None)
+    if started is None:
+        return response
+    route = route_label()
+    REQUEST_LATENCY.labels(request.method, route, response.status_code).observe(time.perf_counter() - started)
+    DB_CALLS_PER_REQUEST.labels(request.method, route).observe(g.metrics_db_calls.count)
+    # The size is only final once the app-level hooks (compression) have run
+    g.metrics_size_labels = (request.method, route)
+    return response
+
+
+class CountingBody:
+    """Wraps a streamed body and counts the bytes it yields."""
+
+    def __init__(self, chunks):
+        self.size = 0
+        self._chunks = chunks
+
+    def __iter__(self):
+        for chunk in self._chunks:
+            self.size += len(chunk.encode() if isinstance(chunk, str) else chunk)
+            yield chunk
+
+    def close(self):
+        close = getattr(self._chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+def observe_response_size(response):
+    """App-level after_request hook recording the size of API response bodies as sent.
+
+    Must run after compress_response. Flask runs app after_request hooks in
+    reverse order of registration, so register it before compression.
+    """
+    labels = g.pop('metrics_size_labels', None)
+    if labels is None:
+        return response
+    if response.is_streamed:
+        body = CountingBody(response.response)
+        response.response = body
+        response.call_on_close(lambda: RESPONSE_SIZE.labels(*labels).observe(body.size))
+    elif response.content_length is not None:
+        RESPONSE_SIZE.labels(*labels).observe(response.content_length)
+    return response
+
+
+def end_request(exc):
+    token = g.pop('metrics_token', None)
+    if token is not None:
+        _request_db_calls.reset(token)
+
+
+def instrument_blueprint(blueprint):
+    """Record request metrics for every route of the blueprint.
+
+    Register before other before_request hooks, so that requests they reject
+    (e.g. 401s) are measured too.
+    """
+    blueprint.before_request(start_request)
+    blueprint.after_request(observe_request)
+    blueprint.teardown_request(end_request)
+
+
+def _mark_http_start(http_request):
+    http_request.extensions['metrics_started'] = time.perf_counter()
+
+
+def _observe_http_response(http_response):
+    # Reading here includes the body transfer in the timing; postgrest reads it anyway
+    http_response.read()
+    http_request = http_response.request
+    started = http_request.extensions.get('metrics_started')
+    if started is None:
+        return
+    # /rest/v1/files -> files, /rest/v1/rpc/folder_subtree -> rpc/folder_subtree
+    target = http_request.url.path.split('/rest/v1/', 1)[-1]
+    record_db_call('supabase', f'{http_request.method} {target}', time.perf_counter() - started)
+
+
+def instrument_supabase(client):
+    """Time every PostgREST request the Supabase client sends."""
+    hooks = client.postgrest.session.event_hooks
+    hooks['request'].append(_mark_http_start)
+    hooks['response'].append(_observe_http_response)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.metrics_started = time.perf_counter()
+
+
+def _observe_statement(statement, context):
+    started = getattr(context, 'metrics_started', None)
+    if started is None:
+        return
+    operation = statement.split(None, 1)[0].upper() if statement and statement.strip() else 'UNKNOWN'
+    record_db_call('sqlalchemy', operation, time.perf_counter() - started)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _observe_statement(statement, context)
+
+
+def _handle_error(exception_context):
+    # Failed statements are round trips too
+    _observe_statement(exception_context.statement, exception_context.execution_context)
+
+
+def instrument_engine(engine):
+    """Time every SQL statement sent through the engine."""
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    event.listen(engine, 'handle_error', _handle_error)
+
+
+def metrics_response():
+    """Render all metrics in the Prometheus text format."""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,53 @@
+"""Add composite and partial indexes matching API query shapes
+
+Revision ID: 1b1162f84110
+Revises: 5e16ad516687
+Create Date: 2026-10-16 10:48:02.918264
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '1b1162f84110'
+down_revision = '5e16ad516687'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # GET /api/files folder/root listings, keyset pages and folder-scoped deletes
+    op.create_index(
+        'idx_files_user_folder_uploaded', 'files',
+        ['user_email', 'folder_id', sa.text('uploaded_at DESC'), sa.text('id DESC')],
+        if_not_exists=True,
+    )
+    # GET /api/files?starred=true
+    op.create_index(
+        'idx_files_user_starred_uploaded', 'files',
+        ['user_email', sa.text('uploaded_at DESC'), sa.text('id DESC')],
+        postgresql_where=sa.text('starred'),
+        if_not_exists=True,
+    )
+    # Foreign key checks when folders are deleted
+    op.create_index('idx_files_folder_id', 'files', ['folder_id'], if_not_exists=True)
+
+    # GET /api/files child folders and sibling name checks
+    op.create_index(
+        'idx_folders_user_parent_created', 'folders',
+        ['user_email', 'parent_folder_id', 'created_at'],
+        if_not_exists=True,
+    )
+    # GET /api/folders
+    op.create_index('idx_folders_user_created', 'folders', ['user_email', 'created_at'], if_not_exists=True)
+    # Subtree walks and ON DELETE CASCADE from parent folders
+    op.create_index('idx_folders_parent_folder_id', 'folders', ['parent_folder_id'], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('idx_folders_parent_folder_id', table_name='folders', if_exists=True)
+    op.drop_index('idx_folders_user_created', table_name='folders', if_exists=True)
+    op.drop_index('idx_folders_user_parent_created', table_name='folders', if_exists=True)
+    op.drop_index('idx_files_folder_id', table_name='files', if_exists=True)
+    op.drop_index('idx_files_user_starred_uploaded', table_name='files', if_exists=True)
+    op.drop_index('idx_files_user_folder_uploaded', table_name='files', if_exists=True)
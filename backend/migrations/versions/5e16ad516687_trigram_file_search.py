@@ -0,0 +1,60 @@
+"""Add trigram index and ranked search function for file names
+
+Revision ID: 5e16ad516687
+Revises: 95bd19782304
+Create Date: 2026-10-16 10:03:17.551920
+
+"""
+from alembic import op
+
+
+revision = '5e16ad516687'
+down_revision = '95bd19782304'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # gin_trgm_ops serves ILIKE '%term%' as well as similarity ranking
+    op.execute('CREATE INDEX IF NOT EXISTS idx_files_name_trgm ON files USING gin (name gin_trgm_ops)')
+
+    # p_term is matched literally: LIKE wildcards are escaped before matching.
+    # Exact and prefix matches rank first, then trigram similarity, then recency.
+    op.execute(r"""
+        CREATE OR REPLACE FUNCTION search_files(p_user_email text, p_term text, p_limit integer)
+        RETURNS SETOF files
+        LANGUAGE sql
+        STABLE
+        AS $$
+            WITH q AS (
+                SELECT lower(p_term) AS term,
+                       replace(replace(replace(p_term, '\', '\\'), '%', '\%'), '_', '\_') AS pattern
+            )
+            SELECT f.*
+            FROM files f, q
+            WHERE f.user_email = p_user_email
+              AND f.name ILIKE '%' || q.pattern || '%'
+            ORDER BY (lower(f.name) = q.term) DESC,
+                     (f.name ILIKE q.pattern || '%') DESC,
+                     similarity(f.name, p_term) DESC,
+                     f.uploaded_at DESC,
+                     f.id DESC
+            LIMIT p_limit
+        $$
+    """)
+    op.execute("""
+        DO $$
+        BEGIN
+            REVOKE ALL ON FUNCTION search_files(text, text, integer) FROM PUBLIC;
+            IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+                REVOKE ALL ON FUNCTION search_files(text, text, integer) FROM anon, authenticated;
+            END IF;
+        END
+        $$
+    """)
+
+
+def downgrade():
+    op.execute('DROP FUNCTION IF EXISTS search_files(text, text, integer)')
+    op.execute('DROP INDEX IF EXISTS idx_files_name_trgm')
@@ -0,0 +1,57 @@
+"""Add the recent files index and the batched file update function
+
+Revision ID: 5f3289448c8b
+Revises: 7eb7662e4d2e
+Create Date: 2026-10-16 23:20:18.530972
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '5f3289448c8b'
+down_revision = '7eb7662e4d2e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # GET /api/files/recent
+    op.create_index(
+        'idx_files_user_last_interacted', 'files',
+        ['user_email', sa.text('last_interacted DESC'), sa.text('id DESC')],
+        if_not_exists=True,
+    )
+
+    # Applies the write-behind buffer's coalesced updates in one statement.
+    # p_updates is a JSON array of {id, user_email, last_interacted?, starred?};
+    # absent keys leave the column as it is.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION apply_file_updates(p_updates jsonb)
+        RETURNS SETOF uuid
+        LANGUAGE sql
+        AS $$
+            UPDATE files f
+            SET last_interacted = coalesce(u.last_interacted, f.last_interacted),
+                starred = coalesce(u.starred, f.starred)
+            FROM jsonb_to_recordset(p_updates)
+                AS u(id uuid, user_email text, last_interacted timestamp, starred boolean)
+            WHERE f.id = u.id AND f.user_email = u.user_email
+            RETURNING f.id
+        $$
+    """)
+    op.execute("""
+        DO $$
+        BEGIN
+            REVOKE ALL ON FUNCTION apply_file_updates(jsonb) FROM PUBLIC;
+            IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+                REVOKE ALL ON FUNCTION apply_file_updates(jsonb) FROM anon, authenticated;
+            END IF;
+        END
+        $$
+    """)
+
+
+def downgrade():
+    op.execute('DROP FUNCTION IF EXISTS apply_file_updates(jsonb)')
+    op.drop_index('idx_files_user_last_interacted', table_name='files', if_exists=True)
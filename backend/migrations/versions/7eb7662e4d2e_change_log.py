@@ -0,0 +1,105 @@
+"""Add a per-user change log of files and folders, written by triggers
+
+Revision ID: 7eb7662e4d2e
+Revises: 90f131f0864c
+Create Date: 2026-10-16 22:41:37.209114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = '7eb7662e4d2e'
+down_revision = '90f131f0864c'
+branch_labels = None
+depends_on = None
+
+
+# Appends one row per changed file or folder to the user's change log. Sequence
+# numbers come from users.change_seq; the UPDATE locks the user row until the
+# transaction ends, so a user's changes commit in seq order and a reader never
+# sees a seq before a smaller one. Rows without a user_email are not logged.
+RECORD_CHANGES_SQL = """
+    WITH counts AS (
+        SELECT user_email, count(*) AS n
+        FROM {rows}
+        WHERE user_email IS NOT NULL
+        GROUP BY user_email
+    ), bumped AS (
+        UPDATE users u
+        SET change_seq = u.change_seq + c.n
+        FROM counts c
+        WHERE u.email = c.user_email
+        RETURNING u.email, u.change_seq - c.n AS base
+    )
+    INSERT INTO changes (user_email, seq, entity, entity_id, op)
+    SELECT r.user_email, b.base + row_number() OVER (PARTITION BY r.user_email ORDER BY r.id),
+           TG_ARGV[0], r.id, '{op}'
+    FROM {rows} r
+    JOIN bumped b ON b.email = r.user_email;
+"""
+
+
+def upgrade():
+    op.add_column('users', sa.Column('change_seq', sa.BigInteger(), nullable=False, server_default='0'))
+    op.add_column('users', sa.Column('changes_floor', sa.BigInteger(), nullable=False, server_default='0'))
+    op.create_table('changes',
+        sa.Column('user_email', sa.Text(), nullable=False),
+        sa.Column('seq', sa.BigInteger(), nullable=False),
+        sa.Column('entity', sa.Text(), nullable=False),
+        sa.Column('entity_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('op', sa.Text(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.ForeignKeyConstraint(['user_email'], ['users.email'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_email', 'seq')
+    )
+    op.create_index('idx_changes_changed_at', 'changes', ['changed_at'])
+
+    # Statement-level, like the folder_stats triggers: a batch update bumps the
+    # user's sequence once. TG_ARGV[0] names the entity ('file' or 'folder').
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION record_changes()
+        RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                {RECORD_CHANGES_SQL.format(rows='old_rows', op='delete')}
+            ELSE
+                {RECORD_CHANGES_SQL.format(rows='new_rows', op='upsert')}
+            END IF;
+            RETURN NULL;
+        END;
+        $$
+    """)
+    for table, entity in (('files', 'file'), ('folders', 'folder')):
+        op.execute(f"""
+            CREATE TRIGGER {table}_changes_insert
+            AFTER INSERT ON {table}
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION record_changes('{entity}')
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_changes_update
+            AFTER UPDATE ON {table}
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION record_changes('{entity}')
+        """)
+        op.execute(f"""
+            CREATE TRIGGER {table}_changes_delete
+            AFTER DELETE ON {table}
+            REFERENCING OLD TABLE AS old_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION record_changes('{entity}')
+        """)
+
+
+def downgrade():
+    for table in ('folders', 'files'):
+        for event in ('delete', 'update', 'insert'):
+            op.execute(f'DROP TRIGGER IF EXISTS {table}_changes_{event} ON {table}')
+    op.execute('DROP FUNCTION IF EXISTS record_changes()')
+    op.drop_index('idx_changes_changed_at', table_name='changes')
+    op.drop_table('changes')
+    op.drop_column('users', 'changes_floor')
+    op.drop_column('users', 'change_seq')
@@ -0,0 +1,72 @@
+"""Enforce unique file and folder names per parent with unique partial indexes
+
+Revision ID: 90f131f0864c
+Revises: e6d2a2d5afa5
+Create Date: 2026-10-16 18:03:52.661940
+
+"""
+from alembic import op
+
+
+revision = '90f131f0864c'
+down_revision = 'e6d2a2d5afa5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing duplicates are renamed rather than deleted: every row but the
+    # oldest in a group gets a " (<first 8 chars of its id>)" suffix
+    op.execute("""
+        UPDATE files f
+        SET name = f.name || ' (' || left(f.id::text, 8) || ')'
+        FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY user_email, folder_id, name, coalesce(mime_type, '')
+                ORDER BY uploaded_at, id
+            ) AS rn
+            FROM files
+        ) d
+        WHERE f.id = d.id AND d.rn > 1
+    """)
+    op.execute("""
+        UPDATE folders f
+        SET name = f.name || ' (' || left(f.id::text, 8) || ')'
+        FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY user_email, parent_folder_id, name
+                ORDER BY created_at, id
+            ) AS rn
+            FROM folders
+        ) d
+        WHERE f.id = d.id AND d.rn > 1
+    """)
+
+    # NULL never equals NULL in a unique index, so root rows get their own index
+    op.execute("""
+        CREATE UNIQUE INDEX uq_files_name_in_folder
+        ON files (user_email, folder_id, name, coalesce(mime_type, ''))
+        WHERE folder_id IS NOT NULL
+    """)
+    op.execute("""
+        CREATE UNIQUE INDEX uq_files_name_in_root
+        ON files (user_email, name, coalesce(mime_type, ''))
+        WHERE folder_id IS NULL
+    """)
+    op.execute("""
+        CREATE UNIQUE INDEX uq_folders_name_in_parent
+        ON folders (user_email, parent_folder_id, name)
+        WHERE parent_folder_id IS NOT NULL
+    """)
+    op.execute("""
+        CREATE UNIQUE INDEX uq_folders_name_in_root
+        ON folders (user_email, name)
+        WHERE parent_folder_id IS NULL
+    """)
+
+
+def downgrade():
+    op.execute('DROP INDEX IF EXISTS uq_folders_name_in_root')
+    op.execute('DROP INDEX IF EXISTS uq_folders_name_in_parent')
+    op.execute('DROP INDEX IF EXISTS uq_files_name_in_root')
+    op.execute('DROP INDEX IF EXISTS uq_files_name_in_folder')
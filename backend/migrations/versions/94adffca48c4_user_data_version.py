@@ -0,0 +1,48 @@
+"""Add users.data_version for conditional GETs
+
+Revision ID: 94adffca48c4
+Revises: 1b1162f84110
+Create Date: 2026-10-16 13:20:45.106372
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '94adffca48c4'
+down_revision = '1b1162f84110'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('data_version', sa.BigInteger(), nullable=False, server_default='0'))
+
+    # Versions are clock-based (microseconds) and strictly increasing per user,
+    # so a value is never reused even if the user row is deleted and recreated.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_data_version(p_user_email text)
+        RETURNS bigint
+        LANGUAGE sql
+        AS $$
+            UPDATE users
+            SET data_version = GREATEST(data_version + 1, (extract(epoch FROM clock_timestamp()) * 1000000)::bigint)
+            WHERE email = p_user_email
+            RETURNING data_version
+        $$
+    """)
+    op.execute("""
+        DO $$
+        BEGIN
+            REVOKE ALL ON FUNCTION bump_data_version(text) FROM PUBLIC;
+            IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+                REVOKE ALL ON FUNCTION bump_data_version(text) FROM anon, authenticated;
+            END IF;
+        END
+        $$
+    """)
+
+
+def downgrade():
+    op.execute('DROP FUNCTION IF EXISTS bump_data_version(text)')
+    op.drop_column('users', 'data_version')
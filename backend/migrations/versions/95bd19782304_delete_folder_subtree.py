@@ -0,0 +1,70 @@
+"""Add delete_folder_subtree function
+
+Revision ID: 95bd19782304
+Revises: 10c478bd709f
+Create Date: 2026-10-16 09:12:41.204518
+
+"""
+from alembic import op
+
+
+revision = '95bd19782304'
+down_revision = '10c478bd709f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Resolves the whole subtree with a recursive CTE and removes its files and
+    # folders in bulk. Called through PostgREST RPC, so it runs in one transaction.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION delete_folder_subtree(p_folder_id uuid, p_user_email text)
+        RETURNS TABLE (deleted_folders bigint, deleted_files bigint)
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+            subtree_ids uuid[];
+        BEGIN
+            WITH RECURSIVE subtree AS (
+                SELECT id FROM folders
+                WHERE id = p_folder_id AND user_email = p_user_email
+                UNION ALL
+                SELECT f.id FROM folders f
+                JOIN subtree s ON f.parent_folder_id = s.id
+                WHERE f.user_email = p_user_email
+            )
+            SELECT array_agg(id) INTO subtree_ids FROM subtree;
+
+            deleted_folders := 0;
+            deleted_files := 0;
+            IF subtree_ids IS NULL THEN
+                RETURN NEXT;
+                RETURN;
+            END IF;
+
+            DELETE FROM files WHERE user_email = p_user_email AND folder_id = ANY(subtree_ids);
+            GET DIAGNOSTICS deleted_files = ROW_COUNT;
+
+            DELETE FROM folders WHERE user_email = p_user_email AND id = ANY(subtree_ids);
+            GET DIAGNOSTICS deleted_folders = ROW_COUNT;
+
+            RETURN NEXT;
+        END;
+        $$
+    """)
+    # Only the backend (service role) may call it; Supabase grants EXECUTE on new
+    # functions to the client-facing roles by default.
+    op.execute("""
+        DO $$
+        BEGIN
+            REVOKE ALL ON FUNCTION delete_folder_subtree(uuid, text) FROM PUBLIC;
+            IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+                REVOKE ALL ON FUNCTION delete_folder_subtree(uuid, text) FROM anon, authenticated;
+            END IF;
+        END
+        $$
+    """)
+
+
+def downgrade():
+    op.execute('DROP FUNCTION IF EXISTS delete_folder_subtree(uuid, text)')
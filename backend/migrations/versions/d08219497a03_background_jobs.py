@@ -0,0 +1,99 @@
+"""Add jobs table and functions for chunked background deletes
+
+Revision ID: d08219497a03
+Revises: 94adffca48c4
+Create Date: 2026-10-16 15:02:11.482913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = 'd08219497a03'
+down_revision = '94adffca48c4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('jobs',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False, server_default=sa.text('gen_random_uuid()')),
+        sa.Column('user_email', sa.Text(), nullable=False),
+        sa.Column('kind', sa.Text(), nullable=False),
+        sa.Column('status', sa.Text(), nullable=False, server_default='queued'),
+        sa.Column('progress', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('max_attempts', sa.Integer(), nullable=False, server_default='5'),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('run_after', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.text('now()')),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_jobs_status_run_after', 'jobs', ['status', 'run_after'])
+    op.create_index('idx_jobs_user_email', 'jobs', ['user_email'])
+
+    # SKIP LOCKED lets several workers poll the table without blocking each other
+    op.execute("""
+        CREATE OR REPLACE FUNCTION claim_job(p_stale_seconds integer)
+        RETURNS SETOF jobs
+        LANGUAGE sql
+        AS $$
+            UPDATE jobs
+            SET status = 'running', attempts = attempts + 1, updated_at = now()
+            WHERE id = (
+                SELECT id FROM jobs
+                WHERE (status = 'queued' AND run_after <= now())
+                   OR (status = 'running' AND updated_at < now() - make_interval(secs => p_stale_seconds))
+                ORDER BY created_at
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING *
+        $$
+    """)
+    # Files go first because files.folder_id does not cascade; deleting a
+    # folder cascades to its subfolders
+    op.execute("""
+        CREATE OR REPLACE FUNCTION delete_user_data_chunk(p_user_email text, p_limit integer)
+        RETURNS bigint
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+            v_deleted bigint;
+        BEGIN
+            DELETE FROM files
+            WHERE id IN (SELECT id FROM files WHERE user_email = p_user_email LIMIT p_limit);
+            GET DIAGNOSTICS v_deleted = ROW_COUNT;
+            IF v_deleted > 0 THEN
+                RETURN v_deleted;
+            END IF;
+
+            DELETE FROM folders
+            WHERE id IN (SELECT id FROM folders WHERE user_email = p_user_email LIMIT p_limit);
+            GET DIAGNOSTICS v_deleted = ROW_COUNT;
+            RETURN v_deleted;
+        END;
+        $$
+    """)
+    op.execute("""
+        DO $$
+        BEGIN
+            REVOKE ALL ON FUNCTION claim_job(integer) FROM PUBLIC;
+            REVOKE ALL ON FUNCTION delete_user_data_chunk(text, integer) FROM PUBLIC;
+            IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+                REVOKE ALL ON FUNCTION claim_job(integer) FROM anon, authenticated;
+                REVOKE ALL ON FUNCTION delete_user_data_chunk(text, integer) FROM anon, authenticated;
+            END IF;
+        END
+        $$
+    """)
+
+
+def downgrade():
+    op.execute('DROP FUNCTION IF EXISTS delete_user_data_chunk(text, integer)')
+    op.execute('DROP FUNCTION IF EXISTS claim_job(integer)')
+    op.drop_index('idx_jobs_user_email', table_name='jobs')
+    op.drop_index('idx_jobs_status_run_after', table_name='jobs')
+    op.drop_table('jobs')
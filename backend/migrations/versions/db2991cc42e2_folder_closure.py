@@ -0,0 +1,210 @@
+"""Add folder_closure table maintained by triggers on folders
+
+Revision ID: db2991cc42e2
+Revises: d08219497a03
+Create Date: 2026-10-16 16:11:37.902514
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = 'db2991cc42e2'
+down_revision = 'd08219497a03'
+branch_labels = None
+depends_on = None
+
+
+FUNCTIONS = ('delete_folder_subtree(uuid, text)', 'folder_breadcrumbs(uuid, text)', 'folder_subtree(uuid, text)')
+
+
+def upgrade():
+    op.create_table('folder_closure',
+        sa.Column('ancestor_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('descendant_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['ancestor_id'], ['folders.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['descendant_id'], ['folders.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+    )
+    op.create_index('idx_folder_closure_descendant_depth', 'folder_closure', ['descendant_id', 'depth'])
+
+    op.execute("""
+        INSERT INTO folder_closure (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE paths AS (
+            SELECT id AS ancestor_id, id AS descendant_id, 0 AS depth FROM folders
+            UNION ALL
+            SELECT p.ancestor_id, f.id, p.depth + 1
+            FROM paths p
+            JOIN folders f ON f.parent_folder_id = p.descendant_id
+        )
+        SELECT ancestor_id, descendant_id, depth FROM paths
+    """)
+
+    # Deletes need no trigger: both foreign keys cascade
+    op.execute("""
+        CREATE OR REPLACE FUNCTION folder_closure_insert()
+        RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            INSERT INTO folder_closure (ancestor_id, descendant_id, depth) VALUES (NEW.id, NEW.id, 0);
+            INSERT INTO folder_closure (ancestor_id, descendant_id, depth)
+            SELECT ancestor_id, NEW.id, depth + 1 FROM folder_closure WHERE descendant_id = NEW.parent_folder_id;
+            RETURN NULL;
+        END;
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER folders_closure_insert
+        AFTER INSERT ON folders
+        FOR EACH ROW EXECUTE FUNCTION folder_closure_insert()
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION folder_closure_move()
+        RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            IF EXISTS (
+                SELECT 1 FROM folder_closure
+                WHERE ancestor_id = NEW.id AND descendant_id = NEW.parent_folder_id
+            ) THEN
+                RAISE EXCEPTION 'cannot move folder % into its own subtree', NEW.id;
+            END IF;
+
+            -- Detach the subtree from its old ancestors, then attach it under the new parent
+            DELETE FROM folder_closure
+            WHERE descendant_id IN (SELECT descendant_id FROM folder_closure WHERE ancestor_id = NEW.id)
+              AND ancestor_id NOT IN (SELECT descendant_id FROM folder_closure WHERE ancestor_id = NEW.id);
+            INSERT INTO folder_closure (ancestor_id, descendant_id, depth)
+            SELECT super.ancestor_id, sub.descendant_id, super.depth + sub.depth + 1
+            FROM folder_closure super
+            CROSS JOIN folder_closure sub
+            WHERE super.descendant_id = NEW.parent_folder_id AND sub.ancestor_id = NEW.id;
+            RETURN NULL;
+        END;
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER folders_closure_move
+        AFTER UPDATE OF parent_folder_id ON folders
+        FOR EACH ROW
+        WHEN (OLD.parent_folder_id IS DISTINCT FROM NEW.parent_folder_id)
+        EXECUTE FUNCTION folder_closure_move()
+    """)
+
+    # The subtree is one index lookup now instead of a recursive walk
+    op.execute("""
+        CREATE OR REPLACE FUNCTION delete_folder_subtree(p_folder_id uuid, p_user_email text)
+        RETURNS TABLE (deleted_folders bigint, deleted_files bigint)
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+            subtree_ids uuid[];
+        BEGIN
+            SELECT array_agg(c.descendant_id) INTO subtree_ids
+            FROM folder_closure c
+            JOIN folders f ON f.id = c.ancestor_id
+            WHERE c.ancestor_id = p_folder_id AND f.user_email = p_user_email;
+
+            deleted_folders := 0;
+            deleted_files := 0;
+            IF subtree_ids IS NULL THEN
+                RETURN NEXT;
+                RETURN;
+            END IF;
+
+            DELETE FROM files WHERE user_email = p_user_email AND folder_id = ANY(subtree_ids);
+            GET DIAGNOSTICS deleted_files = ROW_COUNT;
+
+            DELETE FROM folders WHERE user_email = p_user_email AND id = ANY(subtree_ids);
+            GET DIAGNOSTICS deleted_folders = ROW_COUNT;
+
+            RETURN NEXT;
+        END;
+        $$
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION folder_breadcrumbs(p_folder_id uuid, p_user_email text)
+        RETURNS TABLE (id uuid, name text, parent_folder_id uuid, created_at timestamp, depth integer)
+        LANGUAGE sql STABLE
+        AS $$
+            SELECT f.id, f.name, f.parent_folder_id, f.created_at, c.depth
+            FROM folder_closure c
+            JOIN folders f ON f.id = c.ancestor_id
+            WHERE c.descendant_id = p_folder_id AND f.user_email = p_user_email
+            ORDER BY c.depth DESC
+        $$
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION folder_subtree(p_folder_id uuid, p_user_email text)
+        RETURNS TABLE (id uuid, name text, parent_folder_id uuid, created_at timestamp, depth integer, file_count bigint)
+        LANGUAGE sql STABLE
+        AS $$
+            SELECT f.id, f.name, f.parent_folder_id, f.created_at, c.depth,
+                   (SELECT count(*) FROM files WHERE files.folder_id = f.id) AS file_count
+            FROM folder_closure c
+            JOIN folders f ON f.id = c.descendant_id
+            WHERE c.ancestor_id = p_folder_id AND f.user_email = p_user_email
+            ORDER BY c.depth, f.created_at
+        $$
+    """)
+    op.execute(f"""
+        DO $$
+        BEGIN
+            REVOKE ALL ON FUNCTION {', '.join(FUNCTIONS)} FROM PUBLIC;
+            IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+                REVOKE ALL ON FUNCTION {', '.join(FUNCTIONS)} FROM anon, authenticated;
+            END IF;
+        END
+        $$
+    """)
+
+
+def downgrade():
+    op.execute('DROP FUNCTION IF EXISTS folder_subtree(uuid, text)')
+    op.execute('DROP FUNCTION IF EXISTS folder_breadcrumbs(uuid, text)')
+    # Restore the recursive delete_folder_subtree from 95bd19782304
+    op.execute("""
+        CREATE OR REPLACE FUNCTION delete_folder_subtree(p_folder_id uuid, p_user_email text)
+        RETURNS TABLE (deleted_folders bigint, deleted_files bigint)
+        LANGUAGE plpgsql
+        AS $$
+        DECLARE
+            subtree_ids uuid[];
+        BEGIN
+            WITH RECURSIVE subtree AS (
+                SELECT id FROM folders
+                WHERE id = p_folder_id AND user_email = p_user_email
+                UNION ALL
+                SELECT f.id FROM folders f
+                JOIN subtree s ON f.parent_folder_id = s.id
+                WHERE f.user_email = p_user_email
+            )
+            SELECT array_agg(id) INTO subtree_ids FROM subtree;
+
+            deleted_folders := 0;
+            deleted_files := 0;
+            IF subtree_ids IS NULL THEN
+                RETURN NEXT;
+                RETURN;
+            END IF;
+
+            DELETE FROM files WHERE user_email = p_user_email AND folder_id = ANY(subtree_ids);
+            GET DIAGNOSTICS deleted_files = ROW_COUNT;
+
+            DELETE FROM folders WHERE user_email = p_user_email AND id = ANY(subtree_ids);
+            GET DIAGNOSTICS deleted_folders = ROW_COUNT;
+
+            RETURN NEXT;
+        END;
+        $$
+    """)
+    op.execute('DROP TRIGGER IF EXISTS folders_closure_move ON folders')
+    op.execute('DROP TRIGGER IF EXISTS folders_closure_insert ON folders')
+    op.execute('DROP FUNCTION IF EXISTS folder_closure_move()')
+    op.execute('DROP FUNCTION IF EXISTS folder_closure_insert()')
+    op.drop_index('idx_folder_closure_descendant_depth', table_name='folder_closure')
+    op.drop_table('folder_closure')
@@ -0,0 +1,142 @@
+"""Add folder_stats counters maintained by triggers on files
+
+Revision ID: e6d2a2d5afa5
+Revises: db2991cc42e2
+Create Date: 2026-10-16 17:26:04.518237
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = 'e6d2a2d5afa5'
+down_revision = 'db2991cc42e2'
+branch_labels = None
+depends_on = None
+
+
+REBUILD_SQL = """
+    INSERT INTO folder_stats (folder_id, file_count, starred_count, last_modified)
+    SELECT folder_id, count(*), count(*) FILTER (WHERE starred), max(last_interacted)
+    FROM files
+    WHERE folder_id IS NOT NULL
+    GROUP BY folder_id
+"""
+
+
+def upgrade():
+    op.create_table('folder_stats',
+        sa.Column('folder_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('file_count', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('starred_count', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('last_modified', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['folder_id'], ['folders.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('folder_id')
+    )
+    op.execute(REBUILD_SQL)
+
+    # Statement-level triggers with transition tables, so a bulk insert or
+    # delete touches each affected folder's counters once rather than per row.
+    # Deletes only UPDATE: when a whole folder goes, its row goes with it.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION folder_stats_after_insert()
+        RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            INSERT INTO folder_stats AS s (folder_id, file_count, starred_count, last_modified)
+            SELECT folder_id, count(*), count(*) FILTER (WHERE starred), now()
+            FROM new_rows
+            WHERE folder_id IS NOT NULL
+            GROUP BY folder_id
+            ON CONFLICT (folder_id) DO UPDATE SET
+                file_count = s.file_count + EXCLUDED.file_count,
+                starred_count = s.starred_count + EXCLUDED.starred_count,
+                last_modified = EXCLUDED.last_modified;
+            RETURN NULL;
+        END;
+        $$
+    """)
+    op.execute("""
+        CREATE OR REPLACE FUNCTION folder_stats_after_delete()
+        RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            UPDATE folder_stats s
+            SET file_count = s.file_count - d.files,
+                starred_count = s.starred_count - d.starred,
+                last_modified = now()
+            FROM (
+                SELECT folder_id, count(*) AS files, count(*) FILTER (WHERE starred) AS starred
+                FROM old_rows
+                WHERE folder_id IS NOT NULL
+                GROUP BY folder_id
+            ) d
+            WHERE s.folder_id = d.folder_id;
+            RETURN NULL;
+        END;
+        $$
+    """)
+    # Transition tables rule out an UPDATE OF column list, so renames also
+    # fire this trigger and are filtered out by the join
+    op.execute("""
+        CREATE OR REPLACE FUNCTION folder_stats_after_update()
+        RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            WITH changed AS (
+                SELECT o.folder_id AS old_folder_id, o.starred AS old_starred,
+                       n.folder_id AS new_folder_id, n.starred AS new_starred
+                FROM old_rows o
+                JOIN new_rows n ON n.id = o.id
+                WHERE o.folder_id IS DISTINCT FROM n.folder_id OR o.starred <> n.starred
+            ), deltas AS (
+                SELECT new_folder_id AS folder_id, 1 AS files, new_starred::int AS starred
+                FROM changed WHERE new_folder_id IS NOT NULL
+                UNION ALL
+                SELECT old_folder_id, -1, -(old_starred::int)
+                FROM changed WHERE old_folder_id IS NOT NULL
+            )
+            INSERT INTO folder_stats AS s (folder_id, file_count, starred_count, last_modified)
+            SELECT folder_id, sum(files), sum(starred), now()
+            FROM deltas
+            GROUP BY folder_id
+            ON CONFLICT (folder_id) DO UPDATE SET
+                file_count = s.file_count + EXCLUDED.file_count,
+                starred_count = s.starred_count + EXCLUDED.starred_count,
+                last_modified = EXCLUDED.last_modified;
+            RETURN NULL;
+        END;
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER files_stats_insert
+        AFTER INSERT ON files
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION folder_stats_after_insert()
+    """)
+    op.execute("""
+        CREATE TRIGGER files_stats_delete
+        AFTER DELETE ON files
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION folder_stats_after_delete()
+    """)
+    op.execute("""
+        CREATE TRIGGER files_stats_update
+        AFTER UPDATE ON files
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION folder_stats_after_update()
+    """)
+
+
+def downgrade():
+    op.execute('DROP TRIGGER IF EXISTS files_stats_update ON files')
+    op.execute('DROP TRIGGER IF EXISTS files_stats_delete ON files')
+    op.execute('DROP TRIGGER IF EXISTS files_stats_insert ON files')
+    op.execute('DROP FUNCTION IF EXISTS folder_stats_after_update()')
+    op.execute('DROP FUNCTION IF EXISTS folder_stats_after_delete()')
+    op.execute('DROP FUNCTION IF EXISTS folder_stats_after_insert()')
+    op.drop_table('folder_stats')
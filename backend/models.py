@@ -2,10 +2,12 @@
 from datetime import datetime
 from uuid import uuid4
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Text
+from sqlalchemy import DDL, BigInteger, Boolean, Column, DateTime, ForeignKey, Index, Integer, Text, event, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
+from serialization import RowSerializer
+
 db = SQLAlchemy()
 
 
@@ -17,6 +19,11 @@ class User(db.Model):
     name = Column(Text, nullable=True)
     image = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Bumped on every change to the user's files or folders; backs listing ETags
+    data_version = Column(BigInteger, default=0, server_default='0', nullable=False)
+    # Latest seq in the user's change log, and the seq up to which it has been pruned
+    change_seq = Column(BigInteger, default=0, server_default='0', nullable=False)
+    changes_floor = Column(BigInteger, default=0, server_default='0', nullable=False)
     
     # Relationships
     folders = relationship('Folder', back_populates='user', cascade='all, delete-orphan')
@@ -42,11 +49,35 @@ class Folder(db.Model):
     parent_folder_id = Column(UUID(as_uuid=True), ForeignKey('folders.id', ondelete='CASCADE'), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     
+    __table_args__ = (
+        Index('idx_folders_user_parent_created', user_email, parent_folder_id, created_at),
+        Index('idx_folders_user_created', user_email, created_at),
+        Index('idx_folders_parent_folder_id', parent_folder_id),
+        # Sibling folders have distinct names; root folders (NULL parent) need their own index
+        Index('uq_folders_name_in_parent', user_email, parent_folder_id, name, unique=True,
+              postgresql_where=parent_folder_id.isnot(None), sqlite_where=parent_folder_id.isnot(None)),
+        Index('uq_folders_name_in_root', user_email, name, unique=True,
+              postgresql_where=parent_folder_id.is_(None), sqlite_where=parent_folder_id.is_(None)),
+    )
+    
     # Relationships
     user = relationship('User', back_populates='folders')
     parent_folder = relationship('Folder', remote_side=[id], backref='child_folders')
     files = relationship('File', back_populates='folder', cascade='all, delete-orphan')
     
+    # camelCase API payload of a folders row, optionally with its folder_stats counters
+    serializer = RowSerializer((
+        ('id', 'id', 'str'),
+        ('name', 'name', 'str'),
+        ('parentFolderId', 'parent_folder_id', 'str?'),
+        ('createdAt', 'created_at', 'str?'),
+    ))
+    stats_serializer = RowSerializer(serializer.fields + (
+        ('fileCount', 'file_count', 'int'),
+        ('starredCount', 'starred_count', 'int'),
+        ('lastModified', 'last_modified', 'str?'),
+    ))
+    
     def to_dict(self):
         """Convert model to dictionary."""
         return {
@@ -59,12 +90,113 @@ class Folder(db.Model):
     
     def to_camel_dict(self):
         """Convert model to dictionary with camelCase keys."""
-        return {
-            'id': str(self.id),
-            'name': self.name,
-            'parentFolderId': str(self.parent_folder_id) if self.parent_folder_id else None,
-            'createdAt': self.created_at.isoformat() if self.created_at else None,
-        }
+        return self.serializer.to_camel(self.to_dict())
+
+
+class FolderClosure(db.Model):
+    """One row per (ancestor, descendant) pair of folders, including each folder with itself.
+
+    Maintained by triggers on folders (see migration db2991cc42e2 for Postgres,
+    SQLITE_CLOSURE_TRIGGERS for the SQLite stand-in); never written by the app.
+    """
+    __tablename__ = 'folder_closure'
+    
+    ancestor_id = Column(UUID(as_uuid=True), ForeignKey('folders.id', ondelete='CASCADE'), primary_key=True, nullable=False)
+    descendant_id = Column(UUID(as_uuid=True), ForeignKey('folders.id', ondelete='CASCADE'), primary_key=True, nullable=False)
+    depth = Column(Integer, nullable=False)
+    
+    __table_args__ = (
+        Index('idx_folder_closure_descendant_depth', descendant_id, depth),
+    )
+
+
+SQLITE_CLOSURE_TRIGGERS = (
+    """
+    CREATE TRIGGER folders_closure_insert AFTER INSERT ON folders
+    BEGIN
+        INSERT INTO folder_closure (ancestor_id, descendant_id, depth) VALUES (NEW.id, NEW.id, 0);
+        INSERT INTO folder_closure (ancestor_id, descendant_id, depth)
+        SELECT ancestor_id, NEW.id, depth + 1 FROM folder_closure WHERE descendant_id = NEW.parent_folder_id;
+    END
+    """,
+    """
+    CREATE TRIGGER folders_closure_move AFTER UPDATE OF parent_folder_id ON folders
+    WHEN OLD.parent_folder_id IS NOT NEW.parent_folder_id
+    BEGIN
+        SELECT RAISE(ABORT, 'cannot move a folder into its own subtree')
+        WHERE EXISTS (SELECT 1 FROM folder_closure WHERE ancestor_id = NEW.id AND descendant_id = NEW.parent_folder_id);
+        DELETE FROM folder_closure
+        WHERE descendant_id IN (SELECT descendant_id FROM folder_closure WHERE ancestor_id = NEW.id)
+          AND ancestor_id NOT IN (SELECT descendant_id FROM folder_closure WHERE ancestor_id = NEW.id);
+        INSERT INTO folder_closure (ancestor_id, descendant_id, depth)
+        SELECT super.ancestor_id, sub.descendant_id, super.depth + sub.depth + 1
+        FROM folder_closure super, folder_closure sub
+        WHERE super.descendant_id = NEW.parent_folder_id AND sub.ancestor_id = NEW.id;
+    END
+    """,
+)
+
+for _statement in SQLITE_CLOSURE_TRIGGERS:
+    event.listen(FolderClosure.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+
+
+class FolderStats(db.Model):
+    """Per-folder file counters, maintained by triggers on files.
+
+    last_modified is the time of the latest insert, delete, move or star
+    toggle of a file in the folder. A folder without files may have no row.
+    Rebuild with ``flask reconcile-folder-stats``.
+    """
+    __tablename__ = 'folder_stats'
+    
+    folder_id = Column(UUID(as_uuid=True), ForeignKey('folders.id', ondelete='CASCADE'), primary_key=True, nullable=False)
+    file_count = Column(BigInteger, default=0, server_default='0', nullable=False)
+    starred_count = Column(BigInteger, default=0, server_default='0', nullable=False)
+    last_modified = Column(DateTime, nullable=True)
+
+
+SQLITE_STATS_TRIGGERS = (
+    """
+    CREATE TRIGGER files_stats_insert AFTER INSERT ON files
+    WHEN NEW.folder_id IS NOT NULL
+    BEGIN
+        INSERT INTO folder_stats (folder_id, file_count, starred_count, last_modified)
+        VALUES (NEW.folder_id, 1, NEW.starred, CURRENT_TIMESTAMP)
+        ON CONFLICT (folder_id) DO UPDATE SET
+            file_count = file_count + 1,
+            starred_count = starred_count + excluded.starred_count,
+            last_modified = excluded.last_modified;
+    END
+    """,
+    """
+    CREATE TRIGGER files_stats_delete AFTER DELETE ON files
+    WHEN OLD.folder_id IS NOT NULL
+    BEGIN
+        UPDATE folder_stats
+        SET file_count = file_count - 1, starred_count = starred_count - OLD.starred, last_modified = CURRENT_TIMESTAMP
+        WHERE folder_id = OLD.folder_id;
+    END
+    """,
+    """
+    CREATE TRIGGER files_stats_update AFTER UPDATE OF folder_id, starred ON files
+    WHEN OLD.folder_id IS NOT NEW.folder_id OR OLD.starred IS NOT NEW.starred
+    BEGIN
+        UPDATE folder_stats
+        SET file_count = file_count - 1, starred_count = starred_count - OLD.starred, last_modified = CURRENT_TIMESTAMP
+        WHERE folder_id = OLD.folder_id;
+        INSERT INTO folder_stats (folder_id, file_count, starred_count, last_modified)
+        SELECT NEW.folder_id, 1, NEW.starred, CURRENT_TIMESTAMP WHERE NEW.folder_id IS NOT NULL
+        ON CONFLICT (folder_id) DO UPDATE SET
+            file_count = file_count + 1,
+            starred_count = starred_count + excluded.starred_count,
+            last_modified = excluded.last_modified;
+    END
+    """,
+)
+
+# On the metadata, so that they run once files and folder_stats both exist
+for _statement in SQLITE_STATS_TRIGGERS:
+    event.listen(db.metadata, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
 
 
 class File(db.Model):
@@ -82,10 +214,38 @@ class File(db.Model):
     last_interacted = Column(DateTime, default=datetime.utcnow, nullable=False)
     folder_id = Column(UUID(as_uuid=True), ForeignKey('folders.id'), nullable=True)
     
+    __table_args__ = (
+        Index('idx_files_user_folder_uploaded', user_email, folder_id, uploaded_at.desc(), id.desc()),
+        Index('idx_files_user_starred_uploaded', user_email, uploaded_at.desc(), id.desc(),
+              postgresql_where=starred, sqlite_where=starred),
+        Index('idx_files_folder_id', folder_id),
+        Index('idx_files_user_last_interacted', user_email, last_interacted.desc(), id.desc()),
+        Index('idx_files_name_trgm', name, postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        # Files in one folder have distinct (name, type) pairs; a NULL type counts as a type
+        Index('uq_files_name_in_folder', user_email, folder_id, name, func.coalesce(mime_type, ''), unique=True,
+              postgresql_where=folder_id.isnot(None), sqlite_where=folder_id.isnot(None)),
+        Index('uq_files_name_in_root', user_email, name, func.coalesce(mime_type, ''), unique=True,
+              postgresql_where=folder_id.is_(None), sqlite_where=folder_id.is_(None)),
+    )
+    
     # Relationships
     user = relationship('User', back_populates='files')
     folder = relationship('Folder', back_populates='files')
     
+    # camelCase API payload of a files row
+    serializer = RowSerializer((
+        ('id', 'id', 'str'),
+        ('name', 'name', 'str'),
+        ('url', 'url', 'str'),
+        ('iconUrl', 'icon_url', 'str?'),
+        ('mimeType', 'mime_type', 'str?'),
+        ('starred', 'starred', 'bool'),
+        # Read from last_edited like the original route did; files has no such column, so it stays null
+        ('lastEditedDate', 'last_edited', 'str?'),
+        ('uploadedAt', 'uploaded_at', 'str?'),
+        ('folderId', 'folder_id', 'str?'),
+    ))
+    
     def to_dict(self):
         """Convert model to dictionary."""
         return {
@@ -103,15 +263,71 @@ class File(db.Model):
     
     def to_camel_dict(self):
         """Convert model to dictionary with camelCase keys."""
-        return {
-            'id': str(self.id),
-            'name': self.name,
-            'url': self.url,
-            'iconUrl': self.icon_url,
-            'mimeType': self.mime_type,
-            'starred': self.starred,
-            'lastEditedDate': self.last_interacted.isoformat() if self.last_interacted else None,
-            'uploadedAt': self.uploaded_at.isoformat() if self.uploaded_at else None,
-            'folderId': str(self.folder_id) if self.folder_id else None,
-        }
+        return self.serializer.to_camel(self.to_dict())
+
+
+class Change(db.Model):
+    """One entry of a user's change log: a file or folder was upserted or deleted.
+
+    Written by triggers on files and folders (see migration 7eb7662e4d2e for
+    Postgres, SQLITE_CHANGES_TRIGGERS for the SQLite stand-in); seq is taken
+    from users.change_seq. Pruned with ``flask prune-changes``.
+    """
+    __tablename__ = 'changes'
+    
+    user_email = Column(Text, ForeignKey('users.email', ondelete='CASCADE'), primary_key=True, nullable=False)
+    seq = Column(BigInteger, primary_key=True, nullable=False)
+    # 'file' or 'folder'
+    entity = Column(Text, nullable=False)
+    entity_id = Column(UUID(as_uuid=True), nullable=False)
+    # 'upsert' or 'delete'
+    op = Column(Text, nullable=False)
+    changed_at = Column(DateTime, default=datetime.utcnow, server_default=func.now(), nullable=False)
+    
+    __table_args__ = (
+        Index('idx_changes_changed_at', changed_at),
+    )
+
+
+SQLITE_CHANGE_TRIGGER = """
+    CREATE TRIGGER {table}_changes_{action} AFTER {keyword} ON {table}
+    WHEN {row}.user_email IS NOT NULL
+    BEGIN
+        UPDATE users SET change_seq = change_seq + 1 WHERE email = {row}.user_email;
+        INSERT INTO changes (user_email, seq, entity, entity_id, op, changed_at)
+        SELECT email, change_seq, '{entity}', {row}.id, '{op}', CURRENT_TIMESTAMP FROM users WHERE email = {row}.user_email;
+    END
+    """
+
+SQLITE_CHANGES_TRIGGERS = tuple(
+    SQLITE_CHANGE_TRIGGER.format(table=table, entity=entity, action=action, keyword=action.upper(), row=row, op=op)
+    for table, entity in (('files', 'file'), ('folders', 'folder'))
+    for action, row, op in (('insert', 'NEW', 'upsert'), ('update', 'NEW', 'upsert'), ('delete', 'OLD', 'delete'))
+)
+
+for _statement in SQLITE_CHANGES_TRIGGERS:
+    event.listen(db.metadata, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
 
+
+class Job(db.Model):
+    """Background job (e.g. deleting all of a user's data), run by jobs.JobWorker."""
+    __tablename__ = 'jobs'
+    
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid4, nullable=False)
+    # No foreign key: an account deletion job outlives the user row
+    user_email = Column(Text, nullable=False)
+    kind = Column(Text, nullable=False)
+    # queued -> running -> succeeded | failed (back to queued while retries remain)
+    status = Column(Text, default='queued', server_default='queued', nullable=False)
+    progress = Column(BigInteger, default=0, server_default='0', nullable=False)
+    attempts = Column(Integer, default=0, server_default='0', nullable=False)
+    max_attempts = Column(Integer, default=5, server_default='5', nullable=False)
+    error = Column(Text, nullable=True)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        Index('idx_jobs_status_run_after', status, run_after),
+        Index('idx_jobs_user_email', user_email),
+    )
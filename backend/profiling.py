@@ -0,0 +1,166 @@
+"""On-demand profiling of single requests.
+
+A request is profiled when it carries ``X-Profile: <PROFILE_TOKEN>`` or is
+picked at random with probability PROFILE_SAMPLE_RATE. Two profilers exist:
+
+- ``sampling`` (default): a background thread samples the request thread's
+  stack every PROFILE_INTERVAL_MS and writes collapsed stacks (``.collapsed``,
+  one ``frame;frame;frame count`` line per stack) for flamegraph.pl,
+  speedscope or inferno.
+- ``cprofile``: deterministic cProfile, written as a ``.prof`` pstats file.
+  Only one request per process is cProfiled at a time; others fall back to
+  sampling.
+
+Header-triggered requests may pick the profiler with ``X-Profile-Mode`` and
+get the file name back in ``X-Profile-File``. Files go to PROFILE_DIR, which
+keeps at most PROFILE_MAX_FILES of them. When neither PROFILE_TOKEN nor
+PROFILE_SAMPLE_RATE is set no hooks are registered, so there is no overhead.
+Work done on query fan-out threads (concurrency.gather) is not captured, nor
+is the body of a stream not wrapped in stream_with_context (/api/events).
+"""
+import cProfile
+import hmac
+import logging
+import os
+import random
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+
+from flask import g, request
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+MODE_HEADER = 'X-Profile-Mode'
+FILE_HEADER = 'X-Profile-File'
+MODES = ('sampling', 'cprofile')
+
+# cProfile hooks are per interpreter on newer Pythons; one profiled request at a time
+_cprofile_lock = threading.Lock()
+
+
+class SamplingProfiler:
+    """Samples one thread's stack from a background thread."""
+
+    extension = 'collapsed'
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.stacks = Counter()
+        self._thread_id = threading.get_ident()
+        self._stopped = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name='profile-sampler', daemon=True)
+
+    def start(self):
+        self._sampler.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._sampler.join()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.items():
+                f.write(f'{stack} {count}\n')
+
+
+class CProfiler:
+    """cProfile for the current thread; holds the process-wide cProfile lock while running."""
+
+    extension = 'prof'
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        _cprofile_lock.release()
+
+    def write(self, path):
+        self.profile.dump_stats(path)
+
+
+def create_profiler(mode, interval):
+    if mode == 'cprofile' and _cprofile_lock.acquire(blocking=False):
+        return CProfiler()
+    return SamplingProfiler(interval)
+
+
+def profile_file_name(profiler):
+    route = request.url_rule.rule if request.url_rule else request.path
+    slug = ''.join(c if c.isalnum() else '_' for c in route).strip('_') or 'root'
+    timestamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+    return f'{timestamp}-{os.getpid()}-{request.method}-{slug}.{profiler.extension}'
+
+
+def prune_spool(directory, max_files):
+    """Delete the oldest profiles so that at most max_files remain."""
+    names = sorted(name for name in os.listdir(directory) if not name.startswith('.'))
+    for name in names[:max(0, len(names) - max_files)]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+
+
+def init_profiling(app):
+    """Register the profiling hooks on app if profiling is configured."""
+    token = app.config['PROFILE_TOKEN']
+    sample_rate = app.config['PROFILE_SAMPLE_RATE']
+    if not token and sample_rate <= 0:
+        return
+    directory = app.config['PROFILE_DIR']
+    interval = app.config['PROFILE_INTERVAL_MS'] / 1000
+    os.makedirs(directory, exist_ok=True)
+
+    @app.before_request
+    def start_profiling():
+        header = request.headers.get(PROFILE_HEADER)
+        requested = bool(token and header and hmac.compare_digest(header.encode(), token.encode()))
+        if not requested and not (sample_rate > 0 and random.random() < sample_rate):
+            return
+        mode = request.headers.get(MODE_HEADER) if requested else None
+        profiler = create_profiler(mode if mode in MODES else app.config['PROFILE_MODE'], interval)
+        g.profile = (profiler, profile_file_name(profiler), requested)
+        profiler.start()
+
+    @app.after_request
+    def add_profile_header(response):
+        profile = g.get('profile')
+        if profile and profile[2]:
+            response.headers[FILE_HEADER] = profile[1]
+        return response
+
+    # Teardown waits for a body wrapped in stream_with_context (GET /api/files?stream=true,
+    # NDJSON imports), so those are profiled to the end. Other streams, like /api/events,
+    # are only profiled until the view returns.
+    @app.teardown_request
+    def finish_profiling(exc):
+        profile = g.pop('profile', None)
+        if profile is None:
+            return
+        profiler, name, _ = profile
+        profiler.stop()
+        tmp_path = os.path.join(directory, f'.{name}')
+        try:
+            profiler.write(tmp_path)
+            os.replace(tmp_path, os.path.join(directory, name))
+            prune_spool(directory, app.config['PROFILE_MAX_FILES'])
+        except OSError as e:
+            logger.warning('Error writing profile %s: %s', name, e)
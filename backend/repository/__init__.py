@@ -0,0 +1,52 @@
+"""Data-access layer with interchangeable Supabase and SQLAlchemy backends.
+
+The backend is selected with ``Config.DATA_BACKEND`` ('supabase' or
+'sqlalchemy'); routes only ever talk to the object returned by
+``get_repository()``.
+"""
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+from config import Config
+from metrics import instrument_engine
+from supabase_client import get_supabase
+from .base import NameConflictError, Repository
+from .sqlalchemy_repository import SQLAlchemyRepository, enable_sqlite_foreign_keys
+from .supabase_repository import SupabaseRepository
+
+
+_repository: Repository | None = None
+
+
+def create_repository_engine(url=None):
+    """Create the pooled engine used by the SQLAlchemy backend."""
+    url = make_url(url or Config.SQLALCHEMY_DATABASE_URI)
+    options = dict(Config.SQLALCHEMY_ENGINE_OPTIONS)
+    if url.get_backend_name() == 'sqlite':
+        engine = create_engine(url, **options)
+        event.listen(engine, 'connect', enable_sqlite_foreign_keys)
+    else:
+        options.update(pool_size=Config.DB_POOL_SIZE, max_overflow=Config.DB_POOL_MAX_OVERFLOW)
+        engine = create_engine(url, **options)
+    instrument_engine(engine)
+    return engine
+
+
+def get_repository() -> Repository:
+    """Get or create the repository singleton for the configured backend."""
+    global _repository
+    if _repository is None:
+        backend = Config.DATA_BACKEND
+        if backend == 'supabase':
+            _repository = SupabaseRepository(get_supabase())
+        elif backend == 'sqlalchemy':
+            _repository = SQLAlchemyRepository(create_repository_engine())
+        else:
+            raise ValueError(f"Unknown DATA_BACKEND '{backend}', expected 'supabase' or 'sqlalchemy'")
+    return _repository
+
+
+def set_repository(repository: Repository | None):
+    """Replace the repository singleton (e.g. with one bound to a local database)."""
+    global _repository
+    _repository = repository
@@ -0,0 +1,194 @@
+"""Data-access interface shared by all repository backends.
+
+Rows are returned as plain dicts with snake_case keys, string ids and ISO 8601
+timestamps, i.e. the shape PostgREST returns, so routes do not depend on the
+backend in use. A ``folder_id``/``parent_folder_id`` of None or '' means root.
+"""
+
+
+class NameConflictError(Exception):
+    """A write would give a file (same name and type) or folder a sibling's name.
+
+    Raised from the unique name indexes, so the check and the write are atomic.
+    """
+
+
+class Repository:
+    """Abstract repository; see SupabaseRepository and SQLAlchemyRepository."""
+
+    name = None
+
+    # Files
+
+    def list_files(self, email, folder_id=None, starred=False, search=None, cursor=None, limit=None):
+        """List files ordered by (uploaded_at, id) descending, starting after cursor.
+
+        ``search`` (ILIKE on name) takes precedence over ``starred``, which takes
+        precedence over ``folder_id``. ``cursor`` is an (uploaded_at, id) tuple.
+        """
+        raise NotImplementedError
+
+    def search_files(self, email, term, limit):
+        """Return up to limit files whose name contains term, best matches first."""
+        raise NotImplementedError
+
+    def get_file(self, email, file_id):
+        """Return a file row, or None if it does not exist for this user."""
+        raise NotImplementedError
+
+    def insert_files(self, rows):
+        """Insert file rows (dicts of column values); raises NameConflictError."""
+        raise NotImplementedError
+
+    def rename_file(self, email, file_id, name):
+        """Rename a file with one UPDATE; return the row, or None if not found.
+
+        Raises NameConflictError if a sibling has the same name and type.
+        """
+        raise NotImplementedError
+
+    def set_starred(self, email, file_id, starred):
+        raise NotImplementedError
+
+    def delete_file(self, email, file_id):
+        raise NotImplementedError
+
+    def set_starred_many(self, email, file_ids, starred):
+        """Star or unstar several files with one statement; return the ids updated."""
+        raise NotImplementedError
+
+    def move_files(self, email, file_ids, folder_id):
+        """Move several files into folder_id (root when None); return the ids moved.
+
+        Raises NameConflictError (and moves nothing) if any name is taken there.
+        """
+        raise NotImplementedError
+
+    def delete_files(self, email, file_ids):
+        """Delete several files with one statement; return the ids deleted."""
+        raise NotImplementedError
+
+    def list_recent_files(self, email, limit):
+        """List up to limit files ordered by (last_interacted, id) descending."""
+        raise NotImplementedError
+
+    def apply_file_updates(self, updates):
+        """Apply per-file updates with one statement; return the ids updated.
+
+        Each update is a dict with ``id`` and ``user_email`` plus the columns
+        to set: ``last_interacted`` (datetime) and/or ``starred``.
+        """
+        raise NotImplementedError
+
+    def get_files_by_ids(self, email, file_ids):
+        """Return the user's files among file_ids, in no particular order."""
+        raise NotImplementedError
+
+    # Folders
+
+    def list_folders(self, email):
+        """List all folders of a user ordered by created_at.
+
+        Listed folders carry their folder_stats counters: ``file_count``,
+        ``starred_count`` and ``last_modified``.
+        """
+        raise NotImplementedError
+
+    def get_folder(self, email, folder_id):
+        """Return a folder row, or None if it does not exist for this user."""
+        raise NotImplementedError
+
+    def get_folders_by_ids(self, email, folder_ids):
+        """Return the user's folders among folder_ids with their folder_stats counters."""
+        raise NotImplementedError
+
+    def folder_exists(self, email, folder_id):
+        return self.get_folder(email, folder_id) is not None
+
+    def insert_folder(self, email, name, parent_folder_id):
+        """Insert a folder and return the created row; raises NameConflictError."""
+        raise NotImplementedError
+
+    def rename_folder(self, email, folder_id, name):
+        """Rename a folder with one UPDATE; return the row, or None if not found.
+
+        Raises NameConflictError if a folder with the same parent has the name.
+        """
+        raise NotImplementedError
+
+    def folder_breadcrumbs(self, email, folder_id):
+        """Return the folder and its ancestors root first, each with its ``depth``
+        below the folder; empty if the folder does not exist for this user."""
+        raise NotImplementedError
+
+    def folder_subtree(self, email, folder_id):
+        """Return the folder and all its descendants ordered by depth, each with its
+        ``depth`` and direct ``file_count``; empty if the folder does not exist."""
+        raise NotImplementedError
+
+    def delete_folder_subtree(self, email, folder_id):
+        """Delete a folder, its descendants and their files in one transaction.
+
+        Returns:
+            dict: ``deleted_folders`` and ``deleted_files`` counts
+        """
+        raise NotImplementedError
+
+    # Jobs
+
+    def insert_job(self, email, kind, max_attempts):
+        """Queue a background job and return the created row."""
+        raise NotImplementedError
+
+    def get_job(self, email, job_id):
+        """Return a job row, or None if it does not exist for this user."""
+        raise NotImplementedError
+
+    def claim_job(self, stale_after):
+        """Atomically take the oldest runnable job and mark it running.
+
+        Runnable means queued and due, or running without a heartbeat for
+        stale_after seconds (its worker died). Returns the row or None.
+        """
+        raise NotImplementedError
+
+    def update_job(self, job_id, **values):
+        """Update job columns and refresh its updated_at heartbeat."""
+        raise NotImplementedError
+
+    def delete_user_data_chunk(self, email, limit):
+        """Delete up to limit of a user's files, or folders once no files remain.
+
+        Returns:
+            int: rows deleted; 0 once the user has no files or folders left
+        """
+        raise NotImplementedError
+
+    # Changes
+
+    def get_change_bounds(self, email):
+        """Return (head, floor) of the user's change log: the latest seq and the
+        seq up to which entries may have been pruned; (0, 0) for unknown users."""
+        raise NotImplementedError
+
+    def get_change_heads(self, emails):
+        """Return {email: latest change seq} for those of emails that exist."""
+        raise NotImplementedError
+
+    def list_changes(self, email, since, limit):
+        """Return up to limit change log rows with seq > since, oldest first."""
+        raise NotImplementedError
+
+    # Account
+
+    def get_data_version(self, email):
+        """Return the user's data version (0 if the user does not exist)."""
+        raise NotImplementedError
+
+    def bump_data_version(self, email):
+        """Advance the user's data version to a new, never reused value."""
+        raise NotImplementedError
+
+    def delete_user(self, email):
+        """Delete a user; files and folders go with it through ON DELETE CASCADE."""
+        raise NotImplementedError
@@ -0,0 +1,474 @@
+"""Repository backend that talks to the database directly through a pooled SQLAlchemy engine."""
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from uuid import UUID
+
+from sqlalchemy import and_, case, delete, func, insert, or_, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+
+from models import Change, File, Folder, FolderClosure, FolderStats, Job, User
+from .base import NameConflictError, Repository
+
+
+files_table = File.__table__
+folders_table = Folder.__table__
+users_table = User.__table__
+jobs_table = Job.__table__
+closure_table = FolderClosure.__table__
+stats_table = FolderStats.__table__
+changes_table = Change.__table__
+
+
+def escape_like(term):
+    """Escape LIKE wildcards so that term is matched literally (escape char: backslash)."""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def to_uuid(value):
+    """Convert an id from the API to a UUID; raises ValueError if malformed."""
+    return value if isinstance(value, UUID) else UUID(str(value))
+
+
+def row_to_dict(row):
+    """Convert a result row to the JSON-ready dict shape PostgREST returns."""
+    result = {}
+    for key, value in row._mapping.items():
+        if isinstance(value, UUID):
+            value = str(value)
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        result[key] = value
+    return result
+
+
+@contextmanager
+def name_conflicts():
+    """Translate unique name index violations into NameConflictError."""
+    try:
+        yield
+    except IntegrityError as e:
+        # 23505 is unique_violation on Postgres; SQLite only reports it in the message
+        if getattr(e.orig, 'pgcode', None) == '23505' or 'UNIQUE constraint failed' in str(e.orig):
+            raise NameConflictError(str(e.orig)) from e
+        raise
+
+
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite ignores ON DELETE CASCADE unless foreign keys are switched on per connection."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+
+
+class SQLAlchemyRepository(Repository):
+    """Data access over a pooled SQLAlchemy engine (Postgres, or SQLite as a local stand-in)."""
+
+    name = 'sqlalchemy'
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def _fetch_all(self, statement):
+        with self.engine.connect() as conn:
+            return [row_to_dict(row) for row in conn.execute(statement)]
+
+    def _fetch_one(self, statement):
+        with self.engine.connect() as conn:
+            row = conn.execute(statement).first()
+            return row_to_dict(row) if row else None
+
+    def _execute(self, statement):
+        with self.engine.begin() as conn:
+            return conn.execute(statement)
+
+    # Statements are built by *_query / *_statement methods, which
+    # `flask check-query-plans` also compiles and EXPLAINs.
+
+    # Files
+
+    def list_files(self, email, folder_id=None, starred=False, search=None, cursor=None, limit=None):
+        return self._fetch_all(self.list_files_query(email, folder_id, starred, search, cursor, limit))
+
+    def list_files_query(self, email, folder_id=None, starred=False, search=None, cursor=None, limit=None):
+        c = files_table.c
+        query = select(files_table).where(c.user_email == email)
+
+        if search and search.strip():
+            query = query.where(c.name.ilike(f'%{escape_like(search.strip())}%', escape='\\'))
+        elif starred:
+            query = query.where(c.starred.is_(True))
+        elif folder_id is None or folder_id == '':
+            query = query.where(c.folder_id.is_(None))
+        elif folder_id:
+            query = query.where(c.folder_id == to_uuid(folder_id))
+
+        if cursor:
+            uploaded_at = datetime.fromisoformat(cursor[0])
+            file_id = to_uuid(cursor[1])
+            query = query.where(or_(
+                c.uploaded_at < uploaded_at,
+                and_(c.uploaded_at == uploaded_at, c.id < file_id),
+            ))
+
+        query = query.order_by(c.uploaded_at.desc(), c.id.desc())
+        if limit:
+            query = query.limit(limit)
+        return query
+
+    def search_files(self, email, term, limit):
+        return self._fetch_all(self.search_files_query(email, term, limit))
+
+    def search_files_query(self, email, term, limit):
+        c = files_table.c
+        pattern = escape_like(term)
+        ranking = [
+            (func.lower(c.name) == term.lower()).desc(),
+            c.name.ilike(f'{pattern}%', escape='\\').desc(),
+        ]
+        if self.engine.dialect.name == 'postgresql':
+            ranking.append(func.similarity(c.name, term).desc())
+
+        return (
+            select(files_table)
+            .where(c.user_email == email, c.name.ilike(f'%{pattern}%', escape='\\'))
+            .order_by(*ranking, c.uploaded_at.desc(), c.id.desc())
+            .limit(limit)
+        )
+
+    def get_file(self, email, file_id):
+        c = files_table.c
+        return self._fetch_one(select(files_table).where(c.id == to_uuid(file_id), c.user_email == email))
+
+    def insert_files(self, rows):
+        rows = [
+            {**row, 'folder_id': to_uuid(row['folder_id']) if row.get('folder_id') else None}
+            for row in rows
+        ]
+        with name_conflicts(), self.engine.begin() as conn:
+            conn.execute(insert(files_table), rows)
+
+    def rename_file(self, email, file_id, name):
+        with name_conflicts(), self.engine.begin() as conn:
+            row = conn.execute(self.rename_file_statement(email, file_id, name)).first()
+            return row_to_dict(row) if row else None
+
+    def rename_file_statement(self, email, file_id, name):
+        c = files_table.c
+        return (
+            update(files_table)
+            .where(c.id == to_uuid(file_id), c.user_email == email)
+            .values(name=name)
+            .returning(*files_table.c)
+        )
+
+    def set_starred(self, email, file_id, starred):
+        c = files_table.c
+        self._execute(update(files_table).where(c.id == to_uuid(file_id), c.user_email == email).values(starred=starred))
+
+    def delete_file(self, email, file_id):
+        self._execute(self.delete_file_statement(email, file_id))
+
+    def delete_file_statement(self, email, file_id):
+        c = files_table.c
+        return delete(files_table).where(c.id == to_uuid(file_id), c.user_email == email)
+
+    def update_files_statement(self, email, file_ids, **values):
+        """UPDATE of several files at once (batch star and move), returning the ids updated."""
+        c = files_table.c
+        return (
+            update(files_table)
+            .where(c.id.in_([to_uuid(i) for i in file_ids]), c.user_email == email)
+            .values(**values)
+            .returning(c.id)
+        )
+
+    def _update_many(self, email, file_ids, **values):
+        with name_conflicts(), self.engine.begin() as conn:
+            return [str(i) for i in conn.execute(self.update_files_statement(email, file_ids, **values)).scalars()]
+
+    def set_starred_many(self, email, file_ids, starred):
+        return self._update_many(email, file_ids, starred=starred)
+
+    def move_files(self, email, file_ids, folder_id):
+        return self._update_many(email, file_ids, folder_id=to_uuid(folder_id) if folder_id else None)
+
+    def delete_files(self, email, file_ids):
+        with self.engine.begin() as conn:
+            return [str(i) for i in conn.execute(self.delete_files_statement(email, file_ids)).scalars()]
+
+    def delete_files_statement(self, email, file_ids):
+        c = files_table.c
+        return (
+            delete(files_table)
+            .where(c.id.in_([to_uuid(i) for i in file_ids]), c.user_email == email)
+            .returning(c.id)
+        )
+
+    def list_recent_files(self, email, limit):
+        return self._fetch_all(self.list_recent_files_query(email, limit))
+
+    def list_recent_files_query(self, email, limit):
+        c = files_table.c
+        return (
+            select(files_table)
+            .where(c.user_email == email)
+            .order_by(c.last_interacted.desc(), c.id.desc())
+            .limit(limit)
+        )
+
+    def apply_file_updates(self, updates):
+        statement = self.apply_file_updates_statement(updates)
+        if statement is None:
+            return []
+        with self.engine.begin() as conn:
+            return [str(i) for i in conn.execute(statement).scalars()]
+
+    def apply_file_updates_statement(self, updates):
+        """One UPDATE applying every update (CASE per column); None if nothing is to be set."""
+        c = files_table.c
+        values = {}
+        for column in ('last_interacted', 'starred'):
+            new_values = {to_uuid(u['id']): u[column] for u in updates if column in u}
+            if new_values:
+                values[column] = case(new_values, value=c.id, else_=c[column])
+        if not values:
+            return None
+        keys = [(to_uuid(u['id']), u['user_email']) for u in updates]
+        return (
+            update(files_table)
+            .where(c.id.in_([key[0] for key in keys]), tuple_(c.id, c.user_email).in_(keys))
+            .values(**values)
+            .returning(c.id)
+        )
+
+    def get_files_by_ids(self, email, file_ids):
+        return self._fetch_all(self.get_files_by_ids_query(email, file_ids))
+
+    def get_files_by_ids_query(self, email, file_ids):
+        c = files_table.c
+        return select(files_table).where(c.id.in_([to_uuid(i) for i in file_ids]), c.user_email == email)
+
+    # Folders
+
+    def _select_folders_with_stats(self):
+        stats = stats_table.c
+        return select(
+            folders_table,
+            func.coalesce(stats.file_count, 0).label('file_count'),
+            func.coalesce(stats.starred_count, 0).label('starred_count'),
+            stats.last_modified,
+        ).outerjoin(stats_table, stats.folder_id == folders_table.c.id)
+
+    def list_folders(self, email):
+        return self._fetch_all(self.list_folders_query(email))
+
+    def list_folders_query(self, email):
+        c = folders_table.c
+        return self._select_folders_with_stats().where(c.user_email == email).order_by(c.created_at)
+
+    def get_folder(self, email, folder_id):
+        return self._fetch_one(self.get_folder_query(email, folder_id))
+
+    def get_folder_query(self, email, folder_id):
+        c = folders_table.c
+        return select(folders_table).where(c.id == to_uuid(folder_id), c.user_email == email)
+
+    def get_folders_by_ids(self, email, folder_ids):
+        return self._fetch_all(self.get_folders_by_ids_query(email, folder_ids))
+
+    def get_folders_by_ids_query(self, email, folder_ids):
+        c = folders_table.c
+        return self._select_folders_with_stats().where(c.id.in_([to_uuid(i) for i in folder_ids]), c.user_email == email)
+
+    def insert_folder(self, email, name, parent_folder_id):
+        values = {
+            'user_email': email,
+            'name': name,
+            'parent_folder_id': to_uuid(parent_folder_id) if parent_folder_id else None,
+        }
+        with name_conflicts(), self.engine.begin() as conn:
+            row = conn.execute(insert(folders_table).values(**values).returning(*folders_table.c)).first()
+            return row_to_dict(row) if row else None
+
+    def rename_folder(self, email, folder_id, name):
+        with name_conflicts(), self.engine.begin() as conn:
+            row = conn.execute(self.rename_folder_statement(email, folder_id, name)).first()
+            return row_to_dict(row) if row else None
+
+    def rename_folder_statement(self, email, folder_id, name):
+        c = folders_table.c
+        return (
+            update(folders_table)
+            .where(c.id == to_uuid(folder_id), c.user_email == email)
+            .values(name=name)
+            .returning(*folders_table.c)
+        )
+
+    def folder_breadcrumbs(self, email, folder_id):
+        return self._fetch_all(self.folder_breadcrumbs_query(email, folder_id))
+
+    def folder_breadcrumbs_query(self, email, folder_id):
+        c, closure = folders_table.c, closure_table.c
+        return (
+            select(c.id, c.name, c.parent_folder_id, c.created_at, closure.depth)
+            .join(closure_table, closure.ancestor_id == c.id)
+            .where(closure.descendant_id == to_uuid(folder_id), c.user_email == email)
+            .order_by(closure.depth.desc())
+        )
+
+    def folder_subtree(self, email, folder_id):
+        return self._fetch_all(self.folder_subtree_query(email, folder_id))
+
+    def folder_subtree_query(self, email, folder_id):
+        c, closure = folders_table.c, closure_table.c
+        file_count = (
+            select(func.count()).select_from(files_table)
+            .where(files_table.c.folder_id == c.id)
+            .scalar_subquery()
+        )
+        return (
+            select(c.id, c.name, c.parent_folder_id, c.created_at, closure.depth, file_count.label('file_count'))
+            .join(closure_table, closure.descendant_id == c.id)
+            .where(closure.ancestor_id == to_uuid(folder_id), c.user_email == email)
+            .order_by(closure.depth, c.created_at)
+        )
+
+    def delete_folder_subtree(self, email, folder_id):
+        with self.engine.begin() as conn:
+            subtree_ids = list(conn.execute(self.folder_subtree_ids_query(email, folder_id)).scalars())
+            if not subtree_ids:
+                return {'deleted_folders': 0, 'deleted_files': 0}
+            deleted_files = conn.execute(self.delete_subtree_files_statement(email, subtree_ids)).rowcount
+            deleted_folders = conn.execute(self.delete_subtree_folders_statement(email, subtree_ids)).rowcount
+        return {'deleted_folders': deleted_folders, 'deleted_files': deleted_files}
+
+    def folder_subtree_ids_query(self, email, folder_id):
+        c, closure = folders_table.c, closure_table.c
+        return (
+            select(closure.descendant_id)
+            .join(folders_table, c.id == closure.ancestor_id)
+            .where(closure.ancestor_id == to_uuid(folder_id), c.user_email == email)
+        )
+
+    def delete_subtree_files_statement(self, email, subtree_ids):
+        c = files_table.c
+        return delete(files_table).where(c.user_email == email, c.folder_id.in_(subtree_ids))
+
+    def delete_subtree_folders_statement(self, email, subtree_ids):
+        c = folders_table.c
+        return delete(folders_table).where(c.user_email == email, c.id.in_(subtree_ids))
+
+    # Jobs
+
+    def insert_job(self, email, kind, max_attempts):
+        values = {'user_email': email, 'kind': kind, 'max_attempts': max_attempts}
+        with self.engine.begin() as conn:
+            row = conn.execute(insert(jobs_table).values(**values).returning(*jobs_table.c)).first()
+            return row_to_dict(row) if row else None
+
+    def get_job(self, email, job_id):
+        return self._fetch_one(self.get_job_query(email, job_id))
+
+    def get_job_query(self, email, job_id):
+        c = jobs_table.c
+        return select(jobs_table).where(c.id == to_uuid(job_id), c.user_email == email)
+
+    def _runnable_jobs(self, now, stale_after):
+        c = jobs_table.c
+        return or_(
+            and_(c.status == 'queued', c.run_after <= now),
+            and_(c.status == 'running', c.updated_at < now - timedelta(seconds=stale_after)),
+        )
+
+    def claim_job_query(self, now, stale_after):
+        """The id of the oldest runnable job, locked where SKIP LOCKED is available."""
+        c = jobs_table.c
+        candidate = select(c.id).where(self._runnable_jobs(now, stale_after)).order_by(c.created_at).limit(1)
+        if self.engine.dialect.name == 'postgresql':
+            candidate = candidate.with_for_update(skip_locked=True)
+        return candidate
+
+    def claim_job(self, stale_after):
+        c = jobs_table.c
+        now = datetime.utcnow()
+        runnable = self._runnable_jobs(now, stale_after)
+
+        with self.engine.begin() as conn:
+            job_id = conn.execute(self.claim_job_query(now, stale_after)).scalar()
+            if job_id is None:
+                return None
+            # Re-checking runnable makes the claim safe where SKIP LOCKED is unavailable
+            row = conn.execute(
+                update(jobs_table)
+                .where(c.id == job_id, runnable)
+                .values(status='running', attempts=c.attempts + 1, updated_at=now)
+                .returning(*jobs_table.c)
+            ).first()
+            return row_to_dict(row) if row else None
+
+    def update_job(self, job_id, **values):
+        c = jobs_table.c
+        self._execute(update(jobs_table).where(c.id == to_uuid(job_id)).values(updated_at=datetime.utcnow(), **values))
+
+    def delete_user_data_chunk(self, email, limit):
+        with self.engine.begin() as conn:
+            for table in (files_table, folders_table):
+                deleted = conn.execute(self.delete_chunk_statement(table, email, limit)).rowcount
+                if deleted:
+                    return deleted
+        return 0
+
+    def delete_chunk_statement(self, table, email, limit):
+        """DELETE of up to limit of the user's rows of table (files or folders)."""
+        c = table.c
+        chunk = select(c.id).where(c.user_email == email).limit(limit)
+        return delete(table).where(c.id.in_(chunk))
+
+    # Changes
+
+    def get_change_bounds(self, email):
+        with self.engine.connect() as conn:
+            row = conn.execute(self.get_change_bounds_query(email)).first()
+        return (row.change_seq, row.changes_floor) if row else (0, 0)
+
+    def get_change_bounds_query(self, email):
+        c = users_table.c
+        return select(c.change_seq, c.changes_floor).where(c.email == email)
+
+    def get_change_heads(self, emails):
+        c = users_table.c
+        with self.engine.connect() as conn:
+            return dict(conn.execute(select(c.email, c.change_seq).where(c.email.in_(emails))).all())
+
+    def list_changes(self, email, since, limit):
+        return self._fetch_all(self.list_changes_query(email, since, limit))
+
+    def list_changes_query(self, email, since, limit):
+        c = changes_table.c
+        return (
+            select(changes_table)
+            .where(c.user_email == email, c.seq > since)
+            .order_by(c.seq)
+            .limit(limit)
+        )
+
+    # Account
+
+    def get_data_version(self, email):
+        c = users_table.c
+        with self.engine.connect() as conn:
+            version = conn.execute(select(c.data_version).where(c.email == email)).scalar()
+        return version or 0
+
+    def bump_data_version(self, email):
+        c = users_table.c
+        now_us = time.time_ns() // 1000
+        next_version = case((c.data_version + 1 > now_us, c.data_version + 1), else_=now_us)
+        self._execute(update(users_table).where(c.email == email).values(data_version=next_version))
+
+    def delete_user(self, email):
+        self._execute(self.delete_user_statement(email))
+
+    def delete_user_statement(self, email):
+        return delete(users_table).where(users_table.c.email == email)
@@ -0,0 +1,227 @@
+"""Repository backend that talks to Postgres through the Supabase (PostgREST) API."""
+from contextlib import contextmanager
+from datetime import datetime
+
+from postgrest.exceptions import APIError
+
+from .base import NameConflictError, Repository
+
+
+FOLDER_COLUMNS = '*, folder_stats(file_count, starred_count, last_modified)'
+
+
+def flatten_folder_stats(folders):
+    """Move the embedded folder_stats row into the folder row (zeros when absent)."""
+    for folder in folders:
+        stats = folder.pop('folder_stats', None)
+        if isinstance(stats, list):
+            stats = stats[0] if stats else None
+        stats = stats or {}
+        folder['file_count'] = stats.get('file_count', 0)
+        folder['starred_count'] = stats.get('starred_count', 0)
+        folder['last_modified'] = stats.get('last_modified')
+    return folders
+
+
+@contextmanager
+def name_conflicts():
+    """Translate unique name index violations (SQLSTATE 23505) into NameConflictError."""
+    try:
+        yield
+    except APIError as e:
+        if e.code == '23505':
+            raise NameConflictError(e.message) from e
+        raise
+
+
+class SupabaseRepository(Repository):
+    """Data access over PostgREST using the shared Supabase client."""
+
+    name = 'supabase'
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+
+    # Files
+
+    def list_files(self, email, folder_id=None, starred=False, search=None, cursor=None, limit=None):
+        files_query = self.supabase.table('files').select('*').eq('user_email', email)
+
+        if search and search.strip():
+            files_query = files_query.ilike('name', f'%{search.strip()}%')
+        elif starred:
+            files_query = files_query.eq('starred', True)
+        elif folder_id is None or folder_id == '':
+            files_query = files_query.is_('folder_id', None)
+        elif folder_id:
+            files_query = files_query.eq('folder_id', folder_id)
+
+        if cursor:
+            uploaded_at, file_id = cursor
+            files_query = files_query.or_(
+                f'uploaded_at.lt."{uploaded_at}",and(uploaded_at.eq."{uploaded_at}",id.lt."{file_id}")'
+            )
+
+        files_query = files_query.order('uploaded_at', desc=True).order('id', desc=True)
+        if limit:
+            files_query = files_query.limit(limit)
+
+        files_response = files_query.execute()
+        return files_response.data if files_response.data else []
+
+    def search_files(self, email, term, limit):
+        response = self.supabase.rpc('search_files', {'p_user_email': email, 'p_term': term, 'p_limit': limit}).execute()
+        return response.data if response.data else []
+
+    def get_file(self, email, file_id):
+        response = self.supabase.table('files').select('*').eq('id', file_id).eq('user_email', email).execute()
+        return response.data[0] if response.data else None
+
+    def insert_files(self, rows):
+        with name_conflicts():
+            self.supabase.table('files').insert(rows).execute()
+
+    def rename_file(self, email, file_id, name):
+        with name_conflicts():
+            response = self.supabase.table('files').update({'name': name}).eq('id', file_id).eq('user_email', email).execute()
+        return response.data[0] if response.data else None
+
+    def set_starred(self, email, file_id, starred):
+        self.supabase.table('files').update({'starred': starred}).eq('id', file_id).eq('user_email', email).execute()
+
+    def delete_file(self, email, file_id):
+        self.supabase.table('files').delete().eq('id', file_id).eq('user_email', email).execute()
+
+    def set_starred_many(self, email, file_ids, starred):
+        response = self.supabase.table('files').update({'starred': starred}).in_('id', file_ids).eq('user_email', email).execute()
+        return [row['id'] for row in response.data or []]
+
+    def move_files(self, email, file_ids, folder_id):
+        with name_conflicts():
+            response = self.supabase.table('files').update({'folder_id': folder_id}).in_('id', file_ids).eq('user_email', email).execute()
+        return [row['id'] for row in response.data or []]
+
+    def delete_files(self, email, file_ids):
+        response = self.supabase.table('files').delete().in_('id', file_ids).eq('user_email', email).execute()
+        return [row['id'] for row in response.data or []]
+
+    def list_recent_files(self, email, limit):
+        response = (
+            self.supabase.table('files').select('*').eq('user_email', email)
+            .order('last_interacted', desc=True).order('id', desc=True)
+            .limit(limit)
+            .execute()
+        )
+        return response.data if response.data else []
+
+    def apply_file_updates(self, updates):
+        updates = [
+            {key: value.isoformat() if isinstance(value, datetime) else value for key, value in u.items()}
+            for u in updates
+        ]
+        response = self.supabase.rpc('apply_file_updates', {'p_updates': updates}).execute()
+        return response.data or []
+
+    def get_files_by_ids(self, email, file_ids):
+        response = self.supabase.table('files').select('*').in_('id', file_ids).eq('user_email', email).execute()
+        return response.data if response.data else []
+
+    # Folders
+
+    def list_folders(self, email):
+        folders_response = self.supabase.table('folders').select(FOLDER_COLUMNS).eq('user_email', email).order('created_at', desc=False).execute()
+        return flatten_folder_stats(folders_response.data) if folders_response.data else []
+
+    def get_folder(self, email, folder_id):
+        response = self.supabase.table('folders').select('*').eq('id', folder_id).eq('user_email', email).execute()
+        return response.data[0] if response.data else None
+
+    def get_folders_by_ids(self, email, folder_ids):
+        response = self.supabase.table('folders').select(FOLDER_COLUMNS).in_('id', folder_ids).eq('user_email', email).execute()
+        return flatten_folder_stats(response.data) if response.data else []
+
+    def insert_folder(self, email, name, parent_folder_id):
+        with name_conflicts():
+            folder_response = self.supabase.table('folders').insert({
+                'user_email': email,
+                'name': name,
+                'parent_folder_id': parent_folder_id,
+            }).execute()
+        return folder_response.data[0] if folder_response.data else None
+
+    def rename_folder(self, email, folder_id, name):
+        with name_conflicts():
+            response = self.supabase.table('folders').update({'name': name}).eq('id', folder_id).eq('user_email', email).execute()
+        return response.data[0] if response.data else None
+
+    def folder_breadcrumbs(self, email, folder_id):
+        response = self.supabase.rpc('folder_breadcrumbs', {'p_folder_id': folder_id, 'p_user_email': email}).execute()
+        return response.data if response.data else []
+
+    def folder_subtree(self, email, folder_id):
+        response = self.supabase.rpc('folder_subtree', {'p_folder_id': folder_id, 'p_user_email': email}).execute()
+        return response.data if response.data else []
+
+    def delete_folder_subtree(self, email, folder_id):
+        response = self.supabase.rpc('delete_folder_subtree', {'p_folder_id': folder_id, 'p_user_email': email}).execute()
+        return response.data[0] if response.data else {'deleted_folders': 0, 'deleted_files': 0}
+
+    # Jobs
+
+    def insert_job(self, email, kind, max_attempts):
+        response = self.supabase.table('jobs').insert({
+            'user_email': email,
+            'kind': kind,
+            'max_attempts': max_attempts,
+        }).execute()
+        return response.data[0] if response.data else None
+
+    def get_job(self, email, job_id):
+        response = self.supabase.table('jobs').select('*').eq('id', job_id).eq('user_email', email).execute()
+        return response.data[0] if response.data else None
+
+    def claim_job(self, stale_after):
+        response = self.supabase.rpc('claim_job', {'p_stale_seconds': stale_after}).execute()
+        return response.data[0] if response.data else None
+
+    def update_job(self, job_id, **values):
+        values['updated_at'] = datetime.utcnow()
+        values = {key: value.isoformat() if isinstance(value, datetime) else value for key, value in values.items()}
+        self.supabase.table('jobs').update(values).eq('id', job_id).execute()
+
+    def delete_user_data_chunk(self, email, limit):
+        response = self.supabase.rpc('delete_user_data_chunk', {'p_user_email': email, 'p_limit': limit}).execute()
+        return response.data or 0
+
+    # Changes
+
+    def get_change_bounds(self, email):
+        response = self.supabase.table('users').select('change_seq, changes_floor').eq('email', email).execute()
+        if not response.data:
+            return 0, 0
+        return response.data[0]['change_seq'], response.data[0]['changes_floor']
+
+    def get_change_heads(self, emails):
+        response = self.supabase.table('users').select('email, change_seq').in_('email', emails).execute()
+        return {row['email']: row['change_seq'] for row in response.data or []}
+
+    def list_changes(self, email, since, limit):
+        response = (
+            self.supabase.table('changes').select('*')
+            .eq('user_email', email).gt('seq', since)
+            .order('seq').limit(limit)
+            .execute()
+        )
+        return response.data if response.data else []
+
+    # Account
+
+    def get_data_version(self, email):
+        response = self.supabase.table('users').select('data_version').eq('email', email).execute()
+        return response.data[0]['data_version'] if response.data else 0
+
+    def bump_data_version(self, email):
+        self.supabase.rpc('bump_data_version', {'p_user_email': email}).execute()
+
+    def delete_user(self, email):
+        self.supabase.table('users').delete().eq('email', email).execute()
@@ -2,6 +2,7 @@
 from supabase import create_client, Client
 
 from config import Config
+from metrics import instrument_supabase
 
 
 _supabase_client: Client | None = None
@@ -16,5 +17,6 @@ def get_supabase() -> Client:
         if not url or not key:
             raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
         _supabase_client = create_client(url, key)
+        instrument_supabase(_supabase_client)
     return _supabase_client
 
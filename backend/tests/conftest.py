@@ -0,0 +1,56 @@
+"""Fixtures running the API on a throwaway SQLite database through the SQLAlchemy repository."""
+import os
+
+# Read by config at import time, so set before the app is imported
+os.environ['DATA_BACKEND'] = 'sqlalchemy'
+os.environ['JOB_WORKER_ENABLED'] = 'false'
+os.environ['WRITE_BEHIND_ENABLED'] = 'false'
+os.environ['AUTH_TRUST_USER_EMAIL_HEADER'] = 'true'
+
+import pytest
+from sqlalchemy import insert
+
+from app import app as flask_app
+from folder_cache import folder_cache
+from models import User, db
+from repository import SQLAlchemyRepository, create_repository_engine, set_repository
+
+EMAIL = 'test@example.com'
+
+
+@pytest.fixture
+def repo(tmp_path):
+    engine = create_repository_engine(f'sqlite:///{tmp_path / "test.db"}')
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User.__table__).values(email=EMAIL))
+    repository = SQLAlchemyRepository(engine)
+    set_repository(repository)
+    folder_cache.clear()
+    yield repository
+    set_repository(None)
+    engine.dispose()
+
+
+@pytest.fixture
+def app(repo):
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    client.environ_base['HTTP_X_USER_EMAIL'] = EMAIL
+    return client
+
+
+@pytest.fixture
+def make_files(client, repo):
+    """Create files through the API; return their rows, newest first."""
+    def make(names, folder_id=None, mime_type='application/pdf'):
+        files = [{'name': name, 'url': 'https://example.com', 'mimeType': mime_type} for name in names]
+        response = client.post('/api/files', json={'files': files, 'folderId': folder_id})
+        assert response.status_code == 200, response.json
+        rows = repo.list_files(EMAIL, folder_id=folder_id)
+        return [row for row in rows if row['name'] in names]
+    return make
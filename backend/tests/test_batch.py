@@ -0,0 +1,44 @@
+from uuid import uuid4
+
+from conftest import EMAIL
+
+
+def statuses(response):
+    return {result['fileId']: result['status'] for result in response.json['results']}
+
+
+def test_batch_star_reports_each_item(client, repo, make_files):
+    a, b = (f['id'] for f in make_files(['a', 'b']))
+    missing = str(uuid4())
+
+    response = client.patch('/api/files/batch/starred',
+                            json={'fileIds': [a, b.upper(), missing, 'nope'], 'starred': True})
+    assert response.status_code == 200
+    assert response.json['updated'] == 2
+    assert statuses(response) == {a: 'ok', b: 'ok', missing: 'not_found', 'nope': 'invalid_id'}
+    assert {f['id'] for f in repo.list_files(EMAIL, starred=True)} == {a, b}
+
+
+def test_batch_delete_only_touches_own_files(client, repo, make_files):
+    a, b = (f['id'] for f in make_files(['a', 'b']))
+
+    other = client.delete('/api/files/batch', json={'fileIds': [a]}, headers={'X-User-Email': 'other@example.com'})
+    assert statuses(other) == {a: 'not_found'}
+
+    response = client.delete('/api/files/batch', json={'fileIds': [a]})
+    assert statuses(response) == {a: 'ok'}
+    assert [f['id'] for f in repo.list_files(EMAIL)] == [b]
+
+
+def test_batch_requires_file_ids(client, repo):
+    assert client.patch('/api/files/batch/starred', json={'fileIds': [], 'starred': True}).status_code == 400
+    assert client.delete('/api/files/batch', json={}).status_code == 400
+
+
+def test_batch_size_limit_follows_app_config(app, client, make_files, monkeypatch):
+    file_ids = [f['id'] for f in make_files(['a', 'b', 'c'])]
+    monkeypatch.setitem(app.config, 'FILES_BATCH_MAX_ITEMS', 2)
+
+    response = client.delete('/api/files/batch', json={'fileIds': file_ids})
+    assert response.status_code == 413
+    assert client.delete('/api/files/batch', json={'fileIds': file_ids[:2]}).status_code == 200
@@ -0,0 +1,46 @@
+from conftest import EMAIL
+
+
+def test_changes_collapse_and_report_tombstones(client, repo, make_files):
+    start = client.get('/api/changes').json['cursor']
+
+    kept, removed = (f['id'] for f in sorted(make_files(['kept', 'removed']), key=lambda f: f['name']))
+    assert client.patch('/api/files', json={'fileId': kept, 'name': 'renamed'}).status_code == 200
+    assert client.delete(f'/api/files?fileId={removed}').status_code == 200
+
+    response = client.get(f'/api/changes?since={start}')
+    assert response.status_code == 200
+    body = response.json
+    changes = {change['id']: change for change in body['changes']}
+
+    assert set(changes) == {kept, removed}
+    assert changes[kept]['op'] == 'upsert'
+    assert changes[kept]['file']['name'] == 'renamed'
+    assert changes[removed]['op'] == 'delete'
+    assert 'file' not in changes[removed]
+    assert body['cursor'] == repo.get_change_bounds(EMAIL)[0]
+    assert body['hasMore'] is False
+
+    caught_up = client.get(f"/api/changes?since={body['cursor']}").json
+    assert caught_up == {'changes': [], 'cursor': body['cursor'], 'hasMore': False}
+
+
+def test_changes_are_paged_by_limit(client, make_files):
+    make_files(['a', 'b', 'c'])
+
+    first = client.get('/api/changes?since=0&limit=2').json
+    assert len(first['changes']) == 2
+    assert first['hasMore'] is True
+
+    rest = client.get(f"/api/changes?since={first['cursor']}&limit=2").json
+    assert len(rest['changes']) == 1
+    assert rest['hasMore'] is False
+
+
+def test_invalid_and_expired_cursors(client, repo, make_files):
+    make_files(['a'])
+    head = repo.get_change_bounds(EMAIL)[0]
+
+    assert client.get('/api/changes?since=abc').status_code == 400
+    assert client.get('/api/changes?since=-1').status_code == 400
+    assert client.get(f'/api/changes?since={head + 1}').status_code == 410
@@ -0,0 +1,39 @@
+import json
+
+from sqlalchemy import create_engine
+
+from commands import compile_statement, endpoint_queries, plans_from_notices, rpc_calls, rpc_statement
+from repository import SQLAlchemyRepository
+
+
+def test_endpoint_queries_compile_for_postgres(app):
+    engine = create_engine('postgresql+psycopg2://localhost/explain')
+    queries = endpoint_queries(SQLAlchemyRepository(engine), app.config)
+
+    sql = {name: compile_statement(statement, engine.dialect) for name, statement in queries.items()}
+    assert "ILIKE '%report%'" in sql['GET /api/files (search)']
+    assert 'similarity(files.name' in sql['GET /api/files (search)']
+    assert 'CASE files.id' in sql['write-behind flush (PATCH /api/files/starred, POST /api/files/opened)']
+
+
+def test_endpoint_queries_run_on_the_schema(app, repo):
+    with repo.engine.connect() as conn:
+        for name, statement in endpoint_queries(repo, app.config).items():
+            sql = compile_statement(statement, conn.dialect)
+            assert conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}').all(), name
+
+
+def test_rpc_plans_are_read_from_auto_explain_notices():
+    plan = {'Node Type': 'Seq Scan', 'Relation Name': 'files'}
+    notices = [
+        'NOTICE:  duration: 0.042 ms  plan:\n' + json.dumps({'Query Text': 'DELETE FROM files', 'Plan': plan}, indent=2)
+        + '\nCONTEXT:  PL/pgSQL function delete_user_data_chunk(text,integer) line 5 at SQL statement\n',
+        'NOTICE:  relation "files" does not exist, skipping\n',
+    ]
+    assert plans_from_notices(notices) == [plan]
+
+
+def test_rpc_calls_use_named_arguments(app):
+    function, args = rpc_calls(app.config)['GET /api/folders/<id>/subtree (rpc)']
+    statement = rpc_statement(function, args)
+    assert str(statement) == 'SELECT * FROM folder_subtree(p_folder_id => :p_folder_id, p_user_email => :p_user_email)'
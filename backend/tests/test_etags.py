@@ -0,0 +1,31 @@
+def test_unchanged_listing_is_not_modified(client, make_files):
+    make_files(['a'])
+    first = client.get('/api/files')
+    etag = first.headers['ETag']
+
+    again = client.get('/api/files', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == etag
+    assert again.data == b''
+
+    make_files(['b'])
+    changed = client.get('/api/files', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_etag_differs_per_listing(client, make_files):
+    make_files(['a'])
+    assert client.get('/api/files').headers['ETag'] != client.get('/api/files?starred=true').headers['ETag']
+
+
+def test_compressed_listing_has_its_own_etag(client, make_files):
+    make_files([f'quarterly-report-{n}' for n in range(20)])
+    plain = client.get('/api/files').headers['ETag']
+    gzipped = client.get('/api/files', headers={'Accept-Encoding': 'gzip'})
+    assert gzipped.headers['Content-Encoding'] == 'gzip'
+    assert gzipped.headers['ETag'] == plain[:-1] + '-gzip"'
+
+    again = client.get('/api/files', headers={'Accept-Encoding': 'gzip', 'If-None-Match': gzipped.headers['ETag']})
+    assert again.status_code == 304
+    assert again.headers['ETag'] == gzipped.headers['ETag']
@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+from conftest import EMAIL
+
+
+def test_pages_follow_cursor_to_the_end(client, repo):
+    # Distinct upload times, so the expected order does not depend on id ties
+    repo.insert_files([
+        {'user_email': EMAIL, 'name': f'file-{n}', 'url': 'https://example.com',
+         'uploaded_at': datetime(2026, 1, 1) + timedelta(seconds=n)}
+        for n in range(5)
+    ])
+
+    names, cursor, pages = [], None, 0
+    while True:
+        query = '/api/files?limit=2' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(query)
+        assert response.status_code == 200
+        names += [f['name'] for f in response.json['files']]
+        cursor = response.json['nextCursor']
+        pages += 1
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert names == [f'file-{n}' for n in reversed(range(5))]
+
+
+def test_malformed_cursor_is_rejected(client, repo):
+    assert client.get('/api/files?cursor=not-a-cursor').status_code == 400
+    assert client.get('/api/files?limit=0').status_code == 400
+
+
+def test_opening_a_file_leaves_last_edited_date_alone(client, make_files):
+    file_id = make_files(['a'])[0]['id']
+    assert client.post('/api/files/opened', json={'fileId': file_id}).status_code == 200
+
+    listed = client.get('/api/files').json['files']
+    assert listed[0]['lastEditedDate'] is None
@@ -0,0 +1,22 @@
+from conftest import EMAIL
+
+
+def test_subtree_includes_file_counts(client, repo, make_files):
+    root = repo.insert_folder(EMAIL, 'Root', None)['id']
+    child = repo.insert_folder(EMAIL, 'Child', root)['id']
+    make_files(['a', 'b'], folder_id=child)
+
+    response = client.get(f'/api/folders/{root}/subtree')
+    assert response.status_code == 200
+    folders = {folder['id']: folder for folder in response.json['folders']}
+    assert set(folders) == {root, child}
+    assert folders[child]['fileCount'] == 2
+
+
+def test_tree_nests_children(client, repo):
+    root = repo.insert_folder(EMAIL, 'Root', None)['id']
+    child = repo.insert_folder(EMAIL, 'Child', root)['id']
+
+    tree = client.get('/api/folders/tree').json['tree']
+    assert [folder['id'] for folder in tree] == [root]
+    assert [folder['id'] for folder in tree[0]['children']] == [child]
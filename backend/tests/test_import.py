@@ -0,0 +1,22 @@
+import json
+
+from conftest import EMAIL
+
+
+def test_ndjson_import_reports_bad_lines(client, repo):
+    body = '\n'.join([
+        json.dumps({'name': 'good', 'url': 'https://example.com'}),
+        '{not json',
+        json.dumps({'name': 'no url'}),
+        '',
+        json.dumps({'name': 'also good', 'url': 'https://example.com'}),
+    ]) + '\n'
+    response = client.post('/api/files', data=body, content_type='application/x-ndjson')
+    assert response.status_code == 200
+
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    progress, done = lines[:-1], lines[-1]
+    assert done == {'done': True, 'inserted': 2, 'failed': 2}
+    errors = [error for chunk in progress for error in chunk.get('errors', [])]
+    assert [error['line'] for error in errors] == [2, 3]
+    assert sorted(f['name'] for f in repo.list_files(EMAIL)) == ['also good', 'good']
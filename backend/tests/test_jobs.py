@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from config import Config
+from conftest import EMAIL
+from jobs import JobWorker
+
+
+@pytest.fixture
+def worker(repo):
+    return JobWorker(repo=repo, chunk_size=2)
+
+
+def test_delete_all_runs_as_job(client, repo, worker, make_files):
+    folder_id = repo.insert_folder(EMAIL, 'Docs', None)['id']
+    make_files(['a', 'b', 'c'])
+    make_files(['d'], folder_id=folder_id)
+
+    response = client.delete('/api/files?all=true')
+    assert response.status_code == 202
+    job_id = response.json['jobId']
+    assert response.headers['Location'].endswith(f'/api/jobs/{job_id}')
+    assert client.get(response.headers['Location']).json['job']['status'] == 'queued'
+
+    assert worker.run_pending() == 1
+
+    job = client.get(f'/api/jobs/{job_id}').json['job']
+    assert job['status'] == 'succeeded'
+    assert job['progress'] == 5
+    assert job['attempts'] == 1
+    assert repo.list_files(EMAIL) == []
+    assert repo.list_folders(EMAIL) == []
+
+
+def test_failing_chunk_is_retried_with_backoff(client, repo, worker, monkeypatch):
+    monkeypatch.setattr(Config, 'JOB_MAX_ATTEMPTS', 3)
+    monkeypatch.setattr(Config, 'JOB_RETRY_DELAY', 10)
+
+    def fail(email, limit):
+        raise RuntimeError('chunk failed')
+    monkeypatch.setattr(repo, 'delete_user_data_chunk', fail)
+
+    job_id = client.delete('/api/files?all=true').json['jobId']
+
+    for attempt, delay in ((1, 10), (2, 20)):
+        assert worker.run_pending() == 1
+        job = repo.get_job(EMAIL, job_id)
+        assert (job['status'], job['attempts'], job['error']) == ('queued', attempt, 'chunk failed')
+        backoff = datetime.fromisoformat(job['run_after']) - datetime.fromisoformat(job['updated_at'])
+        assert abs(backoff.total_seconds() - delay) < 1
+        # Not due until the backoff has passed
+        assert worker.run_pending() == 0
+        repo.update_job(job_id, run_after=datetime.utcnow() - timedelta(seconds=1))
+
+    assert worker.run_pending() == 1
+    job = client.get(f'/api/jobs/{job_id}').json['job']
+    assert (job['status'], job['attempts'], job['error']) == ('failed', 3, 'chunk failed')
+    assert worker.run_pending() == 0
@@ -0,0 +1,27 @@
+import gzip
+
+from prometheus_client import REGISTRY
+
+
+def size_sum(route):
+    labels = {'method': 'GET', 'route': route}
+    return REGISTRY.get_sample_value('dataroom_http_response_size_bytes_sum', labels) or 0
+
+
+def test_response_size_is_measured_after_compression(client, make_files):
+    make_files([f'quarterly-report-{n}' for n in range(20)])
+    before = size_sum('/api/files')
+
+    response = client.get('/api/files', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert size_sum('/api/files') - before == len(response.data) < len(gzip.decompress(response.data))
+
+
+def test_streamed_response_size_is_counted(client, make_files):
+    make_files(['a', 'b'])
+    before = size_sum('/api/files')
+
+    response = client.get('/api/files?stream=true')
+    body = response.get_data()
+    response.close()
+    assert size_sum('/api/files') - before == len(body)
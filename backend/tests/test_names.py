@@ -0,0 +1,50 @@
+import json
+
+from conftest import EMAIL
+
+
+def test_duplicate_file_name_conflicts(client, make_files):
+    make_files(['report'])
+    response = client.post('/api/files', json={'files': [
+        {'name': 'report', 'url': 'https://example.com', 'mimeType': 'application/pdf'},
+    ]})
+    assert response.status_code == 409
+
+    # The same name with another type is a different file
+    response = client.post('/api/files', json={'files': [
+        {'name': 'report', 'url': 'https://example.com', 'mimeType': 'image/png'},
+    ]})
+    assert response.status_code == 200
+
+
+def test_rename_onto_sibling_conflicts(client, make_files):
+    files = make_files(['a', 'b'])
+    file_id = next(f['id'] for f in files if f['name'] == 'b')
+    response = client.patch('/api/files', json={'fileId': file_id, 'name': 'a'})
+    assert response.status_code == 409
+
+
+def test_duplicate_folder_name_conflicts(client):
+    assert client.post('/api/folders', json={'name': 'Legal'}).status_code == 200
+    assert client.post('/api/folders', json={'name': 'Legal'}).status_code == 409
+
+
+def test_batch_move_conflict_moves_nothing(client, repo, make_files):
+    folder_id = repo.insert_folder(EMAIL, 'Target', None)['id']
+    make_files(['a'], folder_id=folder_id)
+    a, b = (f['id'] for f in make_files(['a', 'b']))
+
+    response = client.patch('/api/files/batch/folder', json={'fileIds': [a, b], 'folderId': folder_id})
+    assert response.status_code == 409
+    assert len(repo.list_files(EMAIL)) == 2
+
+
+def test_ndjson_import_reports_name_conflicts(client, make_files):
+    make_files(['taken'], mime_type=None)
+    body = json.dumps({'name': 'taken', 'url': 'https://example.com'}) + '\n'
+    response = client.post('/api/files', data=body, content_type='application/x-ndjson')
+
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[0]['inserted'] == 0
+    assert 'already exists' in lines[0]['error']
+    assert lines[-1] == {'done': True, 'inserted': 0, 'failed': 1}
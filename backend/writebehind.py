@@ -0,0 +1,166 @@
+"""Write-behind buffer for file opens (last_interacted) and star toggles.
+
+Updates are held in memory per (user, file) and merged: the latest star state
+and the latest open time win. A background thread writes everything pending
+with one batched UPDATE every WRITE_BEHIND_FLUSH_INTERVAL seconds, or earlier
+once WRITE_BEHIND_MAX_PENDING rows are waiting. Each flush then bumps the data
+version of the affected users and notifies their event streams.
+
+Before any other API request of a user is handled, that user's pending
+updates are flushed (see api.helpers.flush_pending_writes), so their own
+reads and writes never see the buffer. Requests served by other gunicorn
+workers may lag by up to one flush interval. The buffer is flushed on
+interpreter exit and by gunicorn's worker_exit hook; updates still pending
+when a worker is killed are lost, which is the trade-off for not writing
+every click.
+"""
+import atexit
+import logging
+import threading
+from datetime import datetime
+
+from config import Config
+from events import hub
+from repository import get_repository
+
+logger = logging.getLogger(__name__)
+
+
+def merge_update(older, newer):
+    """Combine two pending updates of one file: newer values win, and so does the later open."""
+    merged = {**older, **newer}
+    if 'last_interacted' in older and 'last_interacted' in newer:
+        merged['last_interacted'] = max(older['last_interacted'], newer['last_interacted'])
+    return merged
+
+
+class WriteBehindBuffer:
+    """Coalesces per-file updates and writes them in batches."""
+
+    def __init__(self, repo=None, flush_interval=None, max_pending=None):
+        self.repo = repo
+        self.flush_interval = Config.WRITE_BEHIND_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self.max_pending = max_pending or Config.WRITE_BEHIND_MAX_PENDING
+        self.coalesced = 0
+        # email -> {file_id: values}
+        self._pending = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        # Held for the whole of a flush, so two flushes never write one row out of order
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def record_open(self, email, file_id, at=None):
+        self._put(email, file_id, {'last_interacted': at or datetime.utcnow()})
+
+    def set_starred(self, email, file_id, starred):
+        self._put(email, file_id, {'starred': starred})
+
+    def _put(self, email, file_id, values):
+        file_id = file_id.lower()
+        with self._lock:
+            files = self._pending.setdefault(email, {})
+            if file_id in files:
+                self.coalesced += 1
+                values = merge_update(files[file_id], values)
+            else:
+                self._size += 1
+            files[file_id] = values
+            full = self._size >= self.max_pending
+        if not Config.WRITE_BEHIND_ENABLED:
+            self.flush(email)
+            return
+        self.start()
+        if full:
+            self._wake.set()
+
+    def has_pending(self, email):
+        return email in self._pending
+
+    def _requeue(self, taken):
+        with self._lock:
+            for email, files in taken.items():
+                pending = self._pending.setdefault(email, {})
+                for file_id, values in files.items():
+                    if file_id in pending:
+                        pending[file_id] = merge_update(values, pending[file_id])
+                    else:
+                        pending[file_id] = values
+                        self._size += 1
+
+    def flush(self, email=None):
+        """Write pending updates (all, or one user's) with one statement; return rows written.
+
+        On failure the updates are put back, under any newer ones, and the error is raised.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if email is None:
+                    taken, self._pending = self._pending, {}
+                else:
+                    files = self._pending.pop(email, None)
+                    taken = {email: files} if files else {}
+                rows = sum(len(files) for files in taken.values())
+                self._size -= rows
+            if not rows:
+                return 0
+
+            repo = self.repo or get_repository()
+            try:
+                repo.apply_file_updates([
+                    {'id': file_id, 'user_email': user_email, **values}
+                    for user_email, files in taken.items()
+                    for file_id, values in files.items()
+                ])
+            except Exception:
+                self._requeue(taken)
+                raise
+
+        for user_email in taken:
+            try:
+                repo.bump_data_version(user_email)
+            except Exception:
+                logger.exception('Error bumping data version for %s', user_email)
+            hub.publish(user_email)
+        return rows
+
+    def start(self):
+        """Start the flush thread if it is not running yet."""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._stopped.clear()
+                self._thread = threading.Thread(target=self.run_forever, name='write-behind', daemon=True)
+                self._thread.start()
+                # Registered here rather than at import, so it runs before logging shuts down
+                atexit.register(self.close)
+
+    def close(self, timeout=None):
+        """Stop the flush thread and write whatever is still pending."""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Error flushing buffered file updates on shutdown')
+
+    def run_forever(self):
+        """Flush every interval (or when woken by a full buffer) until close() is called."""
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stopped.is_set():
+                break
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Error flushing buffered file updates')
+
+
+file_writes = WriteBehindBuffer()
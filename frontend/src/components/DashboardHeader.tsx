@@ -32,7 +32,7 @@ import { Input } from '@/components/ui/input';
 import { SidebarTrigger } from '@/components/ui/sidebar';
 import LogoutButton from '@/src/components/LogoutButton';
 import { Folder } from '@/src/types';
-import { apiRequest } from '@/src/utils/api';
+import { apiRequest, waitForJob } from '@/src/utils/api';
 import Settings from './Settings';
 
 interface DashboardHeaderProps {
@@ -112,6 +112,11 @@ export default function DashboardHeader({
         setIsDeletingFiles(false);
         return false;
       }
+      if (!(await waitForJob(res, userEmail))) {
+        toast.error('Failed to delete all files.');
+        setIsDeletingFiles(false);
+        return false;
+      }
       toast.success('All files and folders deleted.');
       window.dispatchEvent(new CustomEvent('allFilesDeleted'));
       setIsDeletingFiles(false);
@@ -137,6 +142,10 @@ export default function DashboardHeader({
         console.error('Failed to delete account:', data.error || res.statusText);
         return;
       }
+      if (!(await waitForJob(res, userEmail))) {
+        toast.error('Failed to delete account.');
+        return;
+      }
       await signOut({ callbackUrl: '/login' });
     } catch (e) {
       console.error('Delete account error:', e);
@@ -38,3 +38,25 @@ export async function apiRequest(
     headers,
   });
 }
+
+/**
+ * Wait for a background job started by a 202 response (e.g. delete all files).
+ * Resolves to true once the job succeeds; other responses resolve to res.ok.
+ */
+export async function waitForJob(
+  res: Response,
+  email?: string | null,
+  intervalMs = 1000,
+): Promise<boolean> {
+  if (res.status !== 202) return res.ok;
+  const { jobId } = await res.json();
+
+  for (;;) {
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    const jobRes = await apiRequest(`/api/jobs/${jobId}`, {}, email);
+    if (!jobRes.ok) return false;
+    const { job } = await jobRes.json();
+    if (job.status === 'succeeded') return true;
+    if (job.status === 'failed') return false;
+  }
+}